@@ -0,0 +1,92 @@
+"""
+Benchmarks request throughput of awaitable process runs under concurrent
+callers. Every caller owns a model instance bound to its own state manager and
+issues runs against it, while a ticker coroutine measures how long the event
+loop is blocked for. Blocking `run` calls are compared against `run_async`.
+
+Usage:
+    python benchmarks/async_run_benchmark.py --callers 32 --requests 200
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ngcsimlib import Component, MethodProcess
+from ngcsimlib.compartment import Compartment
+from ngcsimlib.context import Context
+from ngcsimlib.global_state import StateManager
+from ngcsimlib.parser import compilable
+
+
+class Leaky(Component):
+    def __init__(self, name, decay=0.9):
+        super().__init__(name)
+        self.decay = decay
+        self.inp = Compartment(1.0)
+        self.v = Compartment(0.0)
+
+    @compilable
+    def advance(self, dt):
+        self.v.set(self.v.get() * self.decay + self.inp.get() * dt)
+
+
+def build(index, n_components):
+    with Context(f"caller_{index}", state_manager=StateManager()):
+        nodes = [Leaky(f"node_{i}") for i in range(n_components)]
+        for i in range(1, n_components):
+            nodes[i - 1].v >> nodes[i].inp
+        advance = MethodProcess("advance")
+        for node in nodes:
+            advance >> node.advance
+        advance.watch(nodes[-1].v)
+    return advance
+
+
+async def ticker(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def bench(processes, n_requests, use_async, executor):
+    async def caller(process):
+        for _ in range(n_requests):
+            if use_async:
+                await process.run_async(dt=0.1, executor=executor)
+            else:
+                process.run(dt=0.1)
+                await asyncio.sleep(0)
+
+    stop, lags = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*[caller(p) for p in processes])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    return elapsed, max(lags, default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--components", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    processes = [build(i, args.components) for i in range(args.callers)]
+    total = args.callers * args.requests
+    with ThreadPoolExecutor(args.threads) as executor:
+        for label, use_async in [("run (blocking)", False),
+                                 ("run_async", True)]:
+            elapsed, lag = asyncio.run(bench(processes, args.requests,
+                                             use_async, executor))
+            print(f"{label:<18}{total / elapsed:>12.0f} req/s"
+                  f"{lag * 1000:>12.2f}ms max loop lag")
+
+
+if __name__ == "__main__":
+    main()
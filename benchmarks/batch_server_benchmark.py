@@ -0,0 +1,99 @@
+"""
+Benchmarks serving many small concurrent requests against one model. Running
+every request separately with `run` is compared against a `BatchServer`, which
+runs the requests that arrive together as one batch. The model works on lists,
+so no array library is needed.
+
+Usage:
+    python benchmarks/batch_server_benchmark.py --callers 32 --requests 200
+"""
+import argparse
+import threading
+import time
+
+from ngcsimlib import Component, MethodProcess, BatchServer
+from ngcsimlib.compartment import Compartment
+from ngcsimlib.context import Context
+from ngcsimlib.parser import compilable
+
+
+class Scale(Component):
+    def __init__(self, name, factor=0.5):
+        super().__init__(name)
+        self.factor = factor
+        self.inp = Compartment([])
+        self.out = Compartment([])
+
+    @compilable
+    def advance(self):
+        self.out.set([x * self.factor for x in self.inp.get()])
+
+
+def build(n_components):
+    with Context("served"):
+        nodes = [Scale(f"node_{i}") for i in range(n_components)]
+        for i in range(1, n_components):
+            nodes[i - 1].out >> nodes[i].inp
+        advance = MethodProcess("advance")
+        for node in nodes:
+            advance >> node.advance
+        advance.watch(nodes[-1].out)
+    return advance, nodes[0].inp
+
+
+def bench(n_callers, n_requests, request):
+    latencies, lock = [], threading.Lock()
+
+    def caller(index):
+        local = []
+        for i in range(n_requests):
+            start = time.perf_counter()
+            request(index * n_requests + i)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=caller, args=(i,))
+               for i in range(n_callers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return elapsed, latencies[len(latencies) // 2], \
+        latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--components", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    process, inp = build(args.components)
+    run_lock = threading.Lock()
+
+    def run_single(x):
+        state = process._state_manager.state
+        state[inp.target] = [x]
+        with run_lock:
+            return process.run(state=state, update=False)[1]
+
+    total = args.callers * args.requests
+    with BatchServer(process, [inp], max_batch_size=args.batch_size,
+                     max_latency=args.latency) as server:
+        for label, request in [("run per request", run_single),
+                               ("BatchServer", server)]:
+            elapsed, p50, p99 = bench(args.callers, args.requests, request)
+            print(f"{label:<18}{total / elapsed:>12.0f} req/s"
+                  f"{p50 * 1000:>10.2f}ms p50{p99 * 1000:>10.2f}ms p99")
+        print(server.metrics())
+
+
+if __name__ == "__main__":
+    main()
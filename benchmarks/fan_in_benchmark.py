@@ -0,0 +1,90 @@
+"""
+Benchmarks wide fan-ins. A sink reads the sum of many source compartments,
+compiled either as the chain of additions that binary operations produce or as
+the fused n-ary sum, which accumulates in place instead of allocating an
+intermediate array per source. The eager path is timed as well.
+
+Requires numpy.
+
+Usage:
+    python benchmarks/fan_in_benchmark.py --fan-in 64 --size 100000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ngcsimlib import Component, MethodProcess
+from ngcsimlib.compartment import Compartment
+from ngcsimlib.context import Context
+from ngcsimlib.operations import BaseOp, Summation
+from ngcsimlib.parser import compilable
+
+
+class ChainedSum(Summation):
+    """
+    A summation compiled the way binary operations are, as a left-nested chain
+    of additions, and evaluated eagerly with the builtin sum.
+    """
+    def _get_value(self):
+        return sum(comp.get() for comp in self._comps)
+
+    def _to_ast(self, node, ctx):
+        return BaseOp._to_ast(self, node, ctx)
+
+    def get_needed_globals(self):
+        return BaseOp.get_needed_globals(self)
+
+
+class Source(Component):
+    def __init__(self, name, size):
+        super().__init__(name)
+        self.v = Compartment(np.ones(size))
+
+
+class Sink(Component):
+    def __init__(self, name, size):
+        super().__init__(name)
+        self.inp = Compartment(np.zeros(size))
+        self.out = Compartment(np.zeros(size))
+
+    @compilable
+    def advance(self):
+        self.out.set(self.inp.get())
+
+
+def build(name, op, fan_in, size):
+    with Context(name):
+        sources = [Source(f"source_{i}", size) for i in range(fan_in)]
+        sink = Sink("sink", size)
+        op(*[source.v for source in sources]) >> sink.inp
+        advance = MethodProcess("advance")
+        advance >> sink.advance
+    return advance, sink
+
+
+def timed(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fan-in", type=int, default=64)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    for label, op in [("chained", ChainedSum), ("fused", Summation)]:
+        advance, sink = build(f"fan_in_{label}", op, args.fan_in, args.size)
+        compiled = timed(lambda: advance.run(update=False), args.repeats)
+        eager = timed(sink.inp.get, args.repeats)
+        print(f"{label:<10}{compiled * 1000:>10.3f}ms compiled"
+              f"{eager * 1000:>10.3f}ms eager")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmarks the import time of the public entry points of ngcsimlib, using the
+cumulative times reported by `python -X importtime`.
+
+Usage:
+    python benchmarks/import_time_benchmark.py --repeats 5
+"""
+import argparse
+import subprocess
+import sys
+
+ENTRY_POINTS = [
+    "ngcsimlib",
+    "ngcsimlib.compartment",
+    "ngcsimlib.context",
+    "ngcsimlib.global_state",
+    "ngcsimlib.logger",
+    "ngcsimlib.operations",
+    "ngcsimlib.parser",
+    "ngcsimlib.checkpoint",
+]
+
+
+def import_time(module: str) -> float:
+    """
+    Returns: the cumulative import time of the module in milliseconds
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                             f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = [f.strip() for f in line[len("import time:"):].split("|")]
+        if not fields[0].isdigit():
+            continue
+        # Top level imports are the ones without any indentation
+        if fields[2] == fields[2].lstrip() and \
+                (fields[2] == module or module.startswith(fields[2] + ".")):
+            cumulative += int(fields[1])
+    return cumulative / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'entry point':<28}{'best (ms)':>12}{'median (ms)':>14}")
+    for module in ENTRY_POINTS:
+        times = sorted(import_time(module) for _ in range(args.repeats))
+        print(f"{module:<28}{times[0]:>12.2f}{times[len(times) // 2]:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmarks saving and loading a context holding a large number of objects.
+
+Usage:
+    python benchmarks/save_load_benchmark.py --objects 100000
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+from ngcsimlib import Component
+from ngcsimlib.compartment import Compartment
+from ngcsimlib.context import Context, contextManager
+from ngcsimlib.operations import Summation
+from ngcsimlib._src.modules.modules_manager import modules_manager
+
+
+class Node(Component):
+    def __init__(self, name, value=0.0):
+        super().__init__(name)
+        self.inp = Compartment(value)
+        self.out = Compartment(value)
+
+
+def _timed(label, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    print(f"{label:<32}{time.perf_counter() - start:>10.3f}s")
+    return result
+
+
+def _build(n_objects):
+    with Context("benchmark") as ctx:
+        nodes = [Node(f"node_{i}") for i in range(n_objects)]
+        for i in range(1, n_objects):
+            Summation(nodes[i - 1].out, nodes[i].out) >> nodes[i].inp
+    return ctx
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--objects", type=int, default=100000)
+    args = parser.parse_args()
+
+    ctx = _timed(f"build ({args.objects} objects)", _build, args.objects)
+    directory = tempfile.mkdtemp()
+    try:
+        _timed("save_to_json", ctx.save_to_json, directory, "json_model")
+        _timed("save_to_archive", ctx.save_to_archive, directory,
+               "archive_model")
+
+        for name in ["json_model", "archive_model"]:
+            contextManager.clear()
+            modules_manager.invalidate()
+            _timed(f"load {name}", Context.load, directory, name)
+    finally:
+        shutil.rmtree(directory)
+
+    node = Node.__new__(Node)
+    op = Summation()
+    for label, obj in [("component", node), ("operation", op)]:
+        modules_manager.invalidate()
+        _timed(f"resolve {label} x{args.objects}",
+               lambda: [modules_manager.resolve_public_import(obj)
+                        for _ in range(args.objects)])
+
+
+if __name__ == "__main__":
+    main()
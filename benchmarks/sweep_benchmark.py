@@ -0,0 +1,86 @@
+"""
+Benchmarks running a sweep of configurations of the same model, comparing
+rebuilding the model for every configuration (what a script per
+configuration does) against `run_sweep` with an increasing number of workers.
+
+Usage:
+    python benchmarks/sweep_benchmark.py --configs 200 --components 50 \
+        --steps 200
+"""
+import argparse
+import os
+import time
+
+from ngcsimlib import Component, MethodProcess, run_sweep
+from ngcsimlib.compartment import Compartment
+from ngcsimlib.context import Context, contextManager
+from ngcsimlib.parser import compilable
+
+N_COMPONENTS = int(os.environ.get("SWEEP_BENCHMARK_COMPONENTS", "50"))
+
+
+class Leaky(Component):
+    def __init__(self, name, decay=0.9):
+        super().__init__(name)
+        self.decay = decay
+        self.inp = Compartment(1.0)
+        self.v = Compartment(0.0)
+
+    @compilable
+    def advance(self, dt):
+        self.v.set(self.v.get() * self.decay + self.inp.get() * dt)
+
+
+def build():
+    with Context("sweep_benchmark"):
+        nodes = [Leaky(f"node_{i}") for i in range(N_COMPONENTS)]
+        for i in range(1, N_COMPONENTS):
+            nodes[i - 1].v >> nodes[i].inp
+        advance = MethodProcess("advance")
+        for node in nodes:
+            advance >> node.advance
+        advance.watch(nodes[-1].v)
+    return advance
+
+
+def rebuild_each(configs, steps):
+    for config in configs:
+        contextManager.clear()
+        advance = build()
+        for row in advance.pack_rows(steps, **config["keywords"]):
+            advance.run(keywords=row)
+
+
+def main():
+    global N_COMPONENTS
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--configs", type=int, default=200)
+    parser.add_argument("--components", type=int, default=N_COMPONENTS)
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args()
+    # Workers import this module again, so they need to see the same size
+    os.environ["SWEEP_BENCHMARK_COMPONENTS"] = str(args.components)
+    N_COMPONENTS = args.components
+
+    configs = [{"attributes": {"node_0.decay": 0.5 + 0.4 * i / args.configs},
+                "keywords": {"dt": 0.1}} for i in range(args.configs)]
+
+    start = time.perf_counter()
+    rebuild_each(configs, args.steps)
+    baseline = time.perf_counter() - start
+    print(f"{'rebuild per config':<24}{baseline:>10.3f}s")
+
+    counts = [0] + [n for n in (1, 2, 4, 8, 16, 32, 64)
+                    if n <= (os.cpu_count() or 1)]
+    for workers in counts:
+        start = time.perf_counter()
+        results = list(run_sweep(build, configs, args.steps, workers=workers))
+        elapsed = time.perf_counter() - start
+        failed = sum(not r.ok for r in results)
+        label = "in process" if workers == 0 else f"{workers} worker(s)"
+        print(f"{label:<24}{elapsed:>10.3f}s{baseline / elapsed:>8.2f}x"
+              + (f"  ({failed} failed)" if failed else ""))
+
+
+if __name__ == "__main__":
+    main()
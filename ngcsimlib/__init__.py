@@ -1,20 +1,66 @@
-from ngcsimlib._src.component import Component as Component
-from ngcsimlib._src.process.methodProcess import MethodProcess
-from ngcsimlib._src.process.jointProcess import JointProcess
-from ngcsimlib._src.deprecators import deprecated, deprecate_args
-from ngcsimlib._src.configManager import init_config
-from ngcsimlib._src.configManager import get_config, provide_namespace
-import sys, argparse, os, json
+import importlib
+from typing import TYPE_CHECKING
+
+## Public attributes are resolved lazily through the module level __getattr__
+## below so that `import ngcsimlib` does not import every process, context,
+## parser and config module up front. Each maps to (module, attribute name).
+_LAZY_ATTRIBUTES = {
+    "Component": ("ngcsimlib._src.component", "Component"),
+    "MethodProcess": ("ngcsimlib._src.process.methodProcess", "MethodProcess"),
+    "JointProcess": ("ngcsimlib._src.process.jointProcess", "JointProcess"),
+    "export_processes": ("ngcsimlib._src.process.exporter",
+                         "export_processes"),
+    "run_sweep": ("ngcsimlib._src.process.sweep", "run_sweep"),
+    "vectorized": ("ngcsimlib._src.process.packing", "vectorized"),
+    "SweepResult": ("ngcsimlib._src.process.sweep", "SweepResult"),
+    "BatchServer": ("ngcsimlib._src.process.batchServer", "BatchServer"),
+    "BatchClient": ("ngcsimlib._src.process.batchServer", "BatchClient"),
+    "deprecated": ("ngcsimlib._src.deprecators", "deprecated"),
+    "deprecate_args": ("ngcsimlib._src.deprecators", "deprecate_args"),
+    "init_config": ("ngcsimlib._src.configManager", "init_config"),
+    "get_config": ("ngcsimlib._src.configManager", "get_config"),
+    "provide_namespace": ("ngcsimlib._src.configManager", "provide_namespace"),
+}
+
+_LAZY_SUBMODULES = {"checkpoint", "compartment", "context", "global_state",
+                    "logger", "operations", "parser"}
+
+__all__ = [*_LAZY_ATTRIBUTES, *sorted(_LAZY_SUBMODULES), "configure"]
+
+if TYPE_CHECKING:
+    from ngcsimlib._src.component import Component as Component
+    from ngcsimlib._src.process.methodProcess import MethodProcess
+    from ngcsimlib._src.process.jointProcess import JointProcess
+    from ngcsimlib._src.process.exporter import export_processes
+    from ngcsimlib._src.process.sweep import run_sweep, SweepResult
+    from ngcsimlib._src.process.packing import vectorized
+    from ngcsimlib._src.process.batchServer import BatchServer, BatchClient
+    from ngcsimlib._src.deprecators import deprecated, deprecate_args
+    from ngcsimlib._src.configManager import init_config
+    from ngcsimlib._src.configManager import get_config, provide_namespace
+    __version__: str
 
 ########################################################################################################################
-if sys.version_info >= (3, 8): ## for new versions of python/ngc-learn
-    from importlib.metadata import version, distributions, PackageNotFoundError
-else: ## for older versions of python before 3.8
-    from importlib_metadata import version, distributions, PackageNotFoundError
+def __getattr__(name):
+    if name == "__version__":
+        ## Following obtains ngc-sim-lib's version, deferred until it is first
+        ## requested since reading the package metadata is slow
+        from importlib.metadata import version
+        value = version("ngcsimlib")
+    elif name in _LAZY_ATTRIBUTES:
+        module_name, attr_name = _LAZY_ATTRIBUTES[name]
+        value = getattr(importlib.import_module(module_name), attr_name)
+    elif name in _LAZY_SUBMODULES:
+        value = importlib.import_module(f"{__name__}.{name}")
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-## Following obtains ngc-learn's version
-from importlib.metadata import version
-__version__ = version("ngcsimlib")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | _LAZY_SUBMODULES)
 
 ## these two lines below are deprecated if using newer python(s) (had to do this for ngc-learn)
 # from pkg_resources import get_distribution
@@ -22,6 +68,9 @@ __version__ = version("ngcsimlib")
 ########################################################################################################################
 
 def configure():
+    import argparse, os
+    from ngcsimlib._src.configManager import init_config
+
     parser = argparse.ArgumentParser(description='Build and run a model using ngclearn')
     parser.add_argument("--config", type=str, help='location of config.json file')
 
@@ -1,3 +1,9 @@
+## The core modules import each other in a cycle that only resolves when the
+## context package is imported first. Since `import ngcsimlib` no longer
+## imports anything eagerly, this makes sure that importing any of the internal
+## modules directly starts from the context package.
+from . import context as _context
+
 # from . import utils
 #
 # import argparse, os, json
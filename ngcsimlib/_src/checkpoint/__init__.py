@@ -0,0 +1,5 @@
+from .checkpointWriter import (
+    CheckpointWriter as CheckpointWriter,
+    restore_checkpoint as restore_checkpoint
+)
+from .asyncCheckpointer import AsyncCheckpointer as AsyncCheckpointer
\ No newline at end of file
@@ -0,0 +1,130 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import Union, List
+
+from .checkpointWriter import CheckpointWriter
+
+
+class AsyncCheckpointer:
+    """
+    Writes checkpoints of the global state on a background thread so that the
+    simulation loop does not block on serialization. Calling `save` captures a
+    snapshot of the state on the calling thread, this is only a capture of
+    references as compiled processes replace values in the global state rather
+    than mutating them, and hands the snapshot off to a single writer thread.
+    Checkpoints are written in the order they are saved and each one only
+    becomes visible once it is fully written to a staging directory and
+    renamed into place.
+
+    Args:
+        directory: the directory to write the checkpoints to
+
+        max_in_flight (default=2): the maximum number of checkpoints that can
+            be waiting to be written, once reached `save` will block until the
+            oldest one is finished
+
+        max_chain (default=None): the maximum number of deltas to chain to a
+            base before it is automatically compacted (see CheckpointWriter)
+
+        state_manager (default=None): the state manager to checkpoint, if None
+            the global state manager will be used
+    """
+    def __init__(self, directory: str, max_in_flight: int = 2,
+                 max_chain: Union[int, None] = None, state_manager=None):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        self._writer = CheckpointWriter(directory, max_chain=max_chain,
+                                        state_manager=state_manager)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ngcsimlib-checkpoint")
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._pending: List[Future] = []
+        self._lock = threading.Lock()
+
+    @property
+    def writer(self) -> CheckpointWriter:
+        """
+        Returns: The underlying checkpoint writer
+        """
+        return self._writer
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Returns: The number of checkpoints that have not finished writing
+        """
+        with self._lock:
+            return sum(1 for f in self._pending if not f.done())
+
+    def save(self) -> Future:
+        """
+        Snapshots the current state and schedules it to be written in the
+        background. This will block if the maximum number of in flight
+        checkpoints has been reached.
+
+        Returns: A future that resolves to the name of the checkpoint written
+            (None if nothing had changed), or raises the error the write failed
+            with
+        """
+        return self._submit(lambda: (self._writer.write,
+                                     self._writer.snapshot()))
+
+    def compact(self) -> Future:
+        """
+        Schedules the chain of checkpoints to be compacted after all the
+        checkpoints currently in flight have been written. Compactions count
+        towards the maximum number of checkpoints in flight.
+
+        Returns: A future that resolves to the name of the new base
+        """
+        return self._submit(lambda: (self._writer.compact,))
+
+    def _submit(self, prepare) -> Future:
+        """
+        Takes an in flight slot, blocking until one is free, and schedules the
+        call returned by `prepare` (a callable and its arguments), which is
+        only prepared once the slot is taken.
+        """
+        self._slots.acquire()
+        try:
+            fn, *args = prepare()
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(self._release)
+        with self._lock:
+            self._pending = [f for f in self._pending if not f.done()]
+            self._pending.append(future)
+        return future
+
+    def wait(self, timeout: Union[float, None] = None) -> bool:
+        """
+        Waits for every checkpoint in flight to finish writing.
+
+        Args:
+            timeout (default=None): the maximum number of seconds to wait
+
+        Returns: if all the checkpoints finished writing
+        """
+        with self._lock:
+            pending = list(self._pending)
+        _, not_done = wait(pending, timeout=timeout)
+        return len(not_done) == 0
+
+    def close(self) -> None:
+        """
+        Waits for every checkpoint in flight and shuts down the writer thread.
+        """
+        self._executor.shutdown(wait=True)
+
+    def _release(self, _):
+        self._slots.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
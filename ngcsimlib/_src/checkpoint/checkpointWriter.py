@@ -0,0 +1,267 @@
+import json
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+from typing import Dict, Any, List, Union
+
+from ngcsimlib._src.global_state.manager import global_state_manager
+from ngcsimlib._src.logger import warn, error
+
+_MANIFEST = "manifest.json"
+_STAGING_PREFIX = ".staging-"
+_CHECKPOINT_NAME = re.compile(r"(base|delta)_\d{6}\.pkl")
+
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, "wb") as fp:
+        fp.write(data)
+        fp.flush()
+        os.fsync(fp.fileno())
+
+
+def _sync_directory(directory: str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        ## Directories can not be opened on every platform
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _commit(directory: str, filename: str, payload: Dict[str, Any],
+            manifest: Dict[str, Any]) -> None:
+    """
+    Writes a checkpoint and the manifest pointing to it into a fresh staging
+    directory and then renames both into place, the manifest last. Until the
+    manifest is replaced the checkpoint is not part of the chain, so a crash at
+    any point leaves the previous chain intact, and whatever was left behind is
+    removed the next time a writer opens the directory.
+    """
+    staging = tempfile.mkdtemp(prefix=_STAGING_PREFIX, dir=directory)
+    try:
+        _write_file(f"{staging}/{filename}",
+                    pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+        _write_file(f"{staging}/{_MANIFEST}",
+                    json.dumps(manifest, indent=4).encode("utf-8"))
+        os.replace(f"{staging}/{filename}", f"{directory}/{filename}")
+        os.replace(f"{staging}/{_MANIFEST}", f"{directory}/{_MANIFEST}")
+        _sync_directory(directory)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _read_manifest(directory: str) -> Union[Dict[str, Any], None]:
+    path = f"{directory}/{_MANIFEST}"
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r") as fp:
+        return json.load(fp)
+
+
+def _read_payload(directory: str, filename: str) -> Dict[str, Any]:
+    with open(f"{directory}/{filename}", "rb") as fp:
+        return pickle.load(fp)
+
+
+def _merge_chain(directory: str, manifest: Dict[str, Any]) -> Dict[str, Any]:
+    state = dict(_read_payload(directory, manifest["base"])["state"])
+    for delta in manifest["deltas"]:
+        state.update(_read_payload(directory, delta)["state"])
+    return state
+
+
+class CheckpointWriter:
+    """
+    Writes incremental checkpoints of the global state to a directory. The
+    first checkpoint written is a full snapshot of the state (the base) and
+    every checkpoint after that is a delta that only contains the keys that
+    have changed since the previous checkpoint. Changes are tracked through the
+    per-key versions kept by the state manager. The chain of checkpoints is
+    recorded in a manifest that is only ever replaced once the payload it
+    points to is fully written, so an interrupted write never corrupts the
+    chain.
+
+    Args:
+        directory: the directory to write the checkpoints to, it will be
+            created if it does not exist
+
+        max_chain (default=None): the maximum number of deltas to chain to a
+            base before it is automatically compacted, if None the chain will
+            only be compacted when `compact` is called
+
+        state_manager (default=None): the state manager to checkpoint, if None
+            the global state manager will be used
+    """
+    def __init__(self, directory: str, max_chain: Union[int, None] = None,
+                 state_manager=None):
+        self.directory = directory
+        self.max_chain = max_chain
+        self._state_manager = state_manager or global_state_manager
+        ## _last_version is the version the last snapshot was taken at (caller
+        ## side), _written_version the version on disk (writer side)
+        self._last_version: Union[int, None] = None
+        self._written_version: Union[int, None] = None
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._manifest = _read_manifest(self.directory)
+        self._clean()
+
+    @property
+    def chain(self) -> List[str]:
+        """
+        Returns: The files that make up the current chain of checkpoints, base
+            first, in the order they need to be replayed
+        """
+        if self._manifest is None:
+            return []
+        return [self._manifest["base"]] + list(self._manifest["deltas"])
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Captures everything needed to write the next checkpoint. Only
+        references to the values are captured, as the state manager replaces
+        values rather than mutating them, this capture is consistent and cheap.
+
+        Returns: The captured snapshot to be passed to `write`
+        """
+        with self._lock:
+            version = self._state_manager.version
+            state = self._state_manager.state
+            since = self._last_version
+            self._last_version = version
+            if since is None:
+                return {"version": version, "since": None, "full": True,
+                        "state": state}
+            changed = self._state_manager.changed_since(since)
+
+        ## The complete state is kept so the snapshot can still be written as a
+        ## base if the write of the snapshot before it failed
+        return {"version": version, "since": since, "full": False,
+                "state": {key: state[key] for key in changed},
+                "complete": state}
+
+    def write(self, snapshot: Union[Dict[str, Any], None] = None) -> \
+            Union[str, None]:
+        """
+        Writes a checkpoint of the state. If no checkpoint has been written yet
+        by this writer a full base is written, otherwise a delta containing
+        only the changed keys is chained onto the current base. If the
+        previous checkpoint failed to write, the changes it held are not on
+        disk, so a full base is written instead of the delta.
+
+        Args:
+            snapshot (default=None): a snapshot produced by `snapshot`, if None
+                one will be taken immediately
+
+        Returns: The name of the checkpoint file written, None if nothing has
+            changed since the last checkpoint
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+
+        full = snapshot["full"] or self._manifest is None or \
+            snapshot["since"] != self._written_version or \
+            (self.max_chain is not None and
+             len(self._manifest["deltas"]) >= self.max_chain)
+
+        if not full and len(snapshot["state"]) == 0:
+            self._written_version = snapshot["version"]
+            return None
+
+        state = snapshot["complete"] if full and not snapshot["full"] \
+            else snapshot["state"]
+
+        index = 0 if self._manifest is None else self._manifest["index"] + 1
+        filename = f"{'base' if full else 'delta'}_{index:06d}.pkl"
+        stale = self.chain if full else []
+        if full:
+            manifest = {"index": index, "base": filename, "deltas": []}
+        else:
+            manifest = {"index": index, "base": self._manifest["base"],
+                        "deltas": self._manifest["deltas"] + [filename]}
+        _commit(self.directory, filename,
+                {"version": snapshot["version"], "state": state}, manifest)
+        self._manifest = manifest
+        self._written_version = snapshot["version"]
+        self._remove(stale)
+        return filename
+
+    def compact(self) -> Union[str, None]:
+        """
+        Merges the current chain of checkpoints into a single full base.
+
+        Returns: The name of the new base, None if there is nothing to compact
+        """
+        if self._manifest is None or len(self._manifest["deltas"]) == 0:
+            return None
+
+        stale = self.chain
+        index = self._manifest["index"] + 1
+        filename = f"base_{index:06d}.pkl"
+        manifest = {"index": index, "base": filename, "deltas": []}
+        _commit(self.directory, filename,
+                {"version": self._written_version,
+                 "state": self._merged_state()}, manifest)
+        self._manifest = manifest
+        self._remove(stale)
+        return filename
+
+    def _clean(self) -> None:
+        """
+        Removes what an interrupted write left behind, staging directories and
+        checkpoints that are not part of the chain.
+        """
+        chain = set(self.chain)
+        for name in os.listdir(self.directory):
+            path = f"{self.directory}/{name}"
+            if name.startswith(_STAGING_PREFIX) and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif _CHECKPOINT_NAME.fullmatch(name) and name not in chain:
+                self._remove([name])
+
+    def _merged_state(self) -> Dict[str, Any]:
+        return _merge_chain(self.directory, self._manifest)
+
+    def _remove(self, filenames: List[str]) -> None:
+        for filename in filenames:
+            try:
+                os.remove(f"{self.directory}/{filename}")
+            except OSError as e:
+                warn(f"Failed to remove stale checkpoint {filename}. Reason: "
+                     f"{e}")
+
+
+def restore_checkpoint(directory: str, state_manager=None,
+                       update: bool = True) -> Dict[str, Any]:
+    """
+    Restores the state saved in a chain of checkpoints by replaying the base
+    and then every delta on top of it.
+
+    Args:
+        directory: the directory the checkpoints were written to
+
+        state_manager (default=None): the state manager to restore into, if
+            None the global state manager will be used
+
+        update (default=True): should the state manager be updated with the
+            restored state
+
+    Returns: The restored state
+    """
+    manifest = _read_manifest(directory)
+    if manifest is None:
+        error(f"No checkpoint manifest found in {directory}")
+
+    state = _merge_chain(directory, manifest)
+    if update:
+        (state_manager or global_state_manager).set_state(state)
+    return state
@@ -1,9 +1,11 @@
 from .compartmentMeta import CompartmentMeta
-from ngcsimlib._src.global_state.manager import global_state_manager as gState
-from ngcsimlib._src.logger import warn
+from ngcsimlib._src.global_state.manager import global_state_manager
+from ngcsimlib._src.diagnostics import diagnostics
 import ast
-from typing import TypeVar, Union, Set, Callable
-from ngcsimlib._src.operations.BaseOp import BaseOp
+from typing import TypeVar, Union, Set, Callable, Dict, Any
+from ngcsimlib._src.operations.BaseOp import BaseOp, is_constant, \
+    invalidate_ops
+from ngcsimlib._src.operations.simplify import simplify
 from ngcsimlib._src.context.context_manager import global_context_manager as gcm
 
 T = TypeVar('T')
@@ -35,16 +37,24 @@ class Compartment(metaclass=CompartmentMeta):
         auto_save (default=True): a flag for if the compartment should
             be picked up by other systems for auto saving. Not used specifically
             by simlib but adds a hook for future use.
+
+        fixed (default=False): marks the compartment as holding a constant.
+            Fixed compartments can not be set once they are set up (other
+            than through `load_value`), and compiled methods and operations
+            read their value when they are compiled instead of reading it from
+            the state every step.
     """
     def __init__(self, initial_value: T,
                  display_name: str | None = None,
                  units: str | None = None,
                  plot_method: Union[Callable, None] = None,
-                 auto_save: bool = True):
+                 auto_save: bool = True,
+                 fixed: bool = False):
 
         self._initial_value: T = initial_value
 
         self.name = None
+        self._state_manager = global_state_manager
         self._root_target = None
         self._target = self._root_target
 
@@ -52,6 +62,7 @@ class Compartment(metaclass=CompartmentMeta):
         self.units = units
         self.plot_method = plot_method
         self._auto_save = auto_save
+        self._fixed = fixed
 
     @property
     def root(self) -> str | None:
@@ -61,17 +72,24 @@ class Compartment(metaclass=CompartmentMeta):
     def auto_save(self) -> bool:
         return self._auto_save
 
+    @property
+    def fixed(self) -> bool:
+        return self._fixed
+
     @property
     def targeted(self) -> bool:
         return not isinstance(self._target, str) or (self._target != self._root_target)
 
-    def _setup(self, compName, path):
+    def _setup(self, compName, path, state_manager=None):
+        if state_manager is not None:
+            self._state_manager = state_manager
         self.name = compName
         self._root_target = path + ":" + self.name
         if self.target is None:
             self._target = self._root_target
-            self.set(self._initial_value)
-        gState.add_compartment(self)
+            self._state_manager.set_state({self._target: self._initial_value})
+        self._state_manager.add_compartment(self)
+        invalidate_ops(self._state_manager, self._root_target)
 
     def set(self, value: T) -> None:
         """
@@ -88,9 +106,44 @@ class Compartment(metaclass=CompartmentMeta):
             return
 
         if self.target != self._root_target:
-            warn(f"Attempting to set {self.target} in {self._root_target}. Aborting!")
+            if diagnostics.enabled:
+                diagnostics.report("wired-set", self._root_target,
+                                   "Attempting to set {} in {}. Aborting!",
+                                   self.target, self._root_target)
+            return
+        if self._fixed:
+            if diagnostics.enabled:
+                diagnostics.report("fixed-set", self._root_target,
+                                   "Attempting to set the fixed compartment "
+                                   "{}. Aborting!", self._root_target)
+            return
+        self._state_manager.set_state({self.target: value})
+
+    def load_value(self, value: T) -> None:
+        """
+        Sets the value of this compartment while loading or initializing a
+        model. Unlike `set` this also writes fixed compartments, and since
+        compiled methods and operations read fixed compartments when they are
+        compiled it invalidates them, so the next compile picks up the new
+        value. Like `set` it aborts if something was wired into the
+        compartment.
+
+        Args:
+            value: The value to set in the global state.
+        """
+        if self.target is None:
+            self._initial_value = value
+            return
+
+        if self.target != self._root_target:
+            if diagnostics.enabled:
+                diagnostics.report("wired-set", self._root_target,
+                                   "Attempting to set {} in {}. Aborting!",
+                                   self.target, self._root_target)
             return
-        gState.set_state({self.target: value})
+        self._state_manager.set_state({self.target: value})
+        if self._fixed:
+            invalidate_ops()
 
     def get(self) -> T:
         """
@@ -105,7 +158,37 @@ class Compartment(metaclass=CompartmentMeta):
         """
         if isinstance(self.target, BaseOp):
             return self.target.get_needed_keys()
-        return set(self.target)
+        return {self.target}
+
+    def get_needed_globals(self) -> Dict[str, Any]:
+        """
+        Returns: the names and values of the globals that the compiled value
+            of this compartment refers to
+        """
+        if isinstance(self.target, BaseOp):
+            return self.target.get_needed_globals()
+        if self.is_fixed():
+            value = self.get()
+            return {} if is_constant(value) else {self._fixed_name(): value}
+        return {}
+
+    def is_fixed(self) -> bool:
+        """
+        Returns: if the value this compartment reads is fixed, either because
+            it is a fixed compartment itself or because it is wired to one (or
+            to an operation of only fixed compartments)
+        """
+        if isinstance(self.target, BaseOp):
+            return self.target.is_fixed()
+        if not self.targeted or self.target is None:
+            return self._fixed
+        try:
+            return self._state_manager.get_compartment(self.target).fixed
+        except KeyError:
+            return False
+
+    def _fixed_name(self) -> str:
+        return "ngcsimlib_fixed_" + self.target.replace(":", "_")
 
     def _get_value(self):
         if self.target is None:
@@ -114,7 +197,7 @@ class Compartment(metaclass=CompartmentMeta):
         if isinstance(self.target, BaseOp):
             return self.target.get()
 
-        return gState.from_global_key(self.target)
+        return self._state_manager.from_global_key(self.target)
 
     def __jax_array__(self):
         return self.get()
@@ -123,6 +206,12 @@ class Compartment(metaclass=CompartmentMeta):
         return str(self._get_value())
 
     def _to_ast(self, node, ctx):
+        if isinstance(self.target, str) and isinstance(node.ctx, ast.Load) \
+                and self.is_fixed():
+            value = self.get()
+            if is_constant(value):
+                return ast.Constant(value=value)
+            return ast.Name(id=self._fixed_name(), ctx=ast.Load())
         if isinstance(self.target, str):
             return ast.Subscript(
                 value=ast.Name(id=ctx, ctx=ast.Load()),
@@ -156,7 +245,12 @@ class Compartment(metaclass=CompartmentMeta):
         Args:
             value: The value to target this compartment at.
         """
-        if isinstance(value, (str, BaseOp)):
+        invalidate_ops(self._state_manager, self._root_target)
+        if isinstance(value, BaseOp):
+            self._target = simplify(value)
+            return
+
+        if isinstance(value, str):
             self._target = value
             return
 
@@ -1,6 +1,35 @@
 import operator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Any
 
+## When set, arithmetic on compartments and operations builds expressions
+## instead of computing values, see `lazy_ops`
+_lazy = ContextVar("ngcsimlib_lazy_ops", default=False)
+
+
+@contextmanager
+def lazy_ops():
+    """
+    Within this block arithmetic on compartments and operations builds lazy
+    expressions (`Expression` operations) instead of computing their current
+    values, so `(a.out * 2 + b.out) >> c.inp` wires the transform into `c.inp`.
+    Equality and inequality still compare immediately. Lazy mode is local to
+    the current thread (and asyncio task).
+    """
+    token = _lazy.set(True)
+    try:
+        yield
+    finally:
+        _lazy.reset(token)
+
+
+def is_lazy() -> bool:
+    """
+    Returns: if arithmetic on compartments currently builds expressions
+    """
+    return _lazy.get()
+
 
 def _unwrap(x: Any) -> Any:
     while hasattr(x, "_get_value"):
@@ -28,7 +57,55 @@ _BINARY_OPS = {
     '__ge__': operator.ge,
 }
 
-_REVERSE_OPS = {f"__r{name[2:]}": op for name, op in _BINARY_OPS.items()}
+_REVERSE_OPS = {f"__r{name[2:]}": op for name, op in _BINARY_OPS.items()
+                if name not in ('__eq__', '__ne__', '__lt__', '__le__',
+                                '__gt__', '__ge__')}
+
+_UNARY_OPS = {
+    '__neg__': operator.neg,
+    '__pos__': operator.pos,
+    '__abs__': operator.abs,
+    '__invert__': operator.invert,
+}
+
+## Comparing for equality stays eager in lazy mode, as compartments are
+## compared (and looked up in containers) by the rest of the library
+_EAGER_OPS = {'__eq__', '__ne__'}
+
+
+## The numpy ufuncs that apply python operators, which build expressions of
+## those operators on compartments in lazy mode
+_UFUNC_OPERATORS = {
+    'add': 'add', 'subtract': 'sub', 'multiply': 'mul', 'matmul': 'matmul',
+    'divide': 'truediv', 'true_divide': 'truediv',
+    'floor_divide': 'floordiv', 'remainder': 'mod', 'power': 'pow',
+    'bitwise_and': 'and_', 'bitwise_xor': 'xor', 'bitwise_or': 'or_',
+    'less': 'lt', 'less_equal': 'le', 'greater': 'gt',
+    'greater_equal': 'ge', 'negative': 'neg', 'positive': 'pos',
+    'invert': 'invert',
+}
+
+
+def _array_ufunc(self, ufunc, method, *inputs, **kwargs):
+    """
+    Applies numpy ufuncs to compartments (and operations) in their place, so
+    `array + compartment` and `np.add(compartment, array)` compute with the
+    value of the compartment rather than building an array of objects. In
+    lazy mode the ufuncs of python operators build expressions like the
+    operators do, other ufuncs always compute a value.
+    """
+    name = _UFUNC_OPERATORS.get(ufunc.__name__, None)
+    if _lazy.get() and method == "__call__" and name is not None and \
+            len(kwargs) == 0:
+        return _expression(name, *inputs)
+    if "out" in kwargs:
+        kwargs["out"] = tuple(_unwrap(x) for x in kwargs["out"])
+    return getattr(ufunc, method)(*[_unwrap(x) for x in inputs], **kwargs)
+
+
+def _expression(*args):
+    from ngcsimlib._src.operations.Expression import Expression
+    return Expression(*args)
 
 class CompartmentMeta(type):
     """
@@ -38,16 +115,41 @@ class CompartmentMeta(type):
     trying to learn about compartments look at their file directly.
     """
     def __new__(mcs, name, bases, namespace):
-        def make_op(opfunc):
+        def make_op(opfunc, lazy):
             def method(self, other):
+                if lazy and _lazy.get():
+                    return _expression(opfunc.__name__, self, other)
                 return opfunc(_unwrap(self), _unwrap(other))
             return method
 
+        def make_reverse_op(opfunc):
+            def method(self, other):
+                if _lazy.get():
+                    return _expression(opfunc.__name__, other, self)
+                return opfunc(_unwrap(other), _unwrap(self))
+            return method
+
+        def make_unary_op(opfunc):
+            def method(self):
+                if _lazy.get():
+                    return _expression(opfunc.__name__, self)
+                return opfunc(_unwrap(self))
+            return method
+
         for dunder_name, opfunc in _BINARY_OPS.items():
             if dunder_name not in namespace:
-                namespace[dunder_name] = make_op(opfunc)
+                namespace[dunder_name] = make_op(
+                    opfunc, dunder_name not in _EAGER_OPS)
 
         for dunder_name, opfunc in _REVERSE_OPS.items():
             if dunder_name not in namespace:
-                namespace[dunder_name] = make_op(opfunc)
+                namespace[dunder_name] = make_reverse_op(opfunc)
+
+        for dunder_name, opfunc in _UNARY_OPS.items():
+            if dunder_name not in namespace:
+                namespace[dunder_name] = make_unary_op(opfunc)
+
+        ## Makes numpy arrays compute with the value of the compartment instead
+        ## of applying the operator to every element of the array separately
+        namespace.setdefault('__array_ufunc__', _array_ufunc)
         return super().__new__(mcs, name, bases, namespace)
\ No newline at end of file
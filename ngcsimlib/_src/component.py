@@ -21,6 +21,16 @@ class Component(ContextAwareObject):
         """
         It is expected that components will have compartments, and this allows
         for easy iteration over all the compartments in a component.
+        Compartments held in a list or tuple are included as well, named by
+        their attribute and index (`branches_0`, `branches_1`, ...), so
+        compiled methods can loop over them.
         Returns: a list of compartments found on this component
         """
-        return [(n, v) for n, v in vars(self).items() if isinstance(v, Compartment)]
+        compartments = []
+        for n, v in vars(self).items():
+            if isinstance(v, Compartment):
+                compartments.append((n, v))
+            elif isinstance(v, (list, tuple)):
+                compartments.extend((f"{n}_{i}", c) for i, c in enumerate(v)
+                                    if isinstance(c, Compartment))
+        return compartments
@@ -1,15 +1,23 @@
 import json
-from typing import TYPE_CHECKING, List, Dict, Union, Tuple
+from typing import TYPE_CHECKING, List, Dict, Union, Tuple, Any
 from .context_manager import global_context_manager as gcm
-from ngcsimlib.logger import warn
+from ngcsimlib._src.logger import warn
+from ngcsimlib._src.diagnostics import diagnostics
 from ngcsimlib._src.utils.io import make_unique_path, make_safe_filename
+from ngcsimlib._src.utils.archive import (
+    ModelArchiveWriter, open_model, ARCHIVE_EXTENSION
+)
 from ngcsimlib._src.modules.modules_manager import modules_manager as modManager
 from ngcsimlib._src.operations.BaseOp import BaseOp
+from ngcsimlib._src.operations.simplify import simplify
 
-from ngcsimlib._src.global_state.manager import global_state_manager
+from ngcsimlib._src.global_state.manager import StateManager
 
 from enum import Enum
-import os, shutil
+import os, shutil, tempfile, uuid
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 
 from ngcsimlib._src.compartment.compartment import Compartment
 
@@ -39,38 +47,56 @@ class Context(object):
     objects in the correct order (based on compile priority) when leaving the
     with block. This means that in order to use any of the compiled methods or
     processes defined the with block must first be left.
+
+    Every context is bound to a state manager that holds the values of all the
+    compartments built inside of it. Nested contexts share the state manager of
+    the context they are built in. Contexts are looked up by both their path
+    and their state manager, so making a context with the name of an existing
+    one returns the existing context only if it is bound to the same state
+    manager.
+
+    Args:
+        name: the name of the context
+
+        state_manager (default=None): the state manager to bind to, if None the
+            state manager of the enclosing context is used, or the global state
+            manager if there is no enclosing context
     """
 
-    def __new__(cls, name: str, *args, **kwargs):
+    def __new__(cls, name: str,
+                state_manager: Union[StateManager, None] = None):
         targetPath = gcm.append_path(addition=name)
-        if gcm.exists(targetPath):
-            return gcm.get_context(targetPath)
-        instance = super().__new__(cls)
-        gcm.register_context_local(name, instance)
-        instance.path = targetPath
-        instance.__previous_path = None
+        if state_manager is None:
+            state_manager = gcm.current_state_manager
+        with gcm.lock:
+            if gcm.exists(targetPath, state_manager):
+                return gcm.get_context(targetPath, state_manager)
+            instance = super().__new__(cls)
+            instance.path = targetPath
+            instance.state_manager = state_manager
+            gcm.register_context_local(name, instance)
 
         return instance
 
-    def __init__(self, name: str):
-        if hasattr(self, "_initialized"):
-            return
-        else:
+    def __init__(self, name: str,
+                 state_manager: Union[StateManager, None] = None):
+        with gcm.lock:
+            if hasattr(self, "_initialized"):
+                return
+            self.name = name
+            self.objects = {}
+            self._connections: Dict[str: Union["Compartment", "BaseOp"]] = {}
             self._initialized = True
 
-        self.name = name
-        self.objects = {}
-        self._connections: Dict[str: Union["Compartment", "BaseOp"]] = {}
-
     def __enter__(self):
-        self.__previous_path = gcm.current_path
-        gcm.step_to(self.path)
+        gcm.enter(self.path, self.state_manager)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.recompile()
-        gcm.step_to(self.__previous_path)
-        self.__previous_path = None
+        try:
+            self.recompile()
+        finally:
+            gcm.exit()
 
     def recompile(self) -> None:
         """
@@ -102,6 +128,9 @@ class Context(object):
             for obj in priorities[key]:
                 obj.compile()
 
+        if diagnostics.enabled:
+            diagnostics.log_summary()
+
     def registerObj(self, obj: "ContextAwareObjectMeta") -> bool:
         """
         Registers an object in the context. The context automatically sorts the
@@ -213,6 +242,8 @@ class Context(object):
                 warn(
                     f"Could not find an {objectType} with the name \"{name}\" in the context")
 
+        ensure_loaded(*(obj for obj in _objs if obj is not None))
+
         if len(_objs) == 1 and unwrap:
             return _objs[0]
         return _objs
@@ -225,6 +256,8 @@ class Context(object):
                                 unwrap=unwrap)
 
     def add_connection(self, source: Union["Compartment", "BaseOp"], destination: "Compartment"):
+        if isinstance(source, BaseOp):
+            source = simplify(source)
         self._connections[destination.root] = source
 
     def save_to_json(self, directory: str, model_name: Union[str, None] = None,
@@ -260,97 +293,467 @@ class Context(object):
 
         path = make_unique_path(directory, model_name)
 
-        contextMeta = {"types": list(self.objects.keys()),
-                       "path": self.path}
-
         with open(f"{path}/contextData.json", "w") as f:
-            f.write(json.dumps(contextMeta, indent=4))
+            f.write(json.dumps(self._context_data(), indent=4))
 
         for _type in self.objects.keys():
             type_path = f"{path}/{make_safe_filename(_type)}"
             os.mkdir(type_path)
 
-            _objs = self.get_objects_by_type(_type)
+            data = self._save_type(_type, type_path + "/custom" if custom_save
+                                   else None)
 
-            made_custom = False
-            data = {}
+            with open(f"{type_path}/roots.json", "w") as fp:
+                json.dump(data, fp, indent=4)
 
-            for obj_name, obj in _objs.items():
-                objData = {}
-                if hasattr(obj, "to_json") and callable(
-                    getattr(obj, "to_json")):
-                    objData.update(obj.to_json())
+        with open(f"{path}/connections.json", "w") as fp:
+            json.dump(self._connection_data(), fp, indent=4)
 
-                objData["modulePath"] = modManager.resolve_public_import(obj)
+    def save_to_archive(self, directory: str,
+                        model_name: Union[str, None] = None,
+                        custom_save: bool = True,
+                        overwrite: bool = False) -> str:
+        """
+        Saves the context to a single file archive. This holds the same data as
+        `save_to_json` but the metadata is stored as compact JSON and the
+        custom data as binary entries in one file, with an index at the end of
+        the file so loading only needs to read the entries it uses. The archive
+        can be loaded with `Context.load` in the same way a directory can.
 
-                data[obj_name] = objData
+        Args:
+            directory: The directory to save the archive to
+            model_name: The model name to save the context to if none will use
+                the context's name
+            custom_save: Should this context call the custom save methods on
+                each object in the context.
+            overwrite: Should this context overwrite a previously saved archive
+                if no it will append a uuid to the end of the model to ensure it
+                doesn't overwrite.
 
-                if custom_save:
-                    if hasattr(obj, "save") and callable(getattr(obj, "save")):
-                        if not made_custom:
-                            os.mkdir(type_path + "/custom")
-                            made_custom = True
-                        obj.save(type_path + "/custom")
+        Returns: The path to the saved archive
+        """
+        if model_name is None:
+            model_name = self.name
+        model_name = make_safe_filename(model_name)
 
-            with open(f"{type_path}/roots.json", "w") as fp:
-                json.dump(data, fp, indent=4)
+        path = f"{directory}/{model_name}{ARCHIVE_EXTENSION}"
+        if not overwrite and os.path.exists(path):
+            model_name += "_" + str(uuid.uuid4())
+            warn("archive already exists, generated archive will be named \""
+                 + model_name + ARCHIVE_EXTENSION + "\"")
+            path = f"{directory}/{model_name}{ARCHIVE_EXTENSION}"
+
+        with ModelArchiveWriter(path) as archive:
+            archive.write_json("contextData.json", self._context_data())
+
+            for _type in self.objects.keys():
+                type_name = make_safe_filename(_type)
+                with tempfile.TemporaryDirectory() as custom_path:
+                    data = self._save_type(_type, custom_path if custom_save
+                                           else None)
+                    archive.write_json(f"{type_name}/roots.json", data)
+                    archive.write_directory(f"{type_name}/custom",
+                                            custom_path)
+
+            archive.write_json("connections.json", self._connection_data())
+
+        return path
+
+    async def save_async(self, directory: str,
+                         model_name: Union[str, None] = None,
+                         archive: bool = False, executor=None,
+                         **kwargs) -> Any:
+        """
+        Awaitable version of `save_to_json`, or `save_to_archive` if `archive`
+        is set. The save runs on an executor so the event loop is not blocked,
+        and no awaitable run against this context's state manager can apply a
+        new state while it is saving.
+
+        Args:
+            directory: The directory to save the context to
+            model_name: The model name to save the context to if none will use
+                the context's name
+            archive (default=False): Should the context be saved as a single
+                file archive
+            executor (default=None): the executor to save on, if None the event
+                loop's default executor is used
+            **kwargs: passed on to the save method
 
+        Returns: whatever the save method returns
+        """
+        from ngcsimlib._src.process.asyncRunner import save_async
+        return await save_async(self, directory, model_name, archive=archive,
+                                executor=executor, **kwargs)
+
+    def _context_data(self) -> Dict[str, Any]:
+        return {"types": list(self.objects.keys()),
+                "path": self.path}
+
+    def _save_type(self, _type: str, custom_path: Union[str, None]) -> \
+            Dict[str, Any]:
+        data = {}
+        for obj_name, obj in self.get_objects_by_type(_type).items():
+            objData = {}
+            if hasattr(obj, "to_json") and callable(getattr(obj, "to_json")):
+                objData.update(obj.to_json())
+
+            objData["modulePath"] = modManager.resolve_public_import(obj)
+
+            data[obj_name] = objData
+
+            if custom_path is not None:
+                if hasattr(obj, "save") and callable(getattr(obj, "save")):
+                    os.makedirs(custom_path, exist_ok=True)
+                    obj.save(custom_path)
+        return data
+
+    def _connection_data(self) -> Dict[str, Any]:
         connections = {}
         for connectionRoot, source in self._connections.items():
             if isinstance(source, Compartment):
                 connections[connectionRoot] = source.target
             else:
                 connections[connectionRoot] = source.to_json()
-
-        with open(f"{path}/connections.json", "w") as fp:
-            json.dump(connections, fp, indent=4)
+        return connections
 
     @classmethod
-    def load(cls, directory: str, module_name: str) -> "Context":
-        if gcm.exists(gcm.append_path(module_name)):
+    def load(cls, directory: str, module_name: str,
+             components: Union[List[str], None] = None,
+             types: Union[List[Union[str, ContextObjectTypes]], None] = None,
+             processes: Union[List[str], None] = None,
+             lazy: bool = False,
+             workers: Union[int, None] = None,
+             state_manager: Union[StateManager, None] = None) -> "Context":
+        """
+        Loads a context saved with either `save_to_json` or `save_to_archive`.
+        By default, every object saved is loaded, but it is possible to only
+        load part of the context by providing any of the filters below. When
+        filters are provided only the selected objects are constructed and only
+        the connections between them are rebuilt.
+
+        Args:
+            directory: The directory the context was saved in
+            module_name: The name of the saved model, for archives the file
+                extension is optional
+            components (default=None): The names of components to load
+            types (default=None): The object types to load every object of,
+                processes selected this way are loaded along with everything
+                they need to run (see `processes`)
+            processes (default=None): The names of processes to load, along with
+                everything they need to run. This includes the components they
+                call, the processes they are made of, the components that own
+                their watched compartments, and every component wired into
+                those components.
+            lazy (default=False): Should calls to the custom load methods be
+                deferred until the object is first touched, either by being
+                retrieved from the context or by a process that uses it being
+                run. See `load_deferred` to force them.
+            workers (default=None): The number of threads to use for reading
+                the saved data and running the custom load methods. Objects are
+                still constructed and passed their data in order, and every
+                custom load method of a priority finishes before any object of
+                a lower priority is loaded. If None or 1 everything is loaded
+                on the calling thread.
+            state_manager (default=None): The state manager to bind the loaded
+                context to, if None the state manager of the enclosing context
+                is used, or the global state manager if there is no enclosing
+                context
+
+        Returns: The loaded context
+        """
+        if module_name.endswith(ARCHIVE_EXTENSION):
+            module_name = module_name[:-len(ARCHIVE_EXTENSION)]
+
+        if gcm.exists(gcm.append_path(module_name), state_manager):
             warn("Trying to load a context that already exists, returning "
                  "existing context")
-            return gcm.get_context(gcm.append_path(module_name))
-
-        path = directory + "/" + module_name
-        with open(f"{path}/contextData.json", "r") as f:
-            metaData = json.load(f)
+            return gcm.get_context(gcm.append_path(module_name), state_manager)
+
+        model = open_model(directory, module_name)
+        deferred = _DeferredLoads(model) if lazy else None
+        pool = ThreadPoolExecutor(max_workers=workers,
+                                  thread_name_prefix="ngcsimlib-load") \
+            if workers is not None and workers > 1 else None
+        try:
+            return cls._load(model, module_name, deferred, pool, components,
+                             types, processes, state_manager)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+            if deferred is None or deferred.pending == 0:
+                model.close()
 
-        with cls(metaData.get("path", module_name)) as ctx:
+    @classmethod
+    def _load(cls, model, module_name: str, deferred, pool, components, types,
+              processes, state_manager) -> "Context":
+        metaData = model.read_json("contextData.json")
+        contextPath = metaData.get("path", module_name)
+
+        names = [f"{make_safe_filename(_type)}/roots.json"
+                 for _type in metaData["types"]] + ["connections.json"]
+        data = list(map(model.read_json, names)) if pool is None \
+            else list(pool.map(model.read_json, names))
+        roots = dict(zip(metaData["types"], data[:-1]))
+        connectionData = data[-1]
+
+        selected = _select_objects(contextPath, roots, connectionData,
+                                   components, types, processes)
+
+        with cls(contextPath, state_manager=state_manager) as ctx:
             delayed_load = []
+            klasses = {}
 
-            for _type in metaData["types"]:
-
-                type_path = f"{path}/{make_safe_filename(_type)}"
-                with open(f"{type_path}/roots.json", "r") as fp:
-                    typeRoots = json.load(fp)
+            for _type, typeRoots in roots.items():
+                type_name = make_safe_filename(_type)
 
                 for obj_name, objData in typeRoots.items():
-                    objKlass = modManager.import_module(objData["modulePath"])
+                    if selected is not None and \
+                            obj_name not in selected.get(_type, ()):
+                        continue
+                    modulePath = objData["modulePath"]
+                    if modulePath not in klasses:
+                        klasses[modulePath] = modManager.import_module(
+                            modulePath)
+                    objKlass = klasses[modulePath]
                     args = objData["args"]
                     kwargs = objData["kwargs"]
                     newObj = objKlass(*args, **kwargs)
                     delayed_load.append((
                         getattr(newObj, "_priority", 0), newObj,
-                        objData, type_path))
+                        objData, type_name))
 
             delayed_load = sorted(delayed_load, key=lambda x: x[0],
                                   reverse=True)
-            for _, obj, data, type_path in delayed_load:
+            pending = []
+            current_priority = None
+            for p, obj, data, type_name in delayed_load:
+                if p != current_priority:
+                    _wait_all(pending)
+                    current_priority = p
+
                 if hasattr(obj, "from_json") and callable(
                     getattr(obj, "from_json")):
                     obj.from_json(data)
 
                 if hasattr(obj, "load") and callable(getattr(obj, "load")):
-                    obj.load(f"{type_path}/custom")
-
-            with open(f"{path}/connections.json", "r") as fp:
-                connectionData = json.load(fp)
-                for connectionRoot, target in connectionData.items():
-                    dest = global_state_manager.get_compartment(connectionRoot)
-                    if isinstance(target, str):
-                        dest.target = target
+                    if deferred is not None:
+                        deferred.defer(obj, f"{type_name}/custom")
+                    elif pool is not None:
+                        ## Custom loads see the same context path and state
+                        ## manager on the pool as on this thread
+                        pending.append(pool.submit(
+                            contextvars.copy_context().run, _load_custom,
+                            obj, model, f"{type_name}/custom"))
                     else:
-                        dest.target = BaseOp.load_op(target)
+                        _load_custom(obj, model, f"{type_name}/custom")
+            _wait_all(pending)
+
+            loadedComponents = None if selected is None else \
+                selected.get(ContextObjectTypes.component.value, set())
+            for connectionRoot, target in connectionData.items():
+                if loadedComponents is not None and any(
+                    _owner(contextPath, root) not in loadedComponents
+                    for root in [connectionRoot, *_connection_roots(target)]):
+                    continue
+
+                dest = ctx.state_manager.get_compartment(connectionRoot)
+                if isinstance(target, str):
+                    dest.target = target
+                else:
+                    dest.target = BaseOp.load_op(target, ctx.state_manager)
 
         return ctx
+
+    def load_deferred(self) -> None:
+        """
+        Calls every custom load method that was deferred by loading this
+        context lazily.
+        """
+        for _type in self.objects.keys():
+            ensure_loaded(*self.get_objects_by_type(_type).values())
+
+
+class _DeferredLoads:
+    """
+    Tracks the custom load methods deferred by a lazy load, keeping the saved
+    model open until the last one of them has been called.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def defer(self, obj, prefix: str) -> None:
+        with self._lock:
+            self.pending += 1
+
+        def _load():
+            try:
+                obj.load(self.model.custom_path(prefix))
+            finally:
+                ## Deferred loads can be triggered from any thread
+                with self._lock:
+                    self.pending -= 1
+                    done = self.pending == 0
+                if done:
+                    self.model.close()
+
+        obj._deferred_load = _load
+
+
+def _load_custom(obj, model, prefix: str) -> None:
+    obj.load(model.custom_path(prefix))
+
+
+def _wait_all(futures: List[Future]) -> None:
+    try:
+        for future in futures:
+            future.result()
+    finally:
+        futures.clear()
+
+
+def ensure_loaded(*objs) -> None:
+    """
+    Calls the deferred custom load method of each of the given objects, if it
+    has one that has not been called yet.
+
+    Args:
+        *objs: the objects to load
+    """
+    for obj in objs:
+        ## Popped in one step so that only one thread calls the loader
+        loader = vars(obj).pop("_deferred_load", None)
+        if loader is not None:
+            loader()
+
+
+def ensure_dependencies_loaded(objs, compartments=(),
+                               state_manager: Union[StateManager, None] = None
+                               ) -> None:
+    """
+    Calls the deferred custom load methods of the given objects and of every
+    component they depend on. A component depends on the owners of the
+    compartments its compartments are wired to, and so on transitively, and
+    the owners of the given compartments (e.g., the compartments watched by a
+    process) are included as well.
+
+    Args:
+        objs: the objects to load
+
+        compartments (default=()): compartments whose owners should be loaded
+
+        state_manager (default=None): the state manager the objects are bound
+            to, if None the current state manager is used
+    """
+    state_manager = state_manager or gcm.current_state_manager
+    stack = list(objs)
+    for comp in compartments:
+        stack.extend(_owners(comp, state_manager))
+
+    seen = set()
+    while len(stack) > 0:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        ensure_loaded(obj)
+        for _, comp in getattr(obj, "compartments", []):
+            stack.extend(_owners(comp, state_manager))
+
+
+def _owners(compartment, state_manager: StateManager) -> List[Any]:
+    owners = []
+    for key in compartment.get_needed_keys():
+        if not isinstance(key, str) or ":" not in key:
+            continue
+        ownerPath = key.rsplit(":", 1)[0]
+        contextPath, _, name = ownerPath.rpartition(":")
+        ctx = gcm.get_context(contextPath, state_manager) \
+            if contextPath != "" else None
+        if ctx is None:
+            continue
+        owner = ctx.get_objects_by_type(ContextObjectTypes.component).get(
+            name, None)
+        if owner is not None:
+            owners.append(owner)
+    return owners
+
+
+def _owner(contextPath: str, root: str) -> Union[str, None]:
+    ownerPath = root.rsplit(":", 1)[0]
+    if not ownerPath.startswith(contextPath + ":"):
+        return None
+    return ownerPath[len(contextPath) + 1:]
+
+
+def _connection_roots(target: Union[str, Dict[str, Any]]) -> List[str]:
+    if isinstance(target, str):
+        return [target]
+    roots = []
+    for comp in target.get("compartments", []):
+        roots.extend(_connection_roots(comp))
+    return roots
+
+
+def _select_objects(contextPath: str, roots: Dict[str, Dict[str, Any]],
+                    connections: Dict[str, Any], components, types,
+                    processes) -> Union[Dict[str, set], None]:
+    if components is None and types is None and processes is None:
+        return None
+
+    componentType = ContextObjectTypes.component.value
+    processType = ContextObjectTypes.process.value
+    selected = {_type: set() for _type in roots.keys()}
+    selected.setdefault(componentType, set())
+    selected.setdefault(processType, set())
+
+    for _type in types or []:
+        _type = _type.value if isinstance(_type, ContextObjectTypes) else _type
+        selected.setdefault(_type, set()).update(roots.get(_type, {}).keys())
+
+    needed = set(components or [])
+
+    ## Processes selected by type need everything they run as well
+    processRoots = roots.get(processType, {})
+    required = set()
+    visited = set()
+    stack = list(processes or []) + list(selected[processType])
+    while len(stack) > 0:
+        name = stack.pop()
+        if name in visited:
+            continue
+        visited.add(name)
+        if name not in processRoots:
+            warn(f"Could not find a process with the name \"{name}\" in the "
+                 f"saved context")
+            continue
+        selected[processType].add(name)
+        data = processRoots[name]
+        required.update(step["name"] for step in data.get("method_order", []))
+        required.update(_owner(contextPath, root)
+                        for root in data.get("watch_list", []))
+        stack.extend(data.get("process_order", []))
+
+    sources = {}
+    for dest, target in connections.items():
+        sources.setdefault(_owner(contextPath, dest), set()).update(
+            _owner(contextPath, root) for root in _connection_roots(target))
+
+    stack = list(required)
+    while len(stack) > 0:
+        for source in sources.get(stack.pop(), ()):
+            if source is not None and source not in required:
+                required.add(source)
+                stack.append(source)
+
+    needed.update(n for n in required if n is not None)
+    componentRoots = roots.get(componentType, {})
+    for name in needed:
+        if name not in componentRoots:
+            warn(f"Could not find a component with the name \"{name}\" in the "
+                 f"saved context")
+            continue
+        selected[componentType].add(name)
+
+    return selected
@@ -1,6 +1,6 @@
 import inspect
 
-from ngcsimlib.logger import error, warn
+from ngcsimlib._src.logger import error, warn
 from .context_manager import global_context_manager as gcm
 from collections.abc import Iterable
 
@@ -48,6 +48,7 @@ class ContextAwareObjectMeta(type):
     def __call__(cls, *args, **kwargs):
         obj = cls.__new__(cls, *args, **kwargs)
         obj._inferred_name = extract_name(cls, args, kwargs)
+        obj._state_manager = gcm.current_state_manager
 
         with obj:
             cls.__init__(obj, *args, **kwargs)
@@ -62,7 +63,8 @@ class ContextAwareObjectMeta(type):
             if hasattr(obj, "compartments") and isinstance(obj.compartments, Iterable) and not isinstance(obj.compartments, (str, bytes)):
                 for (comp_name, comp) in obj.compartments:
                     if hasattr(comp, "_setup") and callable(comp._setup):
-                        comp._setup(comp_name, gcm.current_path)
+                        comp._setup(comp_name, gcm.current_path,
+                                    obj._state_manager)
 
         contextRef = gcm.current_context
         if contextRef is not None:
@@ -1,24 +1,68 @@
-from ngcsimlib.logger import warn, info
-from typing import Union, List, Dict, TYPE_CHECKING
+from ngcsimlib._src.logger import warn, info
+from ngcsimlib._src.global_state.manager import global_state_manager
+from typing import Union, List, Dict, Tuple, TYPE_CHECKING
+from contextvars import ContextVar
+import threading
 
 if TYPE_CHECKING:
     from .context import Context
+    from ngcsimlib._src.global_state.manager import StateManager
 
 Path = Union[List[str], str, None]
 
 class __context_manager:
+    """
+    The registry of contexts is shared by every thread and guarded by a lock,
+    while the current path and state manager (and the ones to return to when
+    leaving a context) are kept in context variables. This means every thread,
+    and every asyncio task, builds its models on its own path and many models
+    can be built at the same time.
+
+    Contexts are registered by both their path and the state manager they are
+    bound to, so models with the same name can live side by side as long as
+    they are bound to different state managers. Lookups by path use the current
+    state manager unless one is provided.
+    """
     def __init__(self, seperator: str = ":"):
-        self.__contexts: Dict[str, "Context"] = {}
-        self.__current_path: List[str] = []
+        self.__contexts: Dict[Tuple["StateManager", str], "Context"] = {}
+        self.__lock = threading.RLock()
+        self.__path: ContextVar[Tuple[str, ...]] = \
+            ContextVar("ngcsimlib_context_path", default=())
+        self.__state_manager: ContextVar["StateManager"] = \
+            ContextVar("ngcsimlib_state_manager", default=global_state_manager)
+        self.__previous_paths: ContextVar[
+            Tuple[Tuple[Tuple[str, ...], "StateManager"], ...]] = \
+            ContextVar("ngcsimlib_previous_context_paths", default=())
         self.__seperator: str = seperator
 
+    @property
+    def __current_path(self) -> Tuple[str, ...]:
+        return self.__path.get()
+
+    @property
+    def lock(self) -> threading.RLock:
+        """
+        Returns: The lock guarding the registry of contexts, hold it to make a
+            lookup followed by a registration atomic
+        """
+        return self.__lock
+
     @property
     def current_context(self) -> Union["Context", None]:
         """
         Returns: The context found at the current path, or none if there is no
             existing context.
         """
-        return self.__contexts.get(self.join_path(), None)
+        return self.__contexts.get(
+            (self.current_state_manager, self.join_path()), None)
+
+    @property
+    def current_state_manager(self) -> "StateManager":
+        """
+        Returns: The state manager of the context most recently entered, or the
+            global state manager if no context has been entered
+        """
+        return self.__state_manager.get()
 
     @property
     def current_location(self) -> str:
@@ -42,7 +86,8 @@ class __context_manager:
         Clears all the current context. Do not call this unless you know what
         you are doing.
         """
-        self.__contexts.clear()
+        with self.__lock:
+            self.__contexts.clear()
 
     def step(self, location: str, catch_empty=True) -> bool:
         """
@@ -55,7 +100,7 @@ class __context_manager:
         still step either way)
 
         """
-        self.__current_path.append(location)
+        self.__path.set(self.__current_path + (location,))
         if self.exists() or not catch_empty:
             return True
         warn(f"Stepping into a context path that does not have an associated "
@@ -69,7 +114,7 @@ class __context_manager:
         """
         if len(self.__current_path) == 0:
             return False
-        self.__current_path.pop()
+        self.__path.set(self.__current_path[:-1])
         return True
 
     def step_to(self, path: Path) -> bool:
@@ -82,31 +127,76 @@ class __context_manager:
         still step either way)
         """
 
-        _path = self.split_path(path)
-        self.__current_path[:] = _path.copy()
+        self.__path.set(tuple(self.split_path(path)))
         if self.exists():
             return True
         warn(f"Stepping into a context path that does not have an associated "
              f"context ({self.join_path()}).")
         return True
 
-    def get_context(self, path: Path) -> Union["Context", None]:
+    def enter(self, path: Path,
+              state_manager: Union["StateManager", None] = None) -> bool:
+        """
+        Steps to a specific path in the hierarchy of contexts, remembering the
+        current path and state manager so that `exit` can return to them.
+
+        Args:
+            path: The path to step to
+
+            state_manager (default: None): The state manager to make current,
+                if None the current one is kept
+
+        Returns: if there is a registered context at the path stepped into (it
+        will still step either way)
+        """
+        self.__previous_paths.set(
+            self.__previous_paths.get() +
+            ((self.__current_path, self.current_state_manager),))
+        if state_manager is not None:
+            self.__state_manager.set(state_manager)
+        return self.step_to(path)
+
+    def exit(self) -> bool:
+        """
+        Returns to the path and state manager that were current before the
+        matching call to `enter`.
+
+        Returns: if there was a path to return to
+        """
+        previous = self.__previous_paths.get()
+        if len(previous) == 0:
+            return False
+        self.__previous_paths.set(previous[:-1])
+        path, state_manager = previous[-1]
+        self.__path.set(path)
+        self.__state_manager.set(state_manager)
+        return True
+
+    def get_context(self, path: Path,
+                    state_manager: Union["StateManager", None] = None) -> \
+            Union["Context", None]:
         """
         Args:
             path (default: None): The path to look for the context, will look at
             the current path if no path is provided
+            state_manager (default: None): The state manager the context is
+            bound to, will use the current state manager if none is provided
 
         Returns: the context at the proved path if it exists, otherwise None
         """
 
         path = self.join_path(path)
-        return self.__contexts.get(path, None)
+        return self.__contexts.get(
+            (state_manager or self.current_state_manager, path), None)
 
-    def exists(self, path: Path = None) -> bool:
+    def exists(self, path: Path = None,
+               state_manager: Union["StateManager", None] = None) -> bool:
         """
         Checks if a path exists in the hierarchy of contexts
         Args:
             path: the path to check, if none checks the current path
+            state_manager (default: None): the state manager the context is
+            bound to, if none checks the current state manager
 
         Returns: True if a context exists at the provided path, False otherwise
 
@@ -115,7 +205,8 @@ class __context_manager:
         _path = self.join_path(_path)
         if _path == "":
             return True
-        return _path in self.__contexts.keys()
+        return (state_manager or self.current_state_manager, _path) in \
+            self.__contexts.keys()
 
     def join_path(self, path: Path = None) -> str:
         """
@@ -142,9 +233,9 @@ class __context_manager:
         Returns: The split path
         """
         if path is None:
-            return self.__current_path
-        if isinstance(path, list):
-            return path
+            return list(self.__current_path)
+        if isinstance(path, (list, tuple)):
+            return list(path)
         return path.split(self.__seperator)
 
     def append_path(self, rootPath: Path = None, addition: Path = None) -> str:
@@ -164,7 +255,7 @@ class __context_manager:
 
         _path = self.join_path(rootPath)
 
-        if isinstance(addition, list):
+        if isinstance(addition, (list, tuple)):
             if _path == "":
                 return self.join_path(addition)
             return self.join_path(rootPath) + self.__seperator + self.join_path(addition)
@@ -178,7 +269,8 @@ class __context_manager:
         Registers a context to the set of global contexts starting from the root
         Args:
             path: The path to register the context under
-            context: The context to register
+            context: The context to register, it is registered under the state
+            manager it is bound to
             overwrite (default: False): Should this overwrite a context if one
             already exists at that path, will throw a warning either way.
 
@@ -186,15 +278,19 @@ class __context_manager:
         """
 
         _path = self.join_path(path)
-        if self.exists(_path) and not overwrite:
-            warn(f"Attempted to overwrite existing context at path ({_path}). "
-                 f"Aborting!")
-            return False
-
-        if self.exists(_path):
-            warn(f"Overwriting existing context at path ({_path}).")
-
-        self.__contexts[path] = context
+        state_manager = getattr(context, "state_manager", None) or \
+            self.current_state_manager
+        with self.__lock:
+            if self.exists(_path, state_manager) and not overwrite:
+                warn(f"Attempted to overwrite existing context at path "
+                     f"({_path}). Aborting!")
+                return False
+
+            if self.exists(_path, state_manager):
+                warn(f"Overwriting existing context at path ({_path}).")
+
+            self.__contexts[(state_manager, _path)] = context
+            return True
 
     def register_context_local(self, local_path: Path, context: "Context",
                                overwrite: bool = True) -> bool:
@@ -212,23 +308,27 @@ class __context_manager:
         """
         return self.register_context(self.append_path(None, local_path), context, overwrite)
 
-    def remove_context(self, path: Path):
+    def remove_context(self, path: Path,
+                       state_manager: Union["StateManager", None] = None):
         """
         Unregisters a context to the set of global contexts at the given path
         Args:
             path: The path to unregister the context under
+            state_manager (default: None): The state manager the context is
+            bound to, if none the current state manager is used
 
         Returns: if a context was successfully unregistered
 
         """
         _path = self.join_path(path)
-        if self.exists(_path):
-            info(f"Unregistering context at path ({_path}).")
-            del self.__contexts[_path]
-            return True
-        else:
-            warn(f"Trying to unregister context at path ({_path}), "
-                 f"but no context was found.")
-            return False
+        state_manager = state_manager or self.current_state_manager
+        with self.__lock:
+            if self.exists(_path, state_manager):
+                info(f"Unregistering context at path ({_path}).")
+                del self.__contexts[(state_manager, _path)]
+                return True
+        warn(f"Trying to unregister context at path ({_path}), "
+             f"but no context was found.")
+        return False
 
 global_context_manager = __context_manager()
@@ -1,15 +1,18 @@
-from ngcsimlib._src.logger import warn
+from ngcsimlib._src.diagnostics import diagnostics
 
 
 def deprecated(replaced_by=None): ## function deprecating decorator
     def decorator(fn):
+        message = "is deprecated" ## <= default warning message
+        if replaced_by: ## make known substitute function name, if replaced_by != None
+            ## uses __name__ or string representation
+            new_name = getattr(replaced_by, '__name__', str(replaced_by))
+            message += f" (use {new_name} instead)"
+
         def _wrapped(*args, **kwargs):
-            message = "is deprecated" ## <= default warning message
-            if replaced_by: ## make known substitute function name, if replaced_by != None
-                ## uses __name__ or string representation
-                new_name = getattr(replaced_by, '__name__', str(replaced_by))
-                message += f" (use {new_name} instead)"
-            warn(fn.__qualname__, message)
+            if diagnostics.enabled:
+                diagnostics.report("deprecated", fn.__qualname__, "{} {}",
+                                   fn.__qualname__, message)
             return fn(*args, **kwargs)
         _wrapped._is_deprecated = True
         _wrapped._original = fn 
@@ -23,10 +26,17 @@ def deprecate_args(_rebind=True, **arg_list): ## argument deprecating decorator
             for kwarg in list(kwargs.keys()):
                 if kwarg in arg_list.keys():
                     new_kwarg = arg_list[kwarg]
-                    if new_kwarg is None:
-                        warn(f"The argument \"{kwarg}\" is deprecated for {fn.__qualname__}, and will no longer be supported")
-                    else:
-                        warn(f"The argument \"{kwarg}\" is deprecated for {fn.__qualname__}, use \"{new_kwarg}\" instead")
+                    if diagnostics.enabled and new_kwarg is None:
+                        diagnostics.report(
+                            "deprecated-arg", (fn.__qualname__, kwarg),
+                            "The argument \"{}\" is deprecated for {}, and "
+                            "will no longer be supported", kwarg,
+                            fn.__qualname__)
+                    elif diagnostics.enabled:
+                        diagnostics.report(
+                            "deprecated-arg", (fn.__qualname__, kwarg),
+                            "The argument \"{}\" is deprecated for {}, use "
+                            "\"{}\" instead", kwarg, fn.__qualname__, new_kwarg)
 
                     if _rebind:
                         if new_kwarg is not None:
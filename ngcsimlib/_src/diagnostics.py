@@ -0,0 +1,163 @@
+"""
+Diagnostics are warnings raised from hot paths (compiling, setting compartments,
+calling deprecated methods) that can fire thousands of times on large models.
+Rather than formatting and logging every one of them, they are reported to a
+collector that deduplicates them by code and site, only formats them when they
+are actually logged, limits how many of each code are logged, and summarizes the
+rest on request (contexts do this at the end of every recompile).
+"""
+import logging
+import threading
+from typing import Dict, Tuple, Any, List
+
+from ngcsimlib._src.configManager import get_config
+from ngcsimlib._src.logger import _ngclogger
+
+
+class _Diagnostic:
+    __slots__ = ("code", "site", "fmt", "args", "count", "summarized")
+
+    def __init__(self, code: str, site: Any, fmt: str, args: Tuple):
+        self.code = code
+        self.site = site
+        self.fmt = fmt
+        self.args = args
+        self.count = 1
+        self.summarized = 0
+
+    @property
+    def message(self) -> str:
+        return self.fmt.format(*self.args)
+
+    def __str__(self):
+        return self.message
+
+
+class DiagnosticsCollector:
+    """
+    Collects diagnostics reported from hot paths.
+
+    Call sites are expected to check `enabled` before reporting so that nothing
+    is built or formatted when diagnostics are disabled:
+
+        if diagnostics.enabled:
+            diagnostics.report("code", site, "{} message", arg)
+
+    Args:
+        enabled (default=True): should diagnostics be collected
+
+        rate_limit (default=5): the maximum number of distinct sites that are
+            logged for each code, any more are only counted and included in
+            the summary
+    """
+    def __init__(self, enabled: bool = True, rate_limit: int = 5):
+        self.enabled = enabled
+        self.rate_limit = rate_limit
+        self._records: Dict[Tuple[str, Any], _Diagnostic] = {}
+        self._logged: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def configure(self) -> None:
+        """
+        Applies the "diagnostics" section of the global configuration, if one
+        is present. The section can set "enabled" and "rate_limit".
+        """
+        config = get_config("diagnostics")
+        if config is None:
+            return
+        self.enabled = config.get("enabled", self.enabled)
+        self.rate_limit = config.get("rate_limit", self.rate_limit)
+
+    def report(self, code: str, site: Any, fmt: str, *args: Any) -> None:
+        """
+        Reports a diagnostic. Repeated reports of the same code at the same
+        site are only counted.
+
+        Args:
+            code: a short identifier for the kind of diagnostic
+
+            site: where the diagnostic occurred, used to deduplicate reports
+
+            fmt: the message, as a `str.format` template, only formatted if it
+                is logged
+
+            *args: the arguments for the message template
+        """
+        key = (code, site)
+        with self._lock:
+            record = self._records.get(key, None)
+            if record is not None:
+                record.count += 1
+                return
+
+            record = _Diagnostic(code, site, fmt, args)
+            self._records[key] = record
+            logged = self._logged.get(code, 0)
+            if logged >= self.rate_limit:
+                return
+            self._logged[code] = logged + 1
+
+        _ngclogger.warning("%s", record)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """
+        Returns: every diagnostic collected so far, with its code, site,
+            formatted message, and the number of times it was reported
+        """
+        with self._lock:
+            return [{"code": r.code, "site": r.site, "message": r.message,
+                     "count": r.count} for r in self._records.values()]
+
+    def summary(self) -> List[str]:
+        """
+        Produces a summary of every diagnostic reported since the last summary,
+        grouped by code.
+
+        Returns: one line per code
+        """
+        grouped: Dict[str, List[int]] = {}
+        sites: Dict[str, int] = {}
+        with self._lock:
+            for record in self._records.values():
+                sites[record.code] = sites.get(record.code, 0) + 1
+                new = record.count - record.summarized
+                if new == 0:
+                    continue
+                record.summarized = record.count
+                counts = grouped.setdefault(record.code, [0, 0])
+                counts[0] += new
+                counts[1] += 1
+            hidden = {code: total - self._logged.get(code, 0)
+                      for code, total in sites.items()}
+
+        lines = []
+        for code, (occurrences, new_sites) in grouped.items():
+            line = f"[{code}] {occurrences} occurrence(s) at {new_sites} " \
+                   f"site(s)"
+            if hidden[code] > 0:
+                line += f", {hidden[code]} site(s) not logged"
+            lines.append(line)
+        return lines
+
+    def log_summary(self, level: int = logging.INFO) -> None:
+        """
+        Logs the summary of every diagnostic reported since the last summary.
+
+        Args:
+            level (default=logging.INFO): the logging level to use
+        """
+        if not _ngclogger.isEnabledFor(level):
+            return
+        for line in self.summary():
+            _ngclogger.log(level, line)
+
+    def clear(self) -> None:
+        """
+        Forgets every diagnostic collected so far.
+        """
+        with self._lock:
+            self._records.clear()
+            self._logged.clear()
+
+
+diagnostics = DiagnosticsCollector()
@@ -1 +1,2 @@
-from .manager import global_state_manager as global_state_manager
\ No newline at end of file
+from .manager import global_state_manager as global_state_manager
+from .manager import StateManager as StateManager
\ No newline at end of file
@@ -1,13 +1,30 @@
-from typing import Union, Any, Dict, TYPE_CHECKING
+import threading
+import weakref
+from typing import Union, Any, Dict, List, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from ngcsimlib._src.compartment.compartment import Compartment
 
+_MISSING = object()
 
-class __global_state_manager:
+
+class StateManager:
+    """
+    A store of model state, mapping the global keys of compartments to their
+    values. Every context is bound to a state manager (the global state manager
+    unless another one is provided) and everything built inside it reads and
+    writes its values through that binding. Multiple state managers allow many
+    independent instances of a model to live in one process without their keys
+    colliding.
+    """
     def __init__(self):
         self.__state: Dict[str, any] = {}
         self.__compartments: Dict[str: "Compartment"] = {}
+        self.__versions: Dict[str, int] = {}
+        self.__version: int = 0
+        self.__lock = threading.Lock()
+        self.__run_lock = threading.RLock()
+        self.__async_locks = weakref.WeakKeyDictionary()
 
     def add_compartment(self, compartment: "Compartment"):
         self.__compartments[compartment.root] = compartment
@@ -49,7 +66,7 @@ class __global_state_manager:
         Returns:
 
         """
-        self.__state[self.make_key(path, local_key)] = value
+        self.set_state({self.make_key(path, local_key): value})
 
     def from_global_key(self, key: str) -> Union[None, Any]:
         """
@@ -83,14 +100,82 @@ class __global_state_manager:
         Args:
             state: The new state to update with
         """
-        self.__state.update(state)
+        with self.__lock:
+            changed = [key for key, value in state.items()
+                       if self.__state.get(key, _MISSING) is not value]
+            self.__state.update(state)
+            if len(changed) > 0:
+                self.__version += 1
+                self.__versions.update(dict.fromkeys(changed, self.__version))
+
+    @property
+    def run_lock(self) -> threading.RLock:
+        """
+        Returns: the lock held by every run of a process against this state
+            manager, from reading the state it starts from until writing back
+            the state it ends with. Synchronous runs hold it on the calling
+            thread and awaitable runs on their executor thread, so runs of
+            either kind never interleave their updates.
+        """
+        return self.__run_lock
+
+    @property
+    def async_lock(self):
+        """
+        Returns: the asyncio lock used to serialize awaitable operations on
+            this state manager from the running event loop. asyncio locks can
+            only be used from a single event loop, so one is created for every
+            event loop that needs it.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        with self.__lock:
+            lock = self.__async_locks.get(loop, None)
+            if lock is None:
+                lock = self.__async_locks[loop] = asyncio.Lock()
+        return lock
+
+    @property
+    def version(self) -> int:
+        """
+        Returns: the current version of the global state, this is incremented
+            every time a call to `set_state` changes at least one value
+        """
+        return self.__version
+
+    def get_version(self, key: str) -> int:
+        """
+        Gets the version of the global state the given key was last changed in.
+        Values are compared by identity, since compiled processes replace values
+        in the state rather than mutating them.
+
+        Args:
+            key: the global key
+
+        Returns: the version the key was last changed in, 0 if the key is not
+            present in the global state
+        """
+        return self.__versions.get(key, 0)
+
+    def changed_since(self, version: int) -> List[str]:
+        """
+        Gets all the keys that have changed after the provided version.
+
+        Args:
+            version: the version to compare against
+
+        Returns: a list of the global keys changed after the given version
+        """
+        with self.__lock:
+            return [key for key, v in self.__versions.items() if v > version]
 
     @property
     def state(self) -> dict:
         """
         Returns: a copy of the global state
         """
-        return self.__state.copy()
+        with self.__lock:
+            return self.__state.copy()
 
     @state.setter
     def state(self, state: Dict[str, Any]) -> None:
@@ -102,4 +187,4 @@ class __global_state_manager:
         self.set_state(state)
 
 
-global_state_manager = __global_state_manager()
+global_state_manager = StateManager()
@@ -104,6 +104,11 @@ def init_logging():
         file_handler.setFormatter(formatter)
         _ngclogger.addHandler(file_handler)
 
+    from ngcsimlib._src.diagnostics import diagnostics
+    diagnostics.configure()
+    from ngcsimlib._src.parser.specializations import specializations
+    specializations.configure()
+
 
 @_concatArgs
 def warn(msg):
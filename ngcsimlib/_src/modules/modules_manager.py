@@ -1,5 +1,7 @@
 import sys
 import importlib
+from typing import Any, Dict, List, Tuple, Union
+from types import ModuleType
 
 
 class __ModulesManager:
@@ -8,23 +10,86 @@ class __ModulesManager:
         self.__loaded_modules = {}
         self.__needed_imports = set()
 
+        # (class, top level module) -> public import path
+        self.__public_paths: Dict[Tuple[type, str], str] = {}
+        # import path -> (module, remaining attribute path)
+        self.__import_paths: Dict[str, Tuple[ModuleType, List[str]]] = {}
+        # top level module -> (module, id(attribute) -> attribute name)
+        self.__module_indices: Dict[str, Tuple[ModuleType, Dict[int, str]]] = {}
+
     def resolve_public_import(self, obj, top_level_module=None):
         """
         Try to find the shortest import path for `obj` under `top_level_module`.
+        Results are cached by class, a cached path is only used as long as it
+        still resolves to the same class, so reloading a module invalidates
+        every path that pointed into it.
         """
         cls = obj if isinstance(obj, type) else type(obj)
 
         if top_level_module is None:
             top_level_module = obj.__module__.split('.')[0]
 
+        key = (cls, top_level_module)
+        path = self.__public_paths.get(key, None)
+        if path is not None and self.__find_loaded(path) is cls:
+            return path
+
+        path = self.__resolve_public_import(cls, top_level_module)
+        self.__public_paths[key] = path
+        return path
+
+    def __resolve_public_import(self, cls, top_level_module):
         mod = sys.modules[top_level_module]
-        for attr_name in dir(mod):
-            if getattr(mod, attr_name) is cls:
-                return (f"{top_level_module}.{attr_name}")
+        for rebuild in (False, True):
+            index = self.__module_index(top_level_module, mod, rebuild)
+            attr_name = index.get(id(cls), None)
+            if attr_name is not None and getattr(mod, attr_name, None) is cls:
+                return f"{top_level_module}.{attr_name}"
         return f"{cls.__module__}.{cls.__qualname__}"
 
+    def __module_index(self, name: str, mod: ModuleType, rebuild: bool) -> \
+            Dict[int, str]:
+        cached = self.__module_indices.get(name, None)
+        if not rebuild and cached is not None and cached[0] is mod:
+            return cached[1]
+
+        ## Only attributes that are already loaded are indexed, going through
+        ## getattr would import every attribute of a lazily loaded module
+        index = {}
+        for attr_name, value in sorted(vars(mod).items()):
+            index.setdefault(id(value), attr_name)
+        lazy = vars(mod).get("_LAZY_ATTRIBUTES", {})
+        for attr_name, (module_name, source_name) in sorted(lazy.items()):
+            source = sys.modules.get(module_name, None)
+            if source is not None and hasattr(source, source_name):
+                index.setdefault(id(getattr(source, source_name)), attr_name)
+        self.__module_indices[name] = (mod, index)
+        return index
+
+    @staticmethod
+    def __find_loaded(path: str) -> Any:
+        parts = path.split(".")
+        for i in range(len(parts), 0, -1):
+            module = sys.modules.get(".".join(parts[:i]), None)
+            if module is not None:
+                break
+        else:
+            return None
+
+        obj = module
+        for attr in parts[i:]:
+            obj = getattr(obj, attr, None)
+        return obj
 
     def import_module(self, mod: str):
+        cached = self.__import_paths.get(mod, None)
+        if cached is not None and \
+                sys.modules.get(cached[0].__name__, None) is cached[0]:
+            obj = cached[0]
+            for attr in cached[1]:
+                obj = getattr(obj, attr)
+            return obj
+
         parts = mod.split(".")
         for i in range(len(parts), 0, -1):
             module_name = ".".join(parts[:i])
@@ -39,8 +104,36 @@ class __ModulesManager:
         obj = module
         for attr in parts[i:]:
             obj = getattr(obj, attr)
+
+        self.__import_paths[mod] = (module, parts[i:])
         return obj
 
+    def invalidate(self, module_name: Union[str, None] = None) -> None:
+        """
+        Clears the cached import paths. Cached paths are already checked
+        against the loaded modules before they are used, so this is only needed
+        when a module has changed without being reloaded.
+
+        Args:
+            module_name (default=None): only clear the paths that resolve into
+                this module, if None every cached path is cleared
+        """
+        if module_name is None:
+            self.__public_paths.clear()
+            self.__import_paths.clear()
+            self.__module_indices.clear()
+            return
+
+        def _in_module(path):
+            return path == module_name or path.startswith(module_name + ".")
+
+        self.__public_paths = {k: v for k, v in self.__public_paths.items()
+                               if not _in_module(v) and
+                               not _in_module(k[0].__module__)}
+        self.__import_paths = {k: v for k, v in self.__import_paths.items()
+                               if not _in_module(k)}
+        self.__module_indices.pop(module_name.split('.')[0], None)
+
     def resolve_imports(self, *objs):
         for obj in objs:
             self.__needed_imports.add(self.resolve_public_import(obj))
@@ -48,4 +141,4 @@ class __ModulesManager:
     def get_needed_imports(self):
         return self.__needed_imports
 
-modules_manager = __ModulesManager()
\ No newline at end of file
+modules_manager = __ModulesManager()
@@ -3,6 +3,76 @@ from ngcsimlib._src.modules.modules_manager import modules_manager as modManager
 from ngcsimlib._src.global_state.manager import global_state_manager as gsm
 
 import ast
+import weakref
+from typing import Tuple, Union
+
+_CONSTANT_TYPES = (bool, int, float, complex, str, type(None))
+
+
+def is_constant(value):
+    """
+    Returns: if the value can be written directly into compiled code
+    """
+    if isinstance(value, tuple):
+        return all(is_constant(v) for v in value)
+    return isinstance(value, _CONSTANT_TYPES)
+
+
+## Incremented whenever the wiring of compartments or the parameters of an
+## operation change, which invalidates every memoized operation value
+_wiring_epoch = 0
+
+## The changes to the wiring made in each top level context of each state
+## manager, and the changes that are not tied to a context (like changing the
+## parameters of an operation or loading a fixed compartment)
+_scoped_epochs = weakref.WeakKeyDictionary()
+_unscoped_epoch = 0
+
+
+def _scope(path):
+    return path.split(":", 1)[0]
+
+
+def invalidate_ops(state_manager=None, path=None):
+    """
+    Invalidates the memoized values of every operation.
+
+    Args:
+        state_manager (default=None): the state manager of the compartment
+            whose wiring changed, None if the change is not tied to one
+
+        path (default=None): the path of the compartment whose wiring
+            changed, only the top level context of the path is used
+    """
+    global _wiring_epoch, _unscoped_epoch
+    _wiring_epoch += 1
+    if state_manager is None or path is None:
+        _unscoped_epoch += 1
+        return
+    epochs = _scoped_epochs.setdefault(state_manager, {})
+    scope = _scope(path)
+    epochs[scope] = epochs.get(scope, 0) + 1
+
+
+def wiring_epoch(state_manager=None, path=None) -> Union[int, Tuple[int, int]]:
+    """
+    Args:
+        state_manager (default=None): the state manager to scope the counter
+            to
+
+        path (default=None): a path in the top level context to scope the
+            counter to
+
+    Returns: a counter that changes whenever the wiring of compartments or the
+        parameters of an operation change, if a state manager and a path are
+        given only changes made in the top level context of the path (or not
+        tied to any context) change it
+    """
+    if state_manager is None or path is None:
+        return _wiring_epoch
+    return _unscoped_epoch, _scoped_epochs.get(state_manager, {}).get(
+        _scope(path), 0)
+
 
 class BaseOp(metaclass=CompartmentMeta):
     """
@@ -10,15 +80,71 @@ class BaseOp(metaclass=CompartmentMeta):
     values as they are passed between components. They are all set up as
     pseudo-compartments but do not actually have a value in the global state.
     """
+    _memo = None
+    _canonical = None
+
     def __init__(self, *comps):
         self._comps = list(comps)
         self.astOp = None
+        self._memo = None
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name == "_memo":
+            return
+        invalidate_ops()
+        if self._canonical is not None:
+            ## The operation no longer has the structure it was deduplicated
+            ## by (see `simplify`)
+            table, key = self._canonical
+            if table.get(key, None) is self:
+                del table[key]
+            object.__setattr__(self, "_canonical", None)
 
     def get(self):
         """
+        Gets the value of the operation. The value is memoized, it is only
+        recomputed once a compartment the operation reads has changed in the
+        state (or the wiring has changed), so repeated reads of an unchanged
+        state cost a lookup. Like the versions of the state manager, this
+        assumes values in the state are replaced rather than mutated in place.
+
         Returns: The computed value of the operation
         """
-        return self._get_value()
+        memo = self._memo
+        epoch = _wiring_epoch
+        if memo is not None and memo[0] == epoch:
+            state_manager, version = memo[1], memo[1].version
+            if memo[2] == version:
+                return memo[4]
+            if not any(state_manager.get_version(key) > memo[2]
+                       for key in memo[3]):
+                self._memo = (epoch, state_manager, version, memo[3], memo[4])
+                return memo[4]
+        else:
+            state_manager = self._find_state_manager()
+            if state_manager is None:
+                return self._get_value()
+            version = state_manager.version
+
+        value = self._get_value()
+        self._memo = (epoch, state_manager, version, self.get_needed_keys(),
+                      value)
+        return value
+
+    def _find_state_manager(self):
+        """
+        Returns: the state manager of the first compartment read by this
+            operation, or None if it does not read any compartment
+        """
+        for comp in self._comps:
+            if isinstance(comp, BaseOp):
+                state_manager = comp._find_state_manager()
+                if state_manager is not None:
+                    return state_manager
+            else:
+                return comp._state_manager
+        return None
 
     def _get_value(self):
         """
@@ -27,6 +153,43 @@ class BaseOp(metaclass=CompartmentMeta):
         """
         return NotImplemented
 
+    def is_fixed(self):
+        """
+        Returns: if every compartment flowing into this operation is fixed, in
+            which case the operation is folded into a constant when compiled
+        """
+        return len(self._comps) > 0 and \
+            all(comp.is_fixed() for comp in self._comps)
+
+    def _signature(self):
+        """
+        Returns: the arguments that, along with the type of the operation and
+            its inputs, determine what the operation computes, or None if the
+            operation is only ever equivalent to itself
+        """
+        return None
+
+    def _folded_name(self):
+        return f"ngcsimlib_folded_{id(self):x}"
+
+    def _folded_ast(self):
+        """
+        Returns: the node reading the folded value of this operation if it is
+            fixed, otherwise None
+        """
+        if not self.is_fixed():
+            return None
+        value = self.get()
+        if is_constant(value):
+            return ast.Constant(value=value)
+        return ast.Name(id=self._folded_name(), ctx=ast.Load())
+
+    def _compiled_comps(self):
+        """
+        Returns: the compartments and operations the compiled operation reads
+        """
+        return self._comps
+
     def _to_ast(self, node, ctx):
         """
         This is the method that will be used to compile the operation. Since
@@ -39,11 +202,15 @@ class BaseOp(metaclass=CompartmentMeta):
 
         Returns: the ast expression needed to run the operation
         """
+        folded = self._folded_ast()
+        if folded is not None:
+            return folded
 
-        if len(self._comps) == 1:
-            return self._comps[0]._to_ast(node, ctx)
+        comps = self._compiled_comps()
+        if len(comps) == 1:
+            return comps[0]._to_ast(node, ctx)
 
-        inners = [comp._to_ast(node, ctx) for comp in self._comps]
+        inners = [comp._to_ast(node, ctx) for comp in comps]
         left = inners[0]
         for inner in inners[1:]:
             left = ast.BinOp(left=left, op=self.astOp, right=inner)
@@ -69,17 +236,35 @@ class BaseOp(metaclass=CompartmentMeta):
         """
         keys = set()
         for comp in self._comps:
-            keys.union(comp.get_needed_keys())
+            keys |= comp.get_needed_keys()
         return keys
 
+    def get_needed_globals(self):
+        """
+        Returns: the names and values of the globals that the compiled
+            operation refers to, which are added to the namespace of the
+            compiled method using it
+        """
+        if self.is_fixed():
+            value = self.get()
+            return {} if is_constant(value) else {self._folded_name(): value}
+
+        needed = {}
+        for comp in self._compiled_comps():
+            needed.update(comp.get_needed_globals())
+        return needed
+
 
-    def from_json(self, data):
+    def from_json(self, data, state_manager=None):
+        state_manager = state_manager or gsm
         compartment_paths = data['compartments']
         for compartment_path in compartment_paths:
             if isinstance(compartment_path, str):
-                self._comps.append(gsm.get_compartment(compartment_path))
+                self._comps.append(
+                    state_manager.get_compartment(compartment_path))
             else:
-                self._comps.append(BaseOp.load_op(compartment_path))
+                self._comps.append(
+                    BaseOp.load_op(compartment_path, state_manager))
 
 
     def __rshift__(self, other):
@@ -87,8 +272,8 @@ class BaseOp(metaclass=CompartmentMeta):
             other.__rrshift__(self)
 
     @staticmethod
-    def load_op(op):
+    def load_op(op, state_manager=None):
         klass = modManager.import_module(op['modulePath'])
         newOp = klass()
-        newOp.from_json(op)
+        newOp.from_json(op, state_manager)
         return newOp
\ No newline at end of file
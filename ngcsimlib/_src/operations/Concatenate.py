@@ -0,0 +1,34 @@
+from ngcsimlib._src.operations.FusedOp import FusedOp
+from ngcsimlib._src.operations.fused import concatenate
+
+
+class Concatenate(FusedOp):
+    """
+    The concatenate operation. This operation takes in any number of
+    compartments and joins them along an existing axis before passing the value
+    off to the destination compartment.
+
+    Args:
+        *compartments: the compartments to concatenate
+
+        axis (default=0): the axis to concatenate along
+    """
+    kernel = staticmethod(concatenate)
+    associative = True
+    reassociable = True
+
+    def __init__(self, *compartments, axis=0):
+        super().__init__(*compartments)
+        self.axis = axis
+
+    def _kernel_args(self):
+        return (self.axis,)
+
+    def to_json(self):
+        data = super().to_json()
+        data['axis'] = self.axis
+        return data
+
+    def from_json(self, data, state_manager=None):
+        super().from_json(data, state_manager)
+        self.axis = data['axis']
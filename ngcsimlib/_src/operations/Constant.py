@@ -0,0 +1,43 @@
+from ngcsimlib._src.operations.BaseOp import BaseOp
+import importlib
+
+
+class Constant(BaseOp):
+    """
+    A constant operand of an operation. Constants are created for the plain
+    values used in lazy expressions (see `lazy_ops`), they are written into
+    compiled code if they are python literals and baked into the compiled
+    namespace otherwise. Arrays are saved as nested lists along with the name
+    of their array namespace, which is used to convert them back when loaded.
+
+    Args:
+        value: the value of the constant
+    """
+    def __init__(self, value=None):
+        super().__init__()
+        self.value = value
+
+    def _get_value(self):
+        return self.value
+
+    def is_fixed(self):
+        return True
+
+    def _signature(self):
+        return (self.value,)
+
+    def to_json(self):
+        data = super().to_json()
+        value = self.value
+        if hasattr(value, "__array_namespace__"):
+            data['namespace'] = value.__array_namespace__().__name__
+            value = value.tolist()
+        data['value'] = value
+        return data
+
+    def from_json(self, data, state_manager=None):
+        super().from_json(data, state_manager)
+        self.value = data['value']
+        if 'namespace' in data:
+            xp = importlib.import_module(data['namespace'])
+            self.value = xp.asarray(self.value)
@@ -0,0 +1,73 @@
+from ngcsimlib._src.operations.BaseOp import BaseOp
+from ngcsimlib._src.operations.Constant import Constant
+from ngcsimlib._src.compartment.compartmentMeta import CompartmentMeta
+import ast
+import operator
+
+_BINARY = {
+    'add': ast.Add, 'sub': ast.Sub, 'mul': ast.Mult, 'matmul': ast.MatMult,
+    'truediv': ast.Div, 'floordiv': ast.FloorDiv, 'mod': ast.Mod,
+    'pow': ast.Pow, 'and_': ast.BitAnd, 'xor': ast.BitXor, 'or_': ast.BitOr,
+}
+
+_COMPARE = {
+    'eq': ast.Eq, 'ne': ast.NotEq, 'lt': ast.Lt, 'le': ast.LtE,
+    'gt': ast.Gt, 'ge': ast.GtE,
+}
+
+_UNARY = {'neg': ast.USub, 'pos': ast.UAdd, 'invert': ast.Invert}
+
+
+class Expression(BaseOp):
+    """
+    A single arithmetic operator applied to compartments, operations, or
+    constants. Expressions are built by arithmetic on compartments inside of
+    a `lazy_ops` block, and compile to the plain python operator so they are
+    fused into the step they are read in. Plain values are wrapped as
+    `Constant`s.
+
+    Args:
+        operator: the name of the operator in python's `operator` module, such
+            as "add", "mul", "neg", or "lt"
+
+        *operands: the operands of the operator, one for unary operators and
+            two otherwise
+    """
+    def __init__(self, operator=None, *operands):
+        super().__init__(*[operand if isinstance(type(operand), CompartmentMeta)
+                           else Constant(operand) for operand in operands])
+        self.operator = operator
+
+    def _get_value(self):
+        return getattr(operator, self.operator)(
+            *[comp.get() for comp in self._comps])
+
+    def _signature(self):
+        return (self.operator,)
+
+    def _to_ast(self, node, ctx):
+        folded = self._folded_ast()
+        if folded is not None:
+            return folded
+
+        operands = [comp._to_ast(node, ctx) for comp in self._comps]
+        if self.operator in _BINARY:
+            return ast.BinOp(left=operands[0], op=_BINARY[self.operator](),
+                             right=operands[1])
+        if self.operator in _COMPARE:
+            return ast.Compare(left=operands[0],
+                               ops=[_COMPARE[self.operator]()],
+                               comparators=[operands[1]])
+        if self.operator in _UNARY:
+            return ast.UnaryOp(op=_UNARY[self.operator](), operand=operands[0])
+        return ast.Call(func=ast.Name(id=self.operator, ctx=ast.Load()),
+                        args=operands, keywords=[])
+
+    def to_json(self):
+        data = super().to_json()
+        data['operator'] = self.operator
+        return data
+
+    def from_json(self, data, state_manager=None):
+        super().from_json(data, state_manager)
+        self.operator = data['operator']
@@ -0,0 +1,106 @@
+from ngcsimlib._src.operations.BaseOp import BaseOp, is_constant
+import ast
+
+
+def _is_bool(value):
+    return isinstance(value, bool) or \
+        getattr(getattr(value, "dtype", None), "kind", None) == "b"
+
+
+class FusedOp(BaseOp):
+    """
+    The base class for operations that compile to a single call of a kernel
+    instead of a chain of binary operations. The kernel is called with any
+    arguments of the operation itself (see `_kernel_args`) followed by the
+    value of every compartment, both when the operation is evaluated eagerly
+    and in compiled code, where the kernel is added to the namespace of the
+    compiled method.
+
+    Fused operations declare how they can be simplified: `associative`
+    operations absorb nested operations of the same type and arguments when
+    they are wired (see `simplify`), nested in any position if they are
+    `reassociable` (their result does not depend on how they are grouped) and
+    only as their first input otherwise (like sums of floats, which round
+    differently when regrouped), and fixed python int inputs equal to
+    `identity` are dropped when they are compiled, as long as dropping them
+    can not change the type of the result.
+    """
+    kernel = None
+    associative = False
+    reassociable = False
+    identity = None
+
+    def _kernel_args(self):
+        """
+        Returns: the arguments passed to the kernel ahead of the compartment
+            values, literal arguments are written into the compiled code and
+            anything else is baked into its namespace
+        """
+        return ()
+
+    def _signature(self):
+        return self._kernel_args()
+
+    def _kernel_name(self):
+        return f"ngcsimlib_{type(self).kernel.__name__}"
+
+    def _arg_name(self, index):
+        return f"ngcsimlib_{type(self).__name__}_{id(self):x}_{index}"
+
+    def is_identity(self, comp):
+        """
+        Returns: if the compartment or operation is fixed and currently holds
+            the identity of this operation, so it can be left out of the
+            compiled operation
+        """
+        identity = type(self).identity
+        if identity is None or not comp.is_fixed():
+            return False
+        value = comp.get()
+        ## Python floats (and numpy scalars) promote integer inputs, a python
+        ## int follows the type of whatever it is combined with
+        return type(value) is int and value == identity
+
+    def _compiled_comps(self):
+        kept = [comp for comp in self._comps if not self.is_identity(comp)]
+        if len(kept) == 0:
+            return self._comps[:1]
+        if len(kept) < len(self._comps) and \
+                any(_is_bool(comp.get()) for comp in kept):
+            ## Booleans are promoted to integers by the identity
+            return list(self._comps)
+        return kept
+
+    def _get_value(self):
+        return type(self).kernel(*self._kernel_args(),
+                                 *[comp.get() for comp in self._comps])
+
+    def _to_ast(self, node, ctx):
+        folded = self._folded_ast()
+        if folded is not None:
+            return folded
+        comps = self._compiled_comps()
+        if len(comps) <= 2 and self.astOp is not None:
+            return super()._to_ast(node, ctx)
+
+        args = []
+        for index, arg in enumerate(self._kernel_args()):
+            if is_constant(arg):
+                args.append(ast.Constant(value=arg))
+            else:
+                args.append(ast.Name(id=self._arg_name(index),
+                                     ctx=ast.Load()))
+        args.extend(comp._to_ast(node, ctx) for comp in comps)
+        return ast.Call(func=ast.Name(id=self._kernel_name(), ctx=ast.Load()),
+                        args=args, keywords=[])
+
+    def get_needed_globals(self):
+        needed = super().get_needed_globals()
+        if self.is_fixed() or \
+                (len(self._compiled_comps()) <= 2 and self.astOp is not None):
+            return needed
+        needed[self._kernel_name()] = type(self).kernel
+        for index, arg in enumerate(self._kernel_args()):
+            if not is_constant(arg):
+                needed[self._arg_name(index)] = arg
+        return needed
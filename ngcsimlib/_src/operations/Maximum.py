@@ -0,0 +1,13 @@
+from ngcsimlib._src.operations.FusedOp import FusedOp
+from ngcsimlib._src.operations.fused import maximum
+
+
+class Maximum(FusedOp):
+    """
+    The maximum operation. This operation takes in any number of compartments
+    and takes their element-wise maximum before passing the value off to the
+    destination compartment.
+    """
+    kernel = staticmethod(maximum)
+    associative = True
+    reassociable = True
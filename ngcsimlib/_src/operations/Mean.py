@@ -0,0 +1,11 @@
+from ngcsimlib._src.operations.FusedOp import FusedOp
+from ngcsimlib._src.operations.fused import mean
+
+
+class Mean(FusedOp):
+    """
+    The mean operation. This operation takes in any number of compartments and
+    averages them element-wise before passing the value off to the destination
+    compartment.
+    """
+    kernel = staticmethod(mean)
@@ -1,21 +1,19 @@
-from ngcsimlib._src.operations.BaseOp import BaseOp
+from ngcsimlib._src.operations.FusedOp import FusedOp
+from ngcsimlib._src.operations.fused import fused_product
 import ast
 
 
-class Product(BaseOp):
+class Product(FusedOp):
     """
     The product operation. This operation takes in any number of compartments
     and multiplies them together before passing the value off to the destination
-    compartment.
+    compartment. Products of more than two compartments compile to a single
+    fused call that accumulates in place instead of a chain of multiplications.
     """
+    kernel = staticmethod(fused_product)
+    associative = True
+    identity = 1
+
     def __init__(self, *compartments):
         super().__init__(*compartments)
         self.astOp = ast.Mult()
-
-    def _get_value(self):
-        x = 1
-        for comp in self._comps:
-            x *= comp.get()
-        return x
-
-
@@ -0,0 +1,32 @@
+from ngcsimlib._src.operations.FusedOp import FusedOp
+from ngcsimlib._src.operations.fused import stack
+
+
+class Stack(FusedOp):
+    """
+    The stack operation. This operation takes in any number of compartments
+    and stacks them along a new axis before passing the value off to the destination
+    compartment.
+
+    Args:
+        *compartments: the compartments to stack
+
+        axis (default=0): the axis to stack along
+    """
+    kernel = staticmethod(stack)
+
+    def __init__(self, *compartments, axis=0):
+        super().__init__(*compartments)
+        self.axis = axis
+
+    def _kernel_args(self):
+        return (self.axis,)
+
+    def to_json(self):
+        data = super().to_json()
+        data['axis'] = self.axis
+        return data
+
+    def from_json(self, data, state_manager=None):
+        super().from_json(data, state_manager)
+        self.axis = data['axis']
@@ -1,18 +1,19 @@
-from ngcsimlib._src.operations.BaseOp import BaseOp
+from ngcsimlib._src.operations.FusedOp import FusedOp
+from ngcsimlib._src.operations.fused import fused_sum
 import ast
 
 
-class Summation(BaseOp):
+class Summation(FusedOp):
     """
     The summation operation. This operation takes in any number of compartments
     and sums them together before passing the value off to the destination
-    compartment.
+    compartment. Sums of more than two compartments compile to a single fused
+    call that accumulates in place instead of a chain of additions.
     """
+    kernel = staticmethod(fused_sum)
+    associative = True
+    identity = 0
+
     def __init__(self, *compartments):
         super().__init__(*compartments)
         self.astOp = ast.Add()
-
-    def _get_value(self):
-        return sum(self._comps)
-
-
@@ -0,0 +1,55 @@
+import importlib
+
+from ngcsimlib._src.operations.FusedOp import FusedOp
+from ngcsimlib._src.operations.fused import weighted_sum
+from ngcsimlib._src.logger import error
+
+
+class WeightedSum(FusedOp):
+    """
+    The weighted sum operation. This operation takes in any number of
+    compartments, scales each one by its weight, and sums them together before
+    passing the value off to the destination compartment. The weights are
+    baked into the compiled method. Weights that are arrays are saved as
+    nested lists along with the name of their array namespace, in the same way
+    as constants.
+
+    Args:
+        *compartments: the compartments to sum
+
+        weights: one weight per compartment
+    """
+    kernel = staticmethod(weighted_sum)
+
+    def __init__(self, *compartments, weights=()):
+        super().__init__(*compartments)
+        self.weights = tuple(weights)
+        if len(compartments) > 0 and len(self.weights) != len(compartments):
+            error(f"WeightedSum expected {len(compartments)} weights but got "
+                  f"{len(self.weights)}", errorCls=ValueError)
+
+    def _kernel_args(self):
+        return (self.weights,)
+
+    def to_json(self):
+        data = super().to_json()
+        weights, namespaces = [], []
+        for weight in self.weights:
+            if hasattr(weight, "__array_namespace__"):
+                namespaces.append(weight.__array_namespace__().__name__)
+                weight = weight.tolist()
+            else:
+                namespaces.append(None)
+            weights.append(weight)
+        data['weights'] = weights
+        if any(namespace is not None for namespace in namespaces):
+            data['namespaces'] = namespaces
+        return data
+
+    def from_json(self, data, state_manager=None):
+        super().from_json(data, state_manager)
+        namespaces = data.get('namespaces', [None] * len(data['weights']))
+        self.weights = tuple(
+            weight if namespace is None
+            else importlib.import_module(namespace).asarray(weight)
+            for weight, namespace in zip(data['weights'], namespaces))
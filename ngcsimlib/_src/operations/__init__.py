@@ -1,3 +1,12 @@
 from .BaseOp import BaseOp
+from .FusedOp import FusedOp
 from .Summation import Summation
 from .Product import Product
+from .WeightedSum import WeightedSum
+from .Mean import Mean
+from .Maximum import Maximum
+from .Concatenate import Concatenate
+from .Stack import Stack
+from .Constant import Constant
+from .Expression import Expression
+from ngcsimlib._src.compartment.compartmentMeta import lazy_ops, is_lazy
@@ -0,0 +1,185 @@
+"""
+The kernels behind the fused operations. Every operation calls the same kernel
+when it is evaluated eagerly and when it is compiled, where the call replaces
+the chain of binary operations that would otherwise be emitted. Kernels that
+accumulate start from a fresh copy of their first two operands and then
+accumulate every other operand into it in place, so no intermediate value is
+allocated per operand for types that support in-place operators (the inputs
+are never modified). Immutable types, like jax arrays and python numbers,
+simply rebind.
+
+Element-wise and axis operations use the array API namespace of the first
+operand that has one (`__array_namespace__`). Operands that are all python
+values (numbers, or lists and tuples for the axis operations) fall back to
+python builtins, and any other operands (like arrays of libraries that do not
+implement the array API) are handled with numpy.
+
+`select` and `element_wise` are not operations, they are what conditionals that
+depend on the state are compiled to (see `ContextTransformer.visit_If`).
+"""
+from numbers import Number
+from typing import Any, Sequence
+
+from ngcsimlib._src.logger import error
+
+
+def _namespace(value: Any) -> Any:
+    if hasattr(value, "__array_namespace__"):
+        return value.__array_namespace__()
+    return None
+
+
+def _values_namespace(values: Sequence[Any], python_types) -> Any:
+    """
+    Returns: the namespace of the first value that has one, None if every
+        value is one of the python types, and numpy otherwise
+    """
+    for value in values:
+        xp = _namespace(value)
+        if xp is not None:
+            return xp
+    if all(isinstance(value, python_types) for value in values):
+        return None
+    try:
+        import numpy
+    except ImportError:
+        error("Operating on values that are neither python values nor arrays "
+              "implementing the array API requires numpy", errorCls=TypeError)
+    return numpy
+
+
+def _accumulate(acc: Any, value: Any, inplace, outofplace) -> Any:
+    try:
+        return inplace(acc, value)
+    except (ValueError, TypeError):
+        ## In place accumulation can fail if the operand broadcasts the
+        ## accumulator to a larger shape or promotes its type
+        return outofplace(acc, value)
+
+
+def _iadd(a, b):
+    a += b
+    return a
+
+
+def _imul(a, b):
+    a *= b
+    return a
+
+
+def _add(a, b):
+    return a + b
+
+
+def _mul(a, b):
+    return a * b
+
+
+def fused_sum(*values: Any) -> Any:
+    """
+    Returns: the sum of all the values
+    """
+    if len(values) == 1:
+        return values[0]
+    acc = values[0] + values[1]
+    for value in values[2:]:
+        acc = _accumulate(acc, value, _iadd, _add)
+    return acc
+
+
+def fused_product(*values: Any) -> Any:
+    """
+    Returns: the product of all the values
+    """
+    if len(values) == 1:
+        return values[0]
+    acc = values[0] * values[1]
+    for value in values[2:]:
+        acc = _accumulate(acc, value, _imul, _mul)
+    return acc
+
+
+def weighted_sum(weights: Sequence[Any], *values: Any) -> Any:
+    """
+    Returns: the sum of every value scaled by its weight
+    """
+    acc = values[0] * weights[0]
+    for weight, value in zip(weights[1:], values[1:]):
+        acc = _accumulate(acc, value * weight, _iadd, _add)
+    return acc
+
+
+def mean(*values: Any) -> Any:
+    """
+    Returns: the element-wise mean of all the values
+    """
+    return fused_sum(*values) / len(values)
+
+
+def maximum(*values: Any) -> Any:
+    """
+    Returns: the element-wise maximum of all the values
+    """
+    xp = _values_namespace(values, Number)
+    if xp is None:
+        return max(values)
+    acc = values[0]
+    for value in values[1:]:
+        acc = xp.maximum(acc, value)
+    return acc
+
+
+def concatenate(axis: int, *values: Any) -> Any:
+    """
+    Returns: the values joined along an existing axis, python sequences are
+        joined into a list
+    """
+    xp = _values_namespace(values, (list, tuple))
+    if xp is None:
+        joined = []
+        for value in values:
+            joined.extend(value)
+        return joined
+    concat = getattr(xp, "concat", None) or xp.concatenate
+    return concat(values, axis=axis)
+
+
+def stack(axis: int, *values: Any) -> Any:
+    """
+    Returns: the values joined along a new axis, python values are collected
+        into a list
+    """
+    xp = _values_namespace(values, (Number, list, tuple))
+    if xp is None:
+        return list(values)
+    return xp.stack(values, axis=axis)
+
+
+def select(condition: Any, if_true: Any, if_false: Any) -> Any:
+    """
+    Returns: `if_true` where the condition holds and `if_false` everywhere
+        else, element-wise if any of them is an array
+    """
+    for value in (condition, if_true, if_false):
+        xp = _namespace(value)
+        if xp is not None:
+            return xp.where(condition, if_true, if_false)
+    return if_true if condition else if_false
+
+
+def element_wise(condition: Any) -> bool:
+    """
+    Returns: if a conditional on the value has to be applied element-wise,
+        which holds for arrays (other than scalars) and for values that can
+        not be converted to a bool when the compiled method runs (like traced
+        arrays)
+    """
+    if _namespace(condition) is None:
+        return False
+    if getattr(condition, "shape", ()) != ():
+        return True
+    try:
+        bool(condition)
+    except Exception:
+        return True
+    return False
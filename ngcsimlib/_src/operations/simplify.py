@@ -0,0 +1,97 @@
+"""
+The simplification pass run on operations as they are wired into a
+compartment. It
+
+- flattens nested associative operations, so `Summation(Summation(a, b), c)`
+  becomes `Summation(a, b, c)`, without changing the order operations that
+  round (like sums and products of floats) are evaluated in, so
+  `Summation(a, Summation(b, c))` is left as it is (see
+  `FusedOp.reassociable`),
+- deduplicates operations, so structurally identical operations wired into
+  different destinations of the same state manager are the same object
+  (operations that do not define a `_signature` are only ever equal to
+  themselves). Changing an attribute of a deduplicated operation changes it
+  for every destination it is wired into, and it is no longer used for
+  operations wired later, which are deduplicated by their new structure.
+
+Fixed compartments and operations of only fixed compartments are folded into
+constants, and fixed inputs equal to the identity of an operation are dropped,
+when they are compiled (see `BaseOp.is_fixed` and `FusedOp.is_identity`), as
+the value of a fixed compartment can still change when a model is loaded.
+"""
+import weakref
+
+from ngcsimlib._src.operations.BaseOp import BaseOp
+from ngcsimlib._src.operations.FusedOp import FusedOp
+
+## The canonical operation of every structure, for each state manager
+_canonical = weakref.WeakKeyDictionary()
+
+
+def _absorbs(op: BaseOp, inner, position: int) -> bool:
+    return type(op).associative and type(inner) is type(op) and \
+        (position == 0 or type(op).reassociable) and \
+        inner._signature() == op._signature()
+
+
+def _hashable(value):
+    if type(value) is tuple:
+        return tuple(_hashable(v) for v in value)
+    try:
+        hash(value)
+        return (type(value), value)
+    except TypeError:
+        ## Unhashable values (like arrays) are held by the operation, so their
+        ## ids are stable for as long as the operation is alive
+        return ("id", id(value))
+
+
+def _structure(item):
+    if isinstance(item, BaseOp):
+        signature = item._signature()
+        if signature is None:
+            return ("id", id(item))
+        return (type(item), _hashable(signature),
+                tuple(_structure(comp) for comp in item._comps))
+    target = item.target
+    if isinstance(target, BaseOp):
+        return _structure(target)
+    return (id(item._state_manager), target)
+
+
+def simplify(op: BaseOp) -> BaseOp:
+    """
+    Simplifies an operation and the operations flowing into it in place.
+
+    Args:
+        op: the operation to simplify
+
+    Returns: the canonical operation equivalent to the simplified operation,
+        which is the operation itself unless an identical operation was
+        simplified before
+    """
+    comps = []
+    for position, comp in enumerate(op._comps):
+        if isinstance(comp, BaseOp):
+            comp = simplify(comp)
+        if isinstance(op, FusedOp) and _absorbs(op, comp, position):
+            comps.extend(comp._comps)
+        else:
+            comps.append(comp)
+
+    op._comps = comps
+
+    state_manager = op._find_state_manager()
+    if op._signature() is None or state_manager is None:
+        return op
+    table = _canonical.setdefault(state_manager,
+                                  weakref.WeakValueDictionary())
+    key = _structure(op)
+    canonical = table.get(key, None)
+    if canonical is None:
+        table[key] = op
+        ## Changing the operation drops it from the table (see
+        ## `BaseOp.__setattr__`)
+        object.__setattr__(op, "_canonical", (table, key))
+        return op
+    return canonical
@@ -1,5 +1,6 @@
+from .specializations import specializations as specializations
 from .utils import (
     compilable as compilable,
     parse_method as parse_method,
     compileObject as compileObject,
-)
\ No newline at end of file
+)
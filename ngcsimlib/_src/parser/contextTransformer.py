@@ -1,23 +1,211 @@
 import ast
+import copy
 import inspect
 
 from ngcsimlib._src.context.contextAwareObjectMeta import ContextAwareObjectMeta
-from ngcsimlib._src.global_state.manager import global_state_manager
-from ngcsimlib._src.logger import warn, error
+from ngcsimlib._src.logger import error
+from ngcsimlib._src.diagnostics import diagnostics
 from ngcsimlib._src.compartment.compartment import Compartment
+from ngcsimlib._src.operations.BaseOp import BaseOp, is_constant
+from ngcsimlib._src.operations.fused import select, element_wise
+from ngcsimlib._src.parser.syntax import compile_tree
+
+
+def _is_static_path(node):
+    """
+    Returns: if the expression is a chain of attributes and subscripts (by
+        constants or names) starting from a name, like `self.layers[i].v`
+    """
+    if isinstance(node, ast.Name):
+        return True
+    if isinstance(node, ast.Attribute):
+        return _is_static_path(node.value)
+    if isinstance(node, ast.Subscript):
+        return _is_static_path(node.value) and (
+            isinstance(node.slice, (ast.Constant, ast.Name)))
+    return False
+
+
+def _compile_expression(node):
+    return compile_tree(ast.fix_missing_locations(ast.Expression(node)),
+                        "<ast>", "eval")
+
+
+def state_paths(test):
+    """
+    Returns: the compiled expressions of every attribute, subscript, and name
+        in the test of a conditional that could resolve to a compartment
+    """
+    parents = {}
+    for parent in ast.walk(test):
+        for child in ast.iter_child_nodes(parent):
+            parents[child] = parent
+
+    paths = []
+    for node in ast.walk(test):
+        if not _is_static_path(node) or \
+                (isinstance(node, ast.Name) and node.id == "self"):
+            continue
+        parent = parents.get(node, None)
+        if (isinstance(node, ast.Attribute) and node.attr == "targeted") or \
+                (isinstance(parent, ast.Attribute) and
+                 parent.attr == "targeted"):
+            continue
+        paths.append(_compile_expression(node))
+    return paths
+
+
+def state_dependency(obj, paths, static_values=None):
+    """
+    Args:
+        obj: the object the method is compiled for
+
+        paths: the paths found by `state_paths`
+
+        static_values (default=None): the values of the names that are known
+            when compiling, such as the variables of unrolled loops
+
+    Returns: the first compartment that is not fixed that the paths resolve
+        to, or None if they only resolve to static values
+    """
+    scope = {"self": obj}
+    scope.update(static_values or {})
+    for path in paths:
+        try:
+            value = eval(path, {}, scope)
+        except Exception:
+            continue
+        if isinstance(value, Compartment) and not value.is_fixed():
+            return value
+    return None
+
+
+def bind_loop_target(target, value):
+    """
+    Returns: the value of every name in the target of a for loop for one item
+        of the loop, raises if the target is not made of names or the item
+        does not unpack into it
+    """
+    if isinstance(target, ast.Name):
+        return {target.id: value}
+    if not isinstance(target, (ast.Tuple, ast.List)):
+        raise TypeError("Loop targets can only be names")
+    values = list(value)
+    if len(values) != len(target.elts):
+        raise ValueError("Loop item does not unpack into the loop target")
+    bound = {}
+    for elt, item in zip(target.elts, values):
+        bound.update(bind_loop_target(elt, item))
+    return bound
+
+
+class _Identity:
+    """
+    An observed value that is compared by identity, used for compartments and
+    operations, which compare their values rather than themselves.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, _Identity) and other.value is self.value
+
+    def __hash__(self):
+        return id(self.value)
+
+
+def observe(value):
+    """
+    Returns: what a specialization compiled against the value depends on, the
+        identity of compartments and operations, the type and value of
+        anything hashable, or _UNHASHABLE if a changed value could not be told
+        apart from the original (like an array that is updated in place)
+    """
+    if type(value) is tuple:
+        items = tuple(observe(v) for v in value)
+        if any(item is _UNHASHABLE for item in items):
+            return _UNHASHABLE
+        return items
+    if isinstance(value, (Compartment, BaseOp)):
+        return _Identity(value)
+    try:
+        hash(value)
+    except TypeError:
+        return _UNHASHABLE
+    return type(value), value
+
+
+def guard_holds(obj, guard):
+    """
+    Checks a guard recorded by `ContextTransformer` against the current values
+    of the object.
+
+    Args:
+        obj: the object the method was compiled for
+
+        guard: the kind of the guard, what it read, the values of the loop
+            variables when it was read, and what was observed
+
+    Returns: if reading it again observes the same value
+    """
+    kind, subject, loop_values, observed = guard
+    scope = {"self": obj}
+    scope.update(loop_values)
+    try:
+        if kind == "attr":
+            value = getattr(obj, subject)
+        elif kind == "path":
+            value = eval(subject[0], {}, scope)
+        elif kind == "call":
+            value = getattr(eval(subject[0], {}, scope), subject[1]).compiled
+        elif state_dependency(obj, subject[1], loop_values) is not None:
+            value = None
+        elif kind == "test":
+            value = bool(eval(subject[0], {}, scope))
+        else:
+            value = _evaluate_iterable(subject[0], scope)
+    except Exception:
+        ## The value the guard reads can not be read anymore
+        return False
+    return observe(value) == observed
+
+
+def _evaluate_iterable(code, scope):
+    try:
+        return tuple(eval(code, {}, scope))
+    except Exception:
+        return _UNRESOLVED
 
 
 class ContextTransformer(ast.NodeTransformer):
     """
     This transformer works to transpile a compilable method into a pure method.
+
+    While transforming it records what the transformed method was specialized
+    on as guards (see `guard_holds`): the result of every conditional and the
+    items of every loop resolved when compiling, every attribute of the object
+    it reads, and the compiled methods of the subcomponents it calls. The
+    attributes read by resolved conditionals and loops are also recorded in
+    `static_attributes`, and if anything it was specialized on can not be
+    compared `uncacheable` holds the reason.
     """
     def __init__(self, obj, method, subMethod=False):
         super().__init__()
         self.obj = obj
         self.method = method
         self.current_args = set()
+        self.bound_names = set()
         self.needed_keys = set()
         self.subMethod = subMethod
+        self.loop_values = {}
+        self._branches = 0
+        self._statics = []
+
+        self.guards = []
+        self.static_attributes = set()
+        self.uncacheable = None
 
         self.needed_methods = {}
         self.needed_globals = {}
@@ -59,9 +247,12 @@ class ContextTransformer(ast.NodeTransformer):
         self.current_args = set()
 
 
-        for key in self.needed_keys:
-            if not global_state_manager.check_key(key):
-                warn(f"Key ({key}) missing from global state")
+        if diagnostics.enabled:
+            for key in self.needed_keys:
+                if not self.obj._state_manager.check_key(key):
+                    diagnostics.report("missing-key", (key, node.name),
+                                       "Key ({}) missing from global state",
+                                       key)
 
         return node
 
@@ -69,14 +260,9 @@ class ContextTransformer(ast.NodeTransformer):
         node = self.generic_visit(node)
         if isinstance(node.value, ast.Name) and node.value.id == "self":
             stateVal = getattr(self.obj, node.attr)
+            self._guard("attr", node.attr, stateVal, {})
             if isinstance(stateVal, Compartment):
-                new_node = ast.copy_location(
-                    stateVal._to_ast(node, 'ctx'),
-                    node
-                )
-                self.needed_keys.union(stateVal.get_needed_keys())
-
-                return ast.fix_missing_locations(new_node)
+                return self._compartment_ast(node, stateVal)
 
             if hasattr(stateVal, '_is_compilable') and isinstance(type(stateVal), ContextAwareObjectMeta):
                 return node
@@ -101,18 +287,23 @@ class ContextTransformer(ast.NodeTransformer):
 
         node = self.generic_visit(node)
 
-        if isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Attribute) \
-            and isinstance(node.func.value.value, ast.Name) and node.func.value.value.id == "self":
-            attr = getattr(self.obj, node.func.value.attr)
-            if not isinstance(type(attr), ContextAwareObjectMeta):
-                return node
+        ## Subcomponents can be reached through attributes (self.sub.advance),
+        ## subscripts (self.layers[0].advance), or unrolled loop variables
+        attr = self._static_object(node.func.value) \
+            if isinstance(node.func, ast.Attribute) else _UNRESOLVED
+        if attr is not self.obj and \
+                isinstance(type(attr), ContextAwareObjectMeta):
 
             subAttr = getattr(attr, node.func.attr)
             if not hasattr(subAttr, "compiled"):
                 error("Attempting to use a method of a subcomponent that is not compiled/compilable")
+            self._guard("call", (_compile_expression(node.func.value),
+                                 node.func.attr), subAttr.compiled)
             
             method_id = f"{attr.context_path.replace(':', '_')}_{node.func.attr}"
-            subAst = subAttr.compiled.ast
+            ## The compiled method of the subcomponent can be inlined again
+            ## (it is cached), so its tree is copied before it is trimmed
+            subAst = copy.deepcopy(subAttr.compiled.ast)
             subAst.body[0].body = subAst.body[0].body[:-1]
 
             self.auxiliary_ast[method_id] = subAst
@@ -136,6 +327,10 @@ class ContextTransformer(ast.NodeTransformer):
             call = node.value
             if isinstance(call.func, ast.Attribute) and call.func.attr == "set":
                 target = call.func.value
+                if not isinstance(target, ast.Subscript):
+                    ## Fixed compartments are folded into constants, setting
+                    ## them is dropped just like it is outside compiled code
+                    return ast.copy_location(ast.Pass(), node)
                 target.ctx = ast.Store()
 
                 value = call.args[0]
@@ -158,51 +353,376 @@ class ContextTransformer(ast.NodeTransformer):
         is_self = isinstance(node, ast.Name) and node.id == "self"
         return is_self, chain if is_self else None
 
-    def visit_If(self, node):
-        parent_map = {}
-        for parent in ast.walk(node.test):
-            for child in ast.iter_child_nodes(parent):
-                parent_map[child] = parent
-
-        for n in ast.walk(node.test):
-            if isinstance(n, ast.Attribute):
-                if isinstance(parent_map.get(n), ast.Attribute):
-                    continue
+    def _reads_locals(self, test):
+        """
+        Returns: if the test of a conditional (or the iterable of a loop)
+            reads an argument or a local variable, and so can only be
+            evaluated when the compiled method runs
+        """
+        local_names = self.current_args | self.bound_names
+        return any(isinstance(n, ast.Name) and n.id in local_names and
+                   n.id not in self.loop_values for n in ast.walk(test))
 
-                is_self, chain = self._resolve_self_attr_chain_and_path(n)
-                if not is_self or not chain:
-                    continue
+    def _reads_state(self, kind, test):
+        """
+        Returns: the compiled test (or iterable), the paths of the
+            compartments it reads, and if it reads a compartment that is not
+            fixed, in which case it can only be evaluated when the compiled
+            method runs and that is recorded as its guard
+        """
+        code, paths = _compile_expression(test), state_paths(test)
+        dynamic = state_dependency(self.obj, paths, self.loop_values) \
+            is not None
+        if dynamic:
+            self._guard(kind, (code, paths), None)
+        return code, paths, dynamic
+
+    def _guard(self, kind, subject, value, loop_values=None):
+        """
+        Records a value the transformed method was specialized on, see
+        `guard_holds`.
+        """
+        observed = observe(value)
+        if observed is _UNHASHABLE:
+            if self.uncacheable is None:
+                self.uncacheable = f"{type(value).__name__} value of " \
+                                   f"{subject if kind == 'attr' else kind}"
+            return
+        self.guards.append((kind, subject, dict(
+            self.loop_values if loop_values is None else loop_values),
+                            observed))
+
+    def _static_scope(self):
+        scope = {"self": self.obj}
+        scope.update(self.loop_values)
+        return scope
+
+    def _static_object(self, node):
+        """
+        Returns: the object an attribute, subscript, or name chain resolves to
+            when compiling, or _UNRESOLVED if it can not be resolved
+        """
+        if not _is_static_path(node):
+            return _UNRESOLVED
+        try:
+            return eval(_compile_expression(node), {}, self._static_scope())
+        except Exception:
+            return _UNRESOLVED
 
-                if chain[-1] == "targeted":
-                    continue
+    def _compartment_ast(self, node, compartment):
+        new_node = ast.copy_location(compartment._to_ast(node, 'ctx'), node)
+        self.needed_keys |= compartment.get_needed_keys()
+        self.needed_globals.update(compartment.get_needed_globals())
+        return ast.fix_missing_locations(new_node)
 
-                target = self.obj
-                try:
-                    for attr in chain:
-                        target = getattr(target, attr)
-                except AttributeError:
-                    continue
+    def _static_value_ast(self, node, value):
+        """
+        Returns: the node replacing a reference to a value known when
+            compiling, compartments are read from the state, literals are
+            written into the code, and anything else is baked into the
+            namespace
+        """
+        if isinstance(value, Compartment):
+            return self._compartment_ast(node, value)
+        if hasattr(value, '_is_compilable') and \
+                isinstance(type(value), ContextAwareObjectMeta):
+            return node
+        if is_constant(value):
+            return ast.copy_location(ast.Constant(value=value), node)
+        name = f"{self.obj.context_path.replace(':', '_')}_" \
+               f"{self.method.__name__}_static_{len(self._statics)}"
+        self._statics.append(name)
+        self.needed_globals[name] = value
+        return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+
+    def _visit_block(self, stmts):
+        new_body = []
+        for stmt in stmts:
+            visited = self.visit(stmt)
+            if visited is None:
+                continue
+            if isinstance(visited, list):
+                new_body.extend(visited)
+            else:
+                new_body.append(visited)
+        return new_body
 
-                if isinstance(target, Compartment) and not target.fixed:
-                    raise RuntimeError(f"{self.obj.name}:{self.method.__name__}:[{target.root}], Conditionals can not be dependant on model state")
+    def visit_Name(self, node):
+        if not isinstance(node.ctx, ast.Load):
+            self.bound_names.add(node.id)
+        elif node.id in self.loop_values:
+            return self._static_value_ast(node, self.loop_values[node.id])
+        return node
 
+    def visit_Subscript(self, node):
+        if isinstance(node.ctx, ast.Load):
+            value = self._static_object(node)
+            if isinstance(value, Compartment) or (
+                    hasattr(value, '_is_compilable') and
+                    isinstance(type(value), ContextAwareObjectMeta)):
+                self._guard("path", (_compile_expression(node),), value)
+                return self._static_value_ast(node, value)
+        return self.generic_visit(node)
+
+    def visit_For(self, node):
+        """
+        Loops over iterables that are known when compiling (like
+        `range(self.n)` or a list of compartments) are unrolled, the body is
+        compiled once for every item with the loop variables bound to the
+        values of that item, and the loop variables are then assigned the
+        values of the last item. Loops over the state, loops that break or
+        continue, and loops whose items can not be bound are kept.
+        """
+        if self._reads_locals(node.iter) or any(
+                isinstance(n, (ast.Break, ast.Continue))
+                for stmt in node.body for n in ast.walk(stmt)):
+            return self.generic_visit(node)
+        code, paths, dynamic = self._reads_state("loop", node.iter)
+        if dynamic:
+            return self.generic_visit(node)
+        items = _evaluate_iterable(code, self._static_scope())
+        self._guard("loop", (code, paths), items)
+        if items is _UNRESOLVED:
+            return self.generic_visit(node)
+        self.static_attributes |= _self_attributes(node.iter)
+        try:
+            bindings = [bind_loop_target(node.target, item) for item in items]
+        except Exception:
+            return self.generic_visit(node)
 
-        condition_expr = ast.Expression(node.test)
-        compiled = compile(ast.fix_missing_locations(condition_expr), "<ast>", "eval")
+        outer = self.loop_values
+        new_body = []
+        for bound in bindings:
+            self.loop_values = dict(outer, **bound)
+            new_body.extend(self._visit_block(copy.deepcopy(node.body)))
+        self.loop_values = outer
+        if len(bindings) > 0:
+            ## Like a loop that ran, the loop variables keep their last values
+            for name, value in bindings[-1].items():
+                read = ast.copy_location(ast.Name(id=name, ctx=ast.Load()),
+                                         node.target)
+                value = self._static_value_ast(read, value)
+                if value is read:
+                    ## Subcomponents are only known when compiling
+                    continue
+                self.bound_names.add(name)
+                new_body.append(ast.copy_location(ast.Assign(
+                    targets=[ast.Name(id=name, ctx=ast.Store())],
+                    value=value), node))
+        new_body.extend(self._visit_block(node.orelse))
+        return [ast.fix_missing_locations(n) for n in new_body]
+
+    def visit_If(self, node):
+        if self._reads_locals(node.test):
+            return self._visit_dynamic_if(node)
+        compiled, paths, dynamic = self._reads_state("test", node.test)
+        if dynamic:
+            return self._visit_dynamic_if(node)
 
         try:
-            value = eval(compiled, {}, {"self": self.obj})
+            value = bool(eval(compiled, {}, self._static_scope()))
         except Exception as e:
             raise RuntimeError(f"On {self.obj.name}:{self.method.__name__} can not evaluate conditional\n{ast.unparse(node)}")
+        self._guard("test", (compiled, paths), value)
+        self.static_attributes |= _self_attributes(node.test)
 
-        case = (node.body if value else node.orelse)
-        new_body = []
-        for stmt in case:
-            visited = self.visit(stmt)
-            if isinstance(visited, list):
-                new_body.extend(visited)
-            else:
-                new_body.append(visited)
+        new_body = self._visit_block(node.body if value else node.orelse)
 
         # Ensure each node has line/column metadata
         return [ast.fix_missing_locations(n) for n in new_body]
+
+    @staticmethod
+    def _assignment_key(target):
+        if isinstance(target, ast.Name):
+            return "name", target.id
+        if isinstance(target, ast.Subscript) and \
+                isinstance(target.value, ast.Name) and \
+                target.value.id == "ctx" and \
+                isinstance(target.slice, ast.Constant):
+            return "state", target.slice.value
+        return None
+
+    @classmethod
+    def _assignments(cls, stmts):
+        """
+        Returns: the target and value of every assignment in the statements,
+            or None if they are not all assignments to local variables or
+            compartments whose values do not touch the state
+        """
+        assignments = []
+        for stmt in stmts:
+            if isinstance(stmt, ast.Pass):
+                continue
+            if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+                target, value = stmt.targets[0], stmt.value
+            elif isinstance(stmt, ast.AugAssign):
+                target = stmt.target
+                load = copy.deepcopy(target)
+                load.ctx = ast.Load()
+                value = ast.BinOp(left=load, op=stmt.op, right=stmt.value)
+            else:
+                return None
+
+            if cls._assignment_key(target) is None or any(
+                    isinstance(n, ast.Call) and any(
+                        isinstance(arg, ast.Name) and arg.id == "ctx"
+                        for arg in n.args) for n in ast.walk(value)):
+                return None
+            assignments.append((target, value))
+        return assignments
+
+    @classmethod
+    def _is_safe(cls, value):
+        """
+        Returns: if computing the value can not fail or produce a value that
+            is only invalid when its branch is not taken, which holds for
+            reads of the state and of variables, constants, and additions,
+            subtractions, multiplications and negations of those
+        """
+        for n in ast.walk(value):
+            if isinstance(n, ast.Subscript):
+                if cls._assignment_key(n) is None:
+                    return False
+            elif isinstance(n, ast.BinOp):
+                if not isinstance(n.op, _SAFE_OPERATORS):
+                    return False
+            elif isinstance(n, ast.UnaryOp):
+                if not isinstance(n.op, _SAFE_UNARY_OPERATORS):
+                    return False
+            elif not isinstance(n, _SAFE_NODES):
+                return False
+        return True
+
+    def _visit_dynamic_if(self, node):
+        """
+        Conditionals that depend on the state are compiled to masked selects
+        when both branches only assign values: every assignment of both
+        branches is computed and each assigned compartment or variable then
+        selects the value of the branch that was taken, which also applies the
+        conditional element-wise to arrays. If a value is not safe to compute
+        when its branch is not taken (see `_is_safe`), like a division guarded
+        by the conditional, the select is only used when the test is an array
+        (see `element_wise`) and the conditional stays a runtime conditional
+        otherwise. Branches that do anything other than assign values stay a
+        runtime conditional, which can only test scalars.
+        """
+        bound = self.current_args | self.bound_names
+        test = self.visit(node.test)
+        body = self._visit_block(node.body)
+        orelse = self._visit_block(node.orelse)
+
+        branches = [self._assignments(body), self._assignments(orelse)]
+        if any(branch is None for branch in branches):
+            if diagnostics.enabled:
+                site = f"{self.obj.context_path}:{self.method.__name__}"
+                diagnostics.report("scalar-conditional",
+                                   (site, ast.unparse(node.test)),
+                                   "The conditional on the state in {} ({}) "
+                                   "does more than assign values, so it can "
+                                   "not be applied element-wise and its test "
+                                   "must be a scalar", site,
+                                   ast.unparse(node.test))
+            return ast.fix_missing_locations(ast.copy_location(ast.If(
+                test=test, body=body or [ast.Pass()], orelse=orelse), node))
+
+        prefix = f"_branch_{self._branches}"
+        self._branches += 1
+        self.needed_globals["ngcsimlib_select"] = select
+        cond = ast.Name(id=f"{prefix}_cond", ctx=ast.Load())
+
+        new_body = [ast.Assign(
+            targets=[ast.Name(id=f"{prefix}_cond", ctx=ast.Store())],
+            value=test)]
+        selects = self._select(prefix, branches, bound)
+        if all(self._is_safe(value) for branch in branches
+               for _, value in branch):
+            new_body.extend(selects)
+        else:
+            self.needed_globals["ngcsimlib_element_wise"] = element_wise
+            new_body.append(ast.If(
+                test=ast.Call(
+                    func=ast.Name(id="ngcsimlib_element_wise",
+                                  ctx=ast.Load()),
+                    args=[cond], keywords=[]),
+                body=selects,
+                orelse=[ast.If(test=copy.deepcopy(cond),
+                               body=body or [ast.Pass()], orelse=orelse)]))
+
+        return [ast.fix_missing_locations(ast.copy_location(stmt, node))
+                for stmt in new_body]
+
+    @classmethod
+    def _select(cls, prefix, branches, bound):
+        """
+        Returns: the statements computing every assignment of both branches
+            and selecting the value of each assigned compartment or variable
+            by the condition held in `<prefix>_cond`
+        """
+        new_body = []
+        targets = {}
+        values = []
+        for side, assignments in zip(("then", "else"), branches):
+            mapping = {}
+            for index, (target, value) in enumerate(assignments):
+                name = f"{prefix}_{side}_{index}"
+                new_body.append(ast.Assign(
+                    targets=[ast.Name(id=name, ctx=ast.Store())],
+                    value=_BranchValues(mapping).visit(copy.deepcopy(value))))
+                key = cls._assignment_key(target)
+                mapping[key] = name
+                targets.setdefault(key, target)
+            values.append(mapping)
+
+        for key, target in targets.items():
+            if key[0] == "name" and key[1] not in bound and \
+                    not all(key in mapping for mapping in values):
+                ## Only assigned, and so only used, in one of the branches
+                continue
+            current = copy.deepcopy(target)
+            current.ctx = ast.Load()
+            target = copy.deepcopy(target)
+            target.ctx = ast.Store()
+            new_body.append(ast.Assign(targets=[target], value=ast.Call(
+                func=ast.Name(id="ngcsimlib_select", ctx=ast.Load()),
+                args=[ast.Name(id=f"{prefix}_cond", ctx=ast.Load())] + [
+                    ast.Name(id=mapping[key], ctx=ast.Load())
+                    if key in mapping else current for mapping in values],
+                keywords=[])))
+        return new_body
+
+
+_UNRESOLVED = object()
+_UNHASHABLE = object()
+
+
+def _self_attributes(node):
+    """
+    Returns: the names of the attributes of self read in the expression
+    """
+    return {n.attr for n in ast.walk(node) if isinstance(n, ast.Attribute) and
+            isinstance(n.value, ast.Name) and n.value.id == "self"}
+
+## The nodes that can appear in the values of a conditional compiled to a
+## masked select, other than reads of the state and arithmetic
+_SAFE_NODES = (ast.Name, ast.Constant, ast.Load, ast.operator, ast.unaryop)
+_SAFE_OPERATORS = (ast.Add, ast.Sub, ast.Mult)
+_SAFE_UNARY_OPERATORS = (ast.UAdd, ast.USub)
+
+
+class _BranchValues(ast.NodeTransformer):
+    """
+    Replaces reads of the variables and compartments assigned earlier in a
+    branch with the names their values are held in.
+    """
+    def __init__(self, mapping):
+        self.mapping = mapping
+
+    def visit(self, node):
+        if isinstance(node, (ast.Name, ast.Subscript)) and \
+                isinstance(node.ctx, ast.Load):
+            name = self.mapping.get(
+                ContextTransformer._assignment_key(node), None)
+            if name is not None:
+                return ast.copy_location(ast.Name(id=name, ctx=ast.Load()),
+                                         node)
+        return super().visit(node)
@@ -0,0 +1,136 @@
+"""
+The cache of compiled specializations. Compiling resolves conditionals on
+static attributes and bakes the values of attributes into the compiled code,
+so every combination of those values is its own specialization of a method.
+Rather than throwing the previous specialization away whenever an attribute
+changes, the compiler keeps the most recently used specializations of every
+method (and of every process) keyed by the values they were specialized on, so
+switching a flag back and forth reuses the variants that were already
+compiled instead of compiling them again.
+"""
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Union
+
+from ngcsimlib._src.configManager import get_config
+
+
+class SpecializationCache:
+    """
+    Holds the compiled specializations of the methods of context aware objects.
+    Specializations are held for as long as the object they belong to is
+    alive, and only the most recently used `max_size` specializations of each
+    method are kept.
+
+    Args:
+        max_size (default=8): the number of specializations kept for each
+            method, 0 disables the cache
+    """
+    def __init__(self, max_size: int = 8):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        ## Specializations are stored on the objects they belong to, their
+        ## namespaces can refer back to the object
+        self._objects = weakref.WeakSet()
+
+    def configure(self) -> None:
+        """
+        Applies the "compiler" section of the global configuration, if one is
+        present. The section can set "specializations", the number of
+        specializations kept for each method.
+        """
+        config = get_config("compiler")
+        if config is None:
+            return
+        self.max_size = config.get("specializations", self.max_size)
+
+    def lookup(self, obj: Any, name: str,
+               key: Union[Hashable, None]) -> Union[Any, None]:
+        """
+        Args:
+            obj: the object the method belongs to
+
+            name: the name of the method
+
+            key: the values the method is specialized on, None if they are not
+                known
+
+        Returns: the specialization compiled for the key, or None if there is
+            not one
+        """
+        if key is None or self.max_size <= 0:
+            return None
+        variants = vars(obj).get("_specializations", {}).get(name, None)
+        if variants is None or key not in variants:
+            self.misses += 1
+            return None
+        self.hits += 1
+        variants.move_to_end(key)
+        return variants[key]
+
+    def find(self, obj: Any, name: str,
+             matches: Callable[[Hashable], bool]) -> Union[Any, None]:
+        """
+        Finds a specialization by what it was specialized on rather than by an
+        exact key, checking the most recently used specializations first.
+
+        Args:
+            obj: the object the method belongs to
+
+            name: the name of the method
+
+            matches: called with the key of each specialization, returns if
+                the specialization can be used
+
+        Returns: the first specialization that matches, or None if there is
+            not one
+        """
+        if self.max_size <= 0:
+            return None
+        variants = vars(obj).get("_specializations", {}).get(name, {})
+        for key in reversed(list(variants)):
+            if matches(key):
+                self.hits += 1
+                variants.move_to_end(key)
+                return variants[key]
+        self.misses += 1
+        return None
+
+    def store(self, obj: Any, name: str, key: Union[Hashable, None],
+              value: Any) -> None:
+        """
+        Stores a specialization, evicting the least recently used
+        specialization of the method if there are too many.
+
+        Args:
+            obj: the object the method belongs to
+
+            name: the name of the method
+
+            key: the values the method is specialized on, nothing is stored if
+                it is None
+
+            value: the specialization
+        """
+        if key is None or self.max_size <= 0:
+            return
+        self._objects.add(obj)
+        variants = vars(obj).setdefault("_specializations", {}).setdefault(
+            name, OrderedDict())
+        variants[key] = value
+        variants.move_to_end(key)
+        while len(variants) > self.max_size:
+            variants.popitem(last=False)
+
+    def clear(self, obj: Any = None) -> None:
+        """
+        Drops the specializations of an object, or of every object if no object
+        is given.
+        """
+        for target in (list(self._objects) if obj is None else [obj]):
+            vars(target).pop("_specializations", None)
+            self._objects.discard(target)
+
+
+specializations = SpecializationCache()
@@ -0,0 +1,199 @@
+"""
+Common subexpression elimination for compiled processes. The body of a
+compiled process is the bodies of every compiled method it runs, one after
+the other, so an operation wired into several destinations is evaluated once
+for every destination that reads it. This pass computes a pure expression once
+and reuses it for as long as none of the state it reads is written.
+
+An expression is pure if it is built from reads of the state, constants,
+names that are never assigned in the process, arithmetic, and calls to the
+kernels of fused operations. Compound statements (loops and the like) and
+calls that are passed the state are treated as barriers, nothing is reused
+across them.
+"""
+import ast
+import copy
+from typing import Dict, List, Set, Union
+
+_KERNEL_PREFIX = "ngcsimlib_"
+
+
+def _state_key(node: ast.AST) -> Union[str, None]:
+    if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) \
+            and node.value.id == "ctx" and isinstance(node.slice, ast.Constant) \
+            and isinstance(node.slice.value, str):
+        return node.slice.value
+    return None
+
+
+def _is_barrier(stmt: ast.stmt) -> bool:
+    if not isinstance(stmt, (ast.Assign, ast.AugAssign, ast.AnnAssign,
+                             ast.Expr, ast.Pass)):
+        return True
+    for node in ast.walk(stmt):
+        if isinstance(node, ast.Call) and any(
+                isinstance(arg, ast.Name) and arg.id == "ctx"
+                for arg in node.args):
+            return True
+    return False
+
+
+def _written_keys(stmt: ast.stmt) -> Union[Set[str], None]:
+    """
+    Returns: the state keys the statement writes, or None if it writes a key
+        that is not known when compiling
+    """
+    keys = set()
+    for node in ast.walk(stmt):
+        if isinstance(node, ast.Subscript) and \
+                isinstance(node.ctx, (ast.Store, ast.Del)):
+            key = _state_key(node)
+            if key is None:
+                return None
+            keys.add(key)
+    return keys
+
+
+class _Replacer(ast.NodeTransformer):
+    def __init__(self, replacements: Dict[int, str]):
+        self.replacements = replacements
+
+    def visit(self, node):
+        name = self.replacements.get(id(node), None)
+        if name is not None:
+            return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+        return super().visit(node)
+
+
+def eliminate_common_subexpressions(body: List[ast.stmt]) -> List[ast.stmt]:
+    """
+    Computes repeated pure expressions in a straight-line body once.
+
+    Args:
+        body: the statements of the body, they are not modified
+
+    Returns: the new statements of the body, statements without a repeated
+        expression are shared with the given body
+    """
+    unsafe = {"ctx"}
+    for stmt in body:
+        for node in ast.walk(stmt):
+            if isinstance(node, ast.Name) and \
+                    not isinstance(node.ctx, ast.Load):
+                unsafe.add(node.id)
+
+    groups = []
+    live = {}
+
+    def scan(node, index):
+        """
+        Returns: the state keys the expression reads (None if it is not pure),
+            its size, and its structure
+        """
+        key = _state_key(node)
+        if key is not None:
+            return {key}, 1, ("S", key)
+        if isinstance(node, ast.Constant):
+            return set(), 1, ("C", type(node.value), repr(node.value))
+        if isinstance(node, ast.Name):
+            return (None if node.id in unsafe else set()), 1, ("N", node.id)
+
+        if isinstance(node, ast.BinOp):
+            children, tag = [node.left, node.right], ("B", type(node.op))
+        elif isinstance(node, ast.UnaryOp):
+            children, tag = [node.operand], ("U", type(node.op))
+        elif isinstance(node, ast.Tuple):
+            children, tag = node.elts, ("T",)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) \
+                and node.func.id.startswith(_KERNEL_PREFIX) \
+                and len(node.keywords) == 0:
+            children, tag = node.args, ("K", node.func.id)
+        else:
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, ast.expr):
+                    scan(child, index)
+            return None, 1, None
+
+        keys, size, structure = set(), 1, [tag]
+        for child in children:
+            child_keys, child_size, child_structure = scan(child, index)
+            size += child_size
+            if keys is not None:
+                if child_keys is None:
+                    keys = None
+                else:
+                    keys |= child_keys
+                    structure.append(child_structure)
+        if keys is None:
+            return None, size, None
+
+        structure = tuple(structure)
+        if len(keys) > 0:
+            group = live.get(structure, None)
+            if group is None:
+                group = {"first": index, "keys": keys, "nodes": [],
+                         "size": size}
+                live[structure] = group
+                groups.append(group)
+            group["nodes"].append((node, index))
+        return keys, size, structure
+
+    for index, stmt in enumerate(body):
+        if _is_barrier(stmt):
+            live.clear()
+            continue
+        if getattr(stmt, "value", None) is not None:
+            scan(stmt.value, index)
+        written = _written_keys(stmt)
+        if written is None:
+            live.clear()
+        elif len(written) > 0:
+            for structure in [structure for structure, group in live.items()
+                              if group["keys"] & written]:
+                del live[structure]
+
+    ## Larger expressions are shared first, an occurrence inside a replaced
+    ## occurrence is gone unless it is inside the one kept for the assignment
+    replaced = {}
+    assignments = {}
+    gone = set()
+    count = 0
+    for group in sorted(groups, key=lambda g: -g["size"]):
+        nodes = [(node, index) for node, index in group["nodes"]
+                 if id(node) not in gone]
+        if len(nodes) < 2:
+            continue
+        name = f"_cse_{count}"
+        count += 1
+        for node, index in nodes:
+            replaced.setdefault(index, []).append((node, name))
+        for node, _ in nodes[1:]:
+            gone.update(id(child) for child in ast.walk(node))
+        assignments.setdefault(group["first"], []).append(
+            (group["size"], name, nodes[0]))
+
+    if len(assignments) == 0:
+        return list(body)
+
+    ## Only the statements that are rewritten are copied
+    copies = {}
+    copied_nodes = {}
+    names = {}
+    for index, nodes in replaced.items():
+        memo = {}
+        copies[index] = copy.deepcopy(body[index], memo)
+        for node, name in nodes:
+            copied_nodes[id(node)] = memo[id(node)]
+            names[id(memo[id(node)])] = name
+
+    replacer = _Replacer(names)
+    new_body = []
+    for index, stmt in enumerate(body):
+        for _, name, (node, _) in sorted(assignments.get(index, []),
+                                         key=lambda a: a[0]):
+            new_body.append(ast.copy_location(ast.Assign(
+                targets=[ast.Name(id=name, ctx=ast.Store())],
+                value=replacer.generic_visit(copied_nodes[id(node)])), stmt))
+        new_body.append(replacer.visit(copies[index]) if index in copies
+                        else stmt)
+    return new_body
@@ -0,0 +1,28 @@
+"""
+Parsing and compiling of syntax trees. CPython (before 3.12.1) keeps the
+state it uses to convert between syntax trees and their python objects per
+interpreter rather than per thread, so parsing or compiling syntax trees from
+several threads at once, as building models in parallel does, can fail with
+"AST constructor recursion depth mismatch". Every conversion the compiler does
+goes through these functions, which serialize them.
+"""
+import ast
+import threading
+
+_lock = threading.RLock()
+
+
+def parse_source(source: str) -> ast.Module:
+    """
+    Returns: the syntax tree of the source
+    """
+    with _lock:
+        return ast.parse(source)
+
+
+def compile_tree(tree: ast.AST, filename: str, mode: str):
+    """
+    Returns: the code object compiled from the syntax tree
+    """
+    with _lock:
+        return compile(tree, filename=filename, mode=mode)
@@ -1,8 +1,15 @@
 import inspect
+import importlib
+import weakref
 import ast, textwrap
-from .contextTransformer import ContextTransformer
+from types import ModuleType
+from .contextTransformer import ContextTransformer, guard_holds
 from .kwargsTransformer import KwargsTransformer
+from .specializations import specializations
+from .syntax import parse_source, compile_tree
 from ngcsimlib._src.context.contextAwareObjectMeta import ContextAwareObjectMeta
+from ngcsimlib._src.operations.BaseOp import wiring_epoch
+from ngcsimlib._src.diagnostics import diagnostics
 
 
 def compilable(fn):
@@ -17,12 +24,23 @@ def compilable(fn):
 
 
 class CompiledMethod:
-    def __init__(self, fn, fn_ast, auxiliary_ast, namespace, extra_globals):
+    """
+    A compiled method along with the metadata used to build it. Compiled
+    methods can be pickled, they are serialized as their generated source and
+    only the part of their namespace that the source refers to (baked
+    attributes, helper functions, and modules, which are stored by name and
+    re-imported). Unpickling executes the source again rather than recompiling
+    the model it came from, so a worker process can run a compiled process
+    without ever building the model.
+    """
+    def __init__(self, fn, fn_ast, auxiliary_ast, namespace, extra_globals,
+                 static_attributes=None):
         self._fn = fn
         self._fn_ast = fn_ast
         self._auxiliary_ast = auxiliary_ast or {}
         self._namespace = namespace
         self._extra_globals = extra_globals
+        self._static_attributes = frozenset(static_attributes or ())
 
 
     @property
@@ -41,6 +59,15 @@ class CompiledMethod:
     def namespace(self):
         return self._namespace
 
+    @property
+    def static_attributes(self):
+        """
+        The attributes of the object read by the conditionals and loops that
+        were resolved when compiling, changing them changes the structure of
+        the compiled method rather than a value baked into it
+        """
+        return self._static_attributes
+
     @property
     def code(self):
         blocks = [ast.unparse(aast) for _, aast in list(self._auxiliary_ast.items())[::-1]]
@@ -50,9 +77,92 @@ class CompiledMethod:
     def __call__(self, *args, **kwargs):
         return self._fn(*args, **kwargs)
 
-def _bind(obj, method, ast_obj, namespace=None, auxiliary_ast=None, extra_globals=None):
+    def captured_namespace(self):
+        """
+        Splits out the part of the namespace that the compiled source and its
+        auxiliary functions actually refer to.
+
+        Returns: the referenced values that are not modules, and the names of
+            the referenced modules, both keyed by the name they are bound to
+        """
+        captured = {}
+        modules = {}
+        for name in _free_names(self._fn_ast, *self._auxiliary_ast.values()):
+            if name not in self._namespace:
+                continue
+            value = self._namespace[name]
+            if isinstance(value, ModuleType):
+                modules[name] = value.__name__
+            else:
+                captured[name] = value
+        return captured, modules
+
+    def __reduce__(self):
+        captured, modules = self.captured_namespace()
+        return (_rebuild_compiled,
+                (ast.unparse(self._fn_ast),
+                 {name: ast.unparse(tree) for name, tree in
+                  self._auxiliary_ast.items()},
+                 captured,
+                 modules,
+                 list(self._extra_globals or {}),
+                 self._namespace.get("__name__", None)))
+
+
+def _free_names(*trees):
+    """
+    Returns: every name loaded in the given trees that is not a function
+        defined in them or an argument of one
+    """
+    loaded, defined = set(), set()
+    for tree in trees:
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+                loaded.add(node.id)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                defined.add(node.name)
+            elif isinstance(node, ast.arg):
+                defined.add(node.arg)
+    return loaded - defined
+
+
+def _rebuild_compiled(source, auxiliary_sources, captured, modules,
+                      extra_global_names, module_name):
+    namespace = {"__name__": module_name}
+    namespace.update(captured)
+    for name, module in modules.items():
+        namespace[name] = importlib.import_module(module)
+
+    auxiliary_ast = {}
+    for name, auxiliary_source in auxiliary_sources.items():
+        auxiliary_ast[name] = parse_source(auxiliary_source)
+        exec(compile_tree(auxiliary_ast[name], f"{name}_compiled", 'exec'),
+             namespace)
+
+    fn_ast = parse_source(source)
+    fn_name = fn_ast.body[0].name
+    exec(compile_tree(fn_ast, f"{fn_name}_compiled", 'exec'), namespace)
+
+    return CompiledMethod(
+        fn=namespace[fn_name],
+        fn_ast=fn_ast,
+        auxiliary_ast=auxiliary_ast,
+        namespace=namespace,
+        extra_globals={name: namespace[name] for name in extra_global_names
+                       if name in namespace}
+    )
+
+
+def _rebind(obj, method, compiled_method):
+    if isinstance(method, _methodWrapper):
+        method = method._method
+    setattr(obj, method.__name__, _methodWrapper(method, compiled_method))
+
+
+def _bind(obj, method, ast_obj, namespace=None, auxiliary_ast=None, extra_globals=None,
+          static_attributes=None):
     try:
-        code = compile(ast_obj, filename=f"{method.__name__}_compiled", mode='exec')
+        code = compile_tree(ast_obj, f"{method.__name__}_compiled", 'exec')
     except Exception as e:
         raise e
     namespace = method.__globals__.copy() if namespace is None else namespace
@@ -65,10 +175,12 @@ def _bind(obj, method, ast_obj, namespace=None, auxiliary_ast=None, extra_global
         fn_ast=ast_obj,
         auxiliary_ast=auxiliary_ast,
         namespace=namespace,
-        extra_globals=extra_globals
+        extra_globals=extra_globals,
+        static_attributes=static_attributes
     )
 
-    setattr(obj, method.__name__, _methodWrapper(method, compiled_method))
+    _rebind(obj, method, compiled_method)
+    return compiled_method
 
 
 def convert_kwargs(tree: ast.FunctionDef):
@@ -97,25 +209,84 @@ def parse_method(obj, method):
         .ast: for the ast tree of the parsed method
         .namespace: for the namespace used for the method
 
+    Parsed methods are cached as specializations of the method (see
+    `ngcsimlib._src.parser.specializations`), if the wiring of the context of
+    the object has not changed and every value a cached specialization was
+    specialized on still holds (see `ContextTransformer`) it is bound again
+    instead. Methods specialized on values that can not be compared are not
+    cached.
+
     Args:
         obj: The object for which the method is being compiled (relevant when
             values need to be pulled from the global state)
         method: The method to compile
     """
-    transformed, additional_modules, extra_globals = _sub_parse(obj, method)
+    fn = getattr(method, "__func__", method)
+    epoch = wiring_epoch(obj._state_manager, obj.context_path)
+    cached = specializations.find(obj, method.__name__,
+                                  lambda key: key.hold(obj, fn, epoch))
+    if cached is not None:
+        _rebind(obj, method, cached)
+        return
+
+    transformed, additional_modules, extra_globals, records = \
+        _sub_parse(obj, method)
     namespace = method.__globals__.copy()
     namespace.update(extra_globals)
     for method_name, module in additional_modules.items():
-        code = compile(module, filename=f"{method_name}_compiled", mode='exec')
+        code = compile_tree(module, f"{method_name}_compiled", 'exec')
         exec(code, namespace)
 
-    _bind(obj, method, transformed, namespace,
-          additional_modules, extra_globals)
+    compiled_method = _bind(obj, method, transformed, namespace,
+                            additional_modules, extra_globals,
+                            records.static_attributes)
+    if records.uncacheable is not None:
+        if diagnostics.enabled:
+            diagnostics.report("uncacheable-specialization",
+                               (obj.context_path, method.__name__),
+                               "{}:{} is not cached as a specialization, it "
+                               "was specialized on the unhashable {}",
+                               obj.context_path, method.__name__,
+                               records.uncacheable)
+        return
+    specializations.store(obj, method.__name__,
+                          _Guards(fn, epoch, records.guards), compiled_method)
+
+
+## The source of every parsed function
+_sources = weakref.WeakKeyDictionary()
+
+
+def _source(fn):
+    fn = getattr(fn, "__func__", fn)
+    source = _sources.get(fn, None)
+    if source is None:
+        source = textwrap.dedent(inspect.getsource(fn))
+        _sources[fn] = source
+    return source
+
+
+class _Guards:
+    """
+    The key of a specialization of a method: the function it was parsed from,
+    the wiring epoch of the context of the object when it was parsed, and the
+    guards recorded by `ContextTransformer` while parsing it. Keys are
+    compared by identity, a specialization is found by checking its guards.
+    """
+    __slots__ = ("fn", "epoch", "guards")
+
+    def __init__(self, fn, epoch, guards):
+        self.fn = fn
+        self.epoch = epoch
+        self.guards = tuple(guards)
+
+    def hold(self, obj, fn, epoch):
+        return self.fn is fn and self.epoch == epoch and \
+            all(guard_holds(obj, guard) for guard in self.guards)
 
 
 def _sub_parse(obj, method, sub=False):
-    source = textwrap.dedent(inspect.getsource(method))
-    tree = ast.parse(source)
+    tree = parse_source(_source(method))
     transformer = ContextTransformer(obj, method, subMethod=sub)
     transformed = transformer.visit(tree)
     ast.fix_missing_locations(transformed)
@@ -125,12 +296,19 @@ def _sub_parse(obj, method, sub=False):
 
 
     for bound_name, method_name in transformer.needed_methods.items():
-        method, adm, g = _sub_parse(obj, getattr(obj, method_name), sub=True)
+        method, adm, g, records = _sub_parse(obj, getattr(obj, method_name),
+                                             sub=True)
         additional_modules[bound_name] = method
         additional_modules.update(adm)
         extra_globals.update(g)
+        ## What the helper methods were specialized on is part of what the
+        ## method was specialized on
+        transformer.guards.extend(records.guards)
+        transformer.static_attributes |= records.static_attributes
+        transformer.uncacheable = transformer.uncacheable or \
+            records.uncacheable
 
-    return transformed, additional_modules, extra_globals
+    return transformed, additional_modules, extra_globals, transformer
 
 
 def compileObject(obj):
@@ -152,6 +330,12 @@ def compileObject(obj):
                 compileObject(attr)
             else:
                 deferred_compile.append(attr)
+        elif isinstance(attr, (list, tuple)):
+            ## Children held in a list can be called from unrolled loops
+            for item in attr:
+                if hasattr(item, "_is_compilable") and \
+                        isinstance(type(item), ContextAwareObjectMeta):
+                    compileObject(item)
 
     for attr in deferred_compile:
         parse_method(obj, attr)
@@ -159,12 +343,27 @@ def compileObject(obj):
 
 
 class _methodWrapper:
+    """
+    Wraps a method of an object along with its compiled version. Calling the
+    wrapper calls the method, unless the wrapper was unpickled: the object
+    the method belongs to is not pickled along with it, so an unpickled
+    wrapper calls the compiled method, which takes the state to run against
+    explicitly (for a process, `run(state, keywords)` returns the final state
+    and the watched values) and never touches a state manager.
+    """
     def __init__(self, bound_method, compiled):
         self._method = bound_method
         self.compiled = compiled
 
     def __call__(self, *args, **kwargs):
+        if self._method is None:
+            return self.compiled(*args, **kwargs)
         return self._method(*args, **kwargs)
 
+    def __reduce__(self):
+        # The bound method would drag the whole model along with it, so only
+        # the compiled method is kept
+        return _methodWrapper, (None, self.compiled)
+
     def __getattr__(self, attr):
         return getattr(self._method, attr)
@@ -0,0 +1,168 @@
+"""
+Awaitable versions of running processes and saving contexts. The work
+(including loading any deferred objects a process needs) is offloaded to an
+executor so the event loop is never blocked. Every operation on a state
+manager waits for that state manager's asyncio lock for the running event
+loop, so concurrent coroutines queue on the event loop rather than on the
+executor, and then runs holding the state manager's `run_lock`, the same lock
+synchronous runs hold, so no two runs (awaitable or not, from any thread or
+event loop) can interleave their reads and writes of the same state. Work on
+different state managers runs concurrently.
+
+Cancelling one of these coroutines is safe: work that has not finished when
+its caller is cancelled never writes its result to the state manager, and the
+locks are only released once the work has actually stopped running on the
+executor, so nothing else can observe the state while it is still in flight.
+"""
+import asyncio
+import threading
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Union, \
+    TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ngcsimlib._src.global_state.manager import StateManager
+    from ngcsimlib._src.process.baseProcess import BaseProcess
+    from ngcsimlib._src.context.context import Context
+
+
+async def serialized(state_manager: "StateManager",
+                     executor: Union[Executor, None],
+                     fn: Callable[[threading.Event], Any],
+                     apply: Union[Callable[[Any], None], None] = None) -> Any:
+    """
+    Runs `fn` on an executor while holding the asyncio lock of the state
+    manager, and, on the executor, its run lock, under which the result is
+    also applied.
+
+    Args:
+        state_manager: the state manager to serialize on
+
+        executor: the executor to run on, if None the event loop's default
+            executor is used
+
+        fn: the work to run, it is passed an event that is set if the caller
+            is cancelled so that long-running work can stop early
+
+        apply (default=None): a function applying the result, called on the
+            executor only if the caller was not cancelled before `fn` finished
+
+    Returns: the result of `fn`
+    """
+    loop = asyncio.get_running_loop()
+    lock = state_manager.async_lock
+    cancelled = threading.Event()
+    ## Cancelling and applying the result exclude each other, so a result is
+    ## either applied before the caller is cancelled or not at all
+    applying = threading.Lock()
+
+    def run():
+        with state_manager.run_lock:
+            if cancelled.is_set():
+                return None
+            result = fn(cancelled)
+            with applying:
+                if apply is not None and not cancelled.is_set():
+                    apply(result)
+            return result
+
+    await lock.acquire()
+    try:
+        future = loop.run_in_executor(executor, run)
+    except BaseException:
+        lock.release()
+        raise
+
+    try:
+        result = await asyncio.shield(future)
+    except asyncio.CancelledError:
+        with applying:
+            cancelled.set()
+        if future.done():
+            lock.release()
+        else:
+            future.add_done_callback(lambda _: lock.release())
+        raise
+    except BaseException:
+        lock.release()
+        raise
+
+    lock.release()
+    return result
+
+
+async def run_async(process: "BaseProcess", state=None, keywords=None,
+                    update=True, row_seed=None,
+                    executor: Union[Executor, None] = None, **kwargs) -> \
+        Tuple[Dict[str, Any], Any]:
+    """
+    Awaitable version of `BaseProcess.run`.
+
+    Returns: The final state, watched values as a tuple
+    """
+    state_manager = process._state_manager
+
+    def work(_):
+        if not process._prepare_run():
+            return None
+        start = state_manager.state if state is None else state
+        row = keywords if keywords is not None else \
+            process.pack_keywords(row_seed=row_seed, **kwargs)
+        return process.run.compiled(start, row)
+
+    def apply(result):
+        if update and result is not None:
+            state_manager.set_state(result[0])
+
+    return await serialized(state_manager, executor, work, apply)
+
+
+async def scan_async(process: "BaseProcess", rows: Sequence[List[Any]],
+                     state=None, update=True,
+                     executor: Union[Executor, None] = None) -> \
+        Tuple[Dict[str, Any], List[Any]]:
+    """
+    Awaitable run of the process over every row of packed keywords, as produced
+    by `pack_rows`. All the rows are run in a single call on the executor,
+    which stops between rows if the caller is cancelled.
+
+    Returns: The final state, the watched values of every step
+    """
+    state_manager = process._state_manager
+
+    def work(cancelled):
+        if not process._prepare_run():
+            return None
+        compiled = process.run.compiled
+        current = state_manager.state if state is None else state
+        watched = []
+        for row in rows:
+            if cancelled.is_set():
+                break
+            current, values = compiled(current, row)
+            watched.append(values)
+        return current, watched
+
+    def apply(result):
+        if update and result is not None:
+            state_manager.set_state(result[0])
+
+    return await serialized(state_manager, executor, work, apply)
+
+
+async def save_async(context: "Context", directory: str,
+                     model_name: Union[str, None] = None,
+                     archive: bool = False,
+                     executor: Union[Executor, None] = None,
+                     **kwargs) -> Any:
+    """
+    Awaitable version of `Context.save_to_json` (or `Context.save_to_archive`
+    if `archive` is set). No process of the context's state manager can apply
+    a new state while the context is being saved, even if the caller is
+    cancelled part way through.
+
+    Returns: whatever the underlying save method returns
+    """
+    save = context.save_to_archive if archive else context.save_to_json
+    return await serialized(context.state_manager, executor,
+                            lambda _: save(directory, model_name, **kwargs))
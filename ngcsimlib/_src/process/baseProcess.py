@@ -1,14 +1,23 @@
 from ngcsimlib._src.context.contextAwareObjectMeta import ContextAwareObjectMeta
 from ngcsimlib._src.context.contextObjectDecorators import process
-from ngcsimlib._src.global_state.manager import global_state_manager
+from ngcsimlib._src.context.context import ensure_dependencies_loaded
 from ngcsimlib._src.logger import warn, error
 from ngcsimlib._src.utils.priority import priority
-from ngcsimlib._src.parser.utils import compilable, _bind as bind
+from ngcsimlib._src.parser.utils import compilable, _bind as bind, \
+    _rebind as rebind
+from ngcsimlib._src.parser.specializations import specializations
+from ngcsimlib._src.parser.subexpressions import \
+    eliminate_common_subexpressions
+from ngcsimlib._src.process.exporter import export_processes
+from ngcsimlib._src.process.packing import is_vectorized, keyword_kind, \
+    make_column_packer, repeat, repeat_list
+from ngcsimlib._src.process.streaming import prefetched
 from ngcsimlib._src.compartment import Compartment
 
 import ast
 
-from typing import Union, TypeVar, Callable, List, Tuple, Dict
+from typing import Union, TypeVar, Callable, List, Tuple, Dict, Sequence, \
+    Iterable, Iterator, Mapping, Any
 from numbers import Number
 T = TypeVar('T')
 
@@ -19,7 +28,9 @@ class BaseProcess(metaclass=ContextAwareObjectMeta):
     def __init__(self, name):
         self.name = name
         self._keyword_order: List[str] = []
+        self._column_packers: Dict[Tuple[str, ...], Callable] = {}
         self._watch_list: List[Compartment] = []
+        self._objects_loaded: bool = False
 
     @property
     def watch_list(self):
@@ -35,6 +46,21 @@ class BaseProcess(metaclass=ContextAwareObjectMeta):
         return "Not Compiled"
 
 
+    def export(self, path: str, state_path: Union[str, None] = None) -> str:
+        """
+        Exports this compiled process to a standalone python module, see
+        `export_processes` for details.
+
+        Args:
+            path: the path of the python module to write
+
+            state_path (default=None): if provided the current state is written
+                to this path
+
+        Returns: the path of the written module
+        """
+        return export_processes(path, self, state_path=state_path)
+
     def watch(self, *compartments: Compartment):
         """
         Sets up the process to watch and return the values of specified
@@ -44,6 +70,7 @@ class BaseProcess(metaclass=ContextAwareObjectMeta):
             *compartments: positional arguments where each one is a Compartment
         """
         self._watch_list.extend(compartments)
+        self._objects_loaded = False
 
 
     def get_keywords(self):
@@ -80,7 +107,8 @@ class BaseProcess(metaclass=ContextAwareObjectMeta):
             if callable(val):
                 if row_seed is None:
                     error(f"Making an unseeded row but encountered a keyword ({key}) that has a generator and needs a seed")
-                row.append(val(row_seed))
+                row.append(val([row_seed])[0] if is_vectorized(val)
+                           else val(row_seed))
             else:
                 row.append(val)
         return row
@@ -101,24 +129,72 @@ class BaseProcess(metaclass=ContextAwareObjectMeta):
         Returns: a list of rows of keywords in the order the process expects
 
         """
-        if seed_generator is None:
-            seed_generator = lambda x: x
-        return [self.pack_keywords(seed_generator(i), **kwargs) for i in range(length)]
+        if len(self._keyword_order) == 0:
+            return [[] for _ in range(length)]
+        ## Constants are repeated into lists, the rows hold them as they are
+        columns = self._pack(length, seed_generator, kwargs, repeat_list)
+        return [list(row) for row in zip(*columns)]
+
+    def pack_columns(self, length: int,
+                     seed_generator: Union[Callable[[Number], T], None] = None,
+                     **kwargs: Union[Number, Callable]) -> List[Sequence]:
+        """
+        Packs multiple rows of keywords as one column per keyword, in the order
+        the process expects them. The keywords are only validated once, and the
+        packing itself is done by a function generated for the process and the
+        kinds of keyword values it is given. Constant keywords are repeated
+        down their column (into arrays, see `packing.repeat`), generators
+        are called once per row with that row's seed, and generators marked
+        with `@vectorized` are called once with the seeds of every row and
+        return the whole column.
+
+        Args:
+            length: The number of rows of keywords to pack
+            seed_generator: A generator to produce the seeds for the rows, if
+                no generator is provided the row index will be used as the seed.
+            **kwargs: Either the constant value, a lambda expression for
+                producing keyword arguments based on a given seed, or a
+                vectorized generator producing the whole column from the seeds.
+
+        Returns: A list of columns, one per keyword
+        """
+        return self._pack(length, seed_generator, kwargs, repeat)
+
+    def _pack(self, length, seed_generator, kwargs, repeat_constant):
+        for key in self._keyword_order:
+            if key not in kwargs:
+                error(f"Key {key} is required to pack the arguments for process {self.name}")
+
+        values = [kwargs[key] for key in self._keyword_order]
+        kinds = tuple(keyword_kind(val) for val in values)
+        packer = self._column_packers.get(kinds, None)
+        if packer is None:
+            packer = make_column_packer(self._keyword_order, kinds)
+            self._column_packers[kinds] = packer
+        if any(kind != "constant" for kind in kinds):
+            seeds = range(length) if seed_generator is None \
+                else [seed_generator(i) for i in range(length)]
+        else:
+            seeds = None
+        return packer(seeds, length, repeat_constant, *values)
 
     def is_compiled(self) -> bool:
         return hasattr(self.run, "compiled")
 
     def run(self, state=None, keywords=None, update=True, row_seed=None, **kwargs):
         """
-        Runs the compiled process.
+        Runs the compiled process. Every run writes back the whole state it
+        started from, so runs against the same state manager (including the
+        awaitable ones) are serialized through its `run_lock`, and concurrent
+        runs only run in parallel on separate state managers.
 
         Args:
             state: the initial state to use, if None it will default to the
-                current global state.
+                current state of the state manager the process is bound to.
             keywords: the packed keywords to use, if None it will default to
                 using the kwargs and packing them based on the row seed
-            update: should the global state be updated after the process is
-                finished running.
+            update: should the bound state manager be updated after the
+                process is finished running.
             row_seed: if no keywords are provided it will pass this value when
                 packing the keywords.
 
@@ -129,28 +205,167 @@ class BaseProcess(metaclass=ContextAwareObjectMeta):
         Returns: The final state, watched values as a tuple
 
         """
-        if self.is_compiled():
-            if state is None:
-                state = global_state_manager.state
-            if keywords is None:
-                keywords = self.pack_keywords(row_seed=row_seed, **kwargs)
-            final_state, other = self.run.compiled(state, keywords)
-            if update:
-                global_state_manager.set_state(final_state)
-            return final_state, other
-        else:
+        with self._state_manager.run_lock:
+            if self._prepare_run():
+                if state is None:
+                    state = self._state_manager.state
+                if keywords is None:
+                    keywords = self.pack_keywords(row_seed=row_seed, **kwargs)
+                final_state, other = self.run.compiled(state, keywords)
+                if update:
+                    self._state_manager.set_state(final_state)
+                return final_state, other
+
+    async def run_async(self, state=None, keywords=None, update=True,
+                        row_seed=None, executor=None, **kwargs):
+        """
+        Awaitable version of `run`. The compiled process runs on an executor
+        so the event loop is not blocked, and runs against the same state
+        manager are serialized so concurrent coroutines never interleave their
+        updates. If the caller is cancelled the result is discarded.
+
+        Args:
+            executor (default=None): the executor to run on, if None the event
+                loop's default executor is used
+
+            see `run` for the other arguments
+
+        Returns: The final state, watched values as a tuple
+        """
+        from ngcsimlib._src.process.asyncRunner import run_async
+        return await run_async(self, state=state, keywords=keywords,
+                               update=update, row_seed=row_seed,
+                               executor=executor, **kwargs)
+
+    async def scan_async(self, rows, state=None, update=True, executor=None):
+        """
+        Awaitably runs the process once for every row of packed keywords (as
+        produced by `pack_rows`) in a single call on an executor. Scans against
+        the same state manager are serialized with every other awaitable run,
+        and a cancelled scan stops between rows and discards its result.
+
+        Args:
+            rows: the packed rows of keywords to run
+            state: the initial state to use, if None it will default to the
+                current state of the state manager the process is bound to.
+            update: should the bound state manager be updated after the scan
+            executor (default=None): the executor to run on, if None the event
+                loop's default executor is used
+
+        Returns: The final state, the watched values of every step
+        """
+        from ngcsimlib._src.process.asyncRunner import scan_async
+        return await scan_async(self, rows, state=state, update=update,
+                                executor=executor)
+
+    def _prepare_run(self) -> bool:
+        if not self.is_compiled():
             warn("Trying to run a process while it is not compiled. Make sure "
                  "that the context that the process was created in has been "
                  "closed before trying to run the method.")
+            return False
+        if not self._objects_loaded:
+            ensure_dependencies_loaded(self._objects(), self._watch_list,
+                                       self._state_manager)
+            self._objects_loaded = True
+        return True
+
+
+    def run_stream(self, rows: Iterable[Union[Mapping[str, Any], Sequence]],
+                   state=None, update=True,
+                   flush_every: Union[int, None] = None,
+                   prefetch: int = 0) -> Iterator[Any]:
+        """
+        Runs the compiled process over a stream of keyword rows, pulling each
+        row only when the previous step is done, and yields the watched values
+        of every step. The state is kept local to the stream and only written
+        back to the state manager at flush points and when the stream ends (or
+        the generator is closed).
 
+        Args:
+            rows: an iterable of either dictionaries of keyword arguments, which
+                are packed with `pack_keywords` using the row index as the seed,
+                or rows that are already packed
+            state: the initial state to use, if None it will default to the
+                current state of the state manager the process is bound to.
+            update: should the bound state manager be updated at flush points
+                and when the stream ends.
+            flush_every (default=None): write the state back to the state
+                manager every this many steps, if None only when the stream
+                ends.
+            prefetch (default=0): if greater than 0 rows are pulled and packed
+                on a helper thread, keeping at most this many waiting, which
+                blocks the helper thread (and so the source of the rows) while
+                the simulation is behind.
+
+        Returns: an iterator over the watched values of each step
+        """
+        if not self._prepare_run():
+            return
+        if state is None:
+            state = self._state_manager.state
+
+        packed = (self._pack_stream_row(index, row)
+                  for index, row in enumerate(rows))
+        if prefetch > 0:
+            packed = prefetched(packed, prefetch)
+
+        compiled = self.run.compiled
+        try:
+            for step, keywords in enumerate(packed, 1):
+                state, watched = compiled(state, keywords)
+                if update and flush_every is not None and \
+                        step % flush_every == 0:
+                    self._state_manager.set_state(state)
+                yield watched
+        finally:
+            packed.close()
+            if update:
+                self._state_manager.set_state(state)
+
+    def _pack_stream_row(self, index: int,
+                         row: Union[Mapping[str, Any], Sequence]) -> List:
+        if isinstance(row, Mapping):
+            return self.pack_keywords(row_seed=index, **row)
+        return list(row)
+
+    def _objects(self) -> List:
+        """
+        Returns: The context aware objects used by this process
+        """
+        return []
 
     def _parse(self) -> Tuple[List, List, List, Dict]:
         raise NotImplemented
 
+    ## The attributes that compiling sets, restored along with a cached
+    ## specialization of the process
+    _compiled_attributes = ("_keyword_order", "_column_packers", "_watch_list")
+
+    def _compile_key(self) -> Union[Tuple, None]:
+        """
+        Returns: everything the compiled process depends on (usually the
+            compiled methods it is built from), or None if the process should
+            not be cached
+        """
+        return None
+
     def compile(self):
+        key = self._compile_key()
+        cached = specializations.lookup(self, "run", key)
+        if cached is not None:
+            compiled, attributes = cached
+            for name, value in attributes.items():
+                setattr(self, name, list(value) if isinstance(value, list)
+                        else value)
+            rebind(self, self.run, compiled)
+            return
+
         bodies, extras, key_list, namespace = self._parse()
+        bodies = eliminate_common_subexpressions(bodies)
 
         self._keyword_order = key_list
+        self._column_packers = {}
 
         watched = ast.Constant(value=None)
         if len(self._watch_list) > 0:
@@ -203,8 +418,12 @@ class BaseProcess(metaclass=ContextAwareObjectMeta):
 
         ast.fix_missing_locations(_compiled)
 
-        bind(self,
-             self.run,
-             _compiled,
-             namespace=namespace,
-             auxiliary_ast=extras)
\ No newline at end of file
+        compiled = bind(self,
+                        self.run,
+                        _compiled,
+                        namespace=namespace,
+                        auxiliary_ast=extras)
+        specializations.store(self, "run", key, (compiled, {
+            name: list(getattr(self, name))
+            if isinstance(getattr(self, name), list) else getattr(self, name)
+            for name in self._compiled_attributes}))
\ No newline at end of file
@@ -0,0 +1,424 @@
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Union, \
+    TYPE_CHECKING
+
+from ngcsimlib._src.logger import error, warn
+
+if TYPE_CHECKING:
+    from ngcsimlib._src.compartment import Compartment
+    from ngcsimlib._src.process.baseProcess import BaseProcess
+
+_STOP = object()
+
+
+def stack(values: List[Any]) -> Any:
+    """
+    The default way of stacking request inputs along a new leading batch axis.
+    Arrays that implement the array API are stacked with their own namespace,
+    anything else (including scalars) is converted and stacked with numpy.
+    """
+    if hasattr(values[0], "__array_namespace__"):
+        return values[0].__array_namespace__().stack(values)
+    try:
+        import numpy
+    except ImportError:
+        error("Stacking request inputs that are not arrays requires numpy, "
+              "provide a `stack` function to the batch server to batch "
+              "them", errorCls=TypeError)
+    return numpy.stack([numpy.asarray(value) for value in values])
+
+
+def unstack(value: Any, size: int) -> List[Any]:
+    """
+    The default way of splitting a batched output back into one value per
+    request, indexing along the leading batch axis.
+    """
+    return [value[i] for i in range(size)]
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if len(ordered) == 0:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class BatchServer:
+    """
+    Serves many small requests against one compiled process by running them in
+    batches. Requests are collected until either `max_batch_size` of them are
+    waiting or `max_latency` seconds have passed since the first one arrived.
+    The inputs of every request in a batch are stacked along a batch axis and
+    clamped into the input compartments, the process is run once, and each
+    watched output is split back up and returned to its request. Serving runs
+    on the current state without updating it, so requests never see each
+    other.
+
+    Requests can be submitted in process with `submit`, or over a Unix socket
+    with `serve_unix` and `BatchClient`. Requests and replies are pickled on
+    the socket, so connections have to authenticate with a shared key before
+    anything is read from them.
+
+    Args:
+        process: the compiled process to run, its watch list is the output of
+            every request
+
+        inputs: the compartments that each request provides a value for
+
+        max_batch_size (default=32): the largest number of requests to run
+            together
+
+        max_latency (default=0.005): the longest time, in seconds, that the
+            first request of a batch waits for more requests to arrive
+
+        keywords (default=None): the keyword arguments to run the process
+            with, packed once for every batch
+
+        stack (default=None): a function stacking a list of inputs into a batch,
+            if None array API arrays are stacked with their own namespace and
+            anything else is stacked with numpy
+
+        unstack (default=None): a function splitting a batched output into a
+            list of a given size, if None the output is indexed
+
+        metrics_window (default=10000): the number of most recent request
+            latencies kept for the latency metrics
+    """
+    def __init__(self, process: "BaseProcess", inputs: Sequence["Compartment"],
+                 max_batch_size: int = 32, max_latency: float = 0.005,
+                 keywords: Union[Dict[str, Any], None] = None,
+                 stack: Union[Callable[[List[Any]], Any], None] = None,
+                 unstack: Union[Callable[[Any, int], List[Any]], None] = None,
+                 metrics_window: int = 10000):
+        if not process.is_compiled():
+            error(f"Trying to serve the process {process.name} while it is not "
+                  f"compiled. Make sure that the context that the process was "
+                  f"created in has been closed before serving it.")
+        process._prepare_run()
+
+        self.process = process
+        self.inputs = list(inputs)
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self._stack = stack or globals()["stack"]
+        self._unstack = unstack or globals()["unstack"]
+        self._keywords = process.pack_keywords(**(keywords or {}))
+        self._targets = [compartment.target for compartment in self.inputs]
+
+        self._requests = queue.Queue()
+        self._latencies = deque(maxlen=metrics_window)
+        self._batches = 0
+        self._served = 0
+        self._metrics_lock = threading.Lock()
+
+        self._listeners: List[Listener] = []
+        self._closed = False
+        ## Held while checking that the server is open and queueing a request,
+        ## and while closing it, so nothing is queued after it stops
+        self._submit_lock = threading.Lock()
+        self._batcher = threading.Thread(target=self._batch_loop,
+                                         name="ngcsimlib-batcher",
+                                         daemon=True)
+        self._batcher.start()
+
+    def submit(self, *values: Any) -> Future:
+        """
+        Submits a request.
+
+        Args:
+            *values: the value of each input compartment, in order
+
+        Returns: a future resolving to the watched values of the request
+        """
+        if len(values) != len(self.inputs):
+            error(f"Expected {len(self.inputs)} input values but got "
+                  f"{len(values)}", errorCls=ValueError)
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                error("Trying to submit a request to a closed batch server")
+            self._requests.put((time.perf_counter(), values, future))
+        return future
+
+    def __call__(self, *values: Any) -> Tuple[Any, ...]:
+        return self.submit(*values).result()
+
+    def _collect(self) -> List[Tuple[float, Tuple, Future]]:
+        first = self._requests.get()
+        if first is _STOP:
+            return []
+        batch = [first]
+        deadline = first[0] + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self._requests.get(timeout=max(timeout, 0)) \
+                    if timeout > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                self._requests.put(_STOP)
+                break
+            batch.append(request)
+        return batch
+
+    def _batch_loop(self) -> None:
+        while True:
+            batch = self._collect()
+            if len(batch) == 0:
+                return
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[Tuple[float, Tuple, Future]]) -> None:
+        batch = [request for request in batch
+                 if request[2].set_running_or_notify_cancel()]
+        if len(batch) == 0:
+            return
+
+        size = len(batch)
+        try:
+            state = self.process._state_manager.state
+            for i, target in enumerate(self._targets):
+                state[target] = self._stack([values[i] for _, values, _
+                                             in batch])
+            _, watched = self.process.run.compiled(state, self._keywords)
+            outputs = [self._unstack(value, size) for value in watched or ()]
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        done = time.perf_counter()
+        with self._metrics_lock:
+            self._batches += 1
+            self._served += size
+            self._latencies.extend(done - start for start, _, _ in batch)
+        for i, (_, _, future) in enumerate(batch):
+            future.set_result(tuple(output[i] for output in outputs))
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Returns: the number of requests served and batches run, the mean batch
+            size, and the p50 and p99 latencies (in seconds) of the most recent
+            requests
+        """
+        with self._metrics_lock:
+            latencies = sorted(self._latencies)
+            batches, served = self._batches, self._served
+        return {"requests": served,
+                "batches": batches,
+                "mean_batch_size": served / batches if batches else 0.0,
+                "p50": _percentile(latencies, 0.50),
+                "p99": _percentile(latencies, 0.99)}
+
+    def serve_unix(self, path: str, authkey: bytes,
+                   mode: int = 0o600) -> Listener:
+        """
+        Starts accepting requests from `BatchClient`s on a Unix socket. Each
+        connection is served on its own thread, and requests from every
+        connection are batched together. Connections that do not
+        authenticate with the key are dropped before anything is read from
+        them.
+
+        Args:
+            path: the path of the Unix socket to listen on
+
+            authkey: the key clients have to authenticate with
+
+            mode (default=0o600): the permissions of the socket file, by
+                default only the owner can connect
+
+        Returns: the listener, which is closed along with the server
+        """
+        if not isinstance(authkey, bytes) or len(authkey) == 0:
+            error("Serving on a Unix socket requires an authentication key",
+                  errorCls=ValueError)
+        listener = Listener(path, family="AF_UNIX", authkey=authkey)
+        os.chmod(path, mode)
+        self._listeners.append(listener)
+        threading.Thread(target=self._accept_loop, args=(listener,),
+                         name="ngcsimlib-batch-listener", daemon=True).start()
+        return listener
+
+    def _accept_loop(self, listener: Listener) -> None:
+        while not self._closed:
+            try:
+                connection = listener.accept()
+            except AuthenticationError:
+                continue
+            except OSError:
+                return
+            threading.Thread(target=self._connection_loop, args=(connection,),
+                             name="ngcsimlib-batch-connection",
+                             daemon=True).start()
+
+    def _connection_loop(self, connection) -> None:
+        send_lock = threading.Lock()
+
+        def reply(request_id, future):
+            try:
+                message = (request_id, True, future.result())
+            except Exception as e:
+                message = (request_id, False, e)
+            with send_lock:
+                try:
+                    connection.send(message)
+                except OSError:
+                    pass
+
+        with connection:
+            while not self._closed:
+                try:
+                    request_id, values = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    future = self.submit(*values)
+                except Exception as e:
+                    future = Future()
+                    future.set_exception(e)
+                future.add_done_callback(
+                    lambda f, rid=request_id: reply(rid, f))
+
+    def close(self) -> None:
+        """
+        Stops accepting requests, finishes the requests already submitted, and
+        closes any Unix socket listeners.
+        """
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._requests.put(_STOP)
+        for listener in self._listeners:
+            try:
+                listener.close()
+            except OSError as e:
+                warn(f"Failed to close batch server listener. Reason: {e}")
+        self._batcher.join()
+
+        ## Nothing should be left behind the stop, but a request that is would
+        ## never be answered
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is not _STOP and \
+                    request[2].set_running_or_notify_cancel():
+                request[2].set_exception(RuntimeError(
+                    "The batch server was closed before the request ran"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class BatchClient:
+    """
+    Sends requests to a `BatchServer` listening on a Unix socket. A client can
+    be shared by multiple threads. Replies are read by a single reader thread
+    that completes the future of the request each reply belongs to.
+
+    Args:
+        path: the path of the Unix socket the server is listening on
+
+        authkey: the key the server was started with
+    """
+    def __init__(self, path: str, authkey: bytes):
+        self._connection = Client(path, family="AF_UNIX", authkey=authkey)
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._pending: Dict[int, Future] = {}
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop,
+                                        name="ngcsimlib-batch-client",
+                                        daemon=True)
+        self._reader.start()
+
+    def submit(self, *values: Any) -> Future:
+        """
+        Sends a request without waiting for its reply.
+
+        Args:
+            *values: the value of each input compartment of the server, in order
+
+        Returns: a future resolving to the watched values of the request
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                error("Trying to send a request on a closed batch client")
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[request_id] = future
+
+        try:
+            with self._send_lock:
+                self._connection.send((request_id, values))
+        except Exception:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise
+        return future
+
+    def request(self, *values: Any) -> Tuple[Any, ...]:
+        """
+        Sends a request and waits for its reply.
+
+        Args:
+            *values: the value of each input compartment of the server, in order
+
+        Returns: the watched values of the request
+        """
+        return self.submit(*values).result()
+
+    def _read_loop(self) -> None:
+        try:
+            while True:
+                reply_id, ok, payload = self._connection.recv()
+                with self._lock:
+                    future = self._pending.pop(reply_id, None)
+                if future is None:
+                    continue
+                if ok:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(payload)
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._lock:
+                self._closed = True
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(ConnectionError(
+                    "The connection to the batch server was closed"))
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        ## Shutting the socket down wakes the reader thread up
+        try:
+            with socket.socket(fileno=os.dup(self._connection.fileno())) as sock:
+                sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._reader.join()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,293 @@
+import ast
+import importlib
+import inspect
+import os
+import pickle
+import pickletools
+import textwrap
+from types import FunctionType
+from typing import Any, Dict, List, Union, TYPE_CHECKING
+
+from ngcsimlib._src.logger import error
+
+if TYPE_CHECKING:
+    from ngcsimlib._src.process.baseProcess import BaseProcess
+
+_LITERAL_TYPES = (bool, int, float, complex, str, bytes, type(None))
+
+## The names the exported module defines for itself
+_RESERVED_NAMES = {"pickle", "KEYWORD_ORDER", "WATCHED", "PROCESSES",
+                   "load_state", "pack_keywords", "run"}
+
+_FOOTER = '''
+PROCESSES = {processes}
+
+
+def load_state(path):
+    """
+    Loads a state file written alongside this module.
+
+    Args:
+        path: the path of the state file
+
+    Returns: the state, a dictionary mapping global keys to values
+    """
+    with open(path, "rb") as fp:
+        return pickle.load(fp)
+
+
+def pack_keywords(process_name, **kwargs):
+    """
+    Packs keyword arguments in the order the given process expects them.
+
+    Args:
+        process_name: the name of the process
+
+        **kwargs: the keyword arguments for the process
+
+    Returns: the packed keywords
+    """
+    return [kwargs[key] for key in KEYWORD_ORDER[process_name]]
+
+
+def run(process_name, state, **kwargs):
+    """
+    Runs a single step of the given process.
+
+    Args:
+        process_name: the name of the process
+
+        state: the state to run the step on
+
+        **kwargs: the keyword arguments for the process
+
+    Returns: the final state, watched values as a tuple
+    """
+    return PROCESSES[process_name](state,
+                                   pack_keywords(process_name, **kwargs))
+'''
+
+
+def _is_literal(value: Any) -> bool:
+    if isinstance(value, _LITERAL_TYPES):
+        try:
+            return ast.literal_eval(repr(value)) == value
+        except (ValueError, SyntaxError):
+            return False
+    if type(value) in (tuple, list, set):
+        return all(_is_literal(v) for v in value)
+    if type(value) is dict:
+        return all(_is_literal(k) and _is_literal(v)
+                   for k, v in value.items())
+    return False
+
+
+def _top_level_reference(value: Any) -> Union[str, None]:
+    module_name = getattr(value, "__module__", None)
+    qualname = getattr(value, "__qualname__", None)
+    if not isinstance(module_name, str) or not isinstance(qualname, str) or \
+            module_name == "__main__" or "." in qualname or "<" in qualname:
+        return None
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError:
+        return None
+    if getattr(module, qualname, None) is not value:
+        return None
+    return module_name
+
+
+def _references_main(data: bytes) -> bool:
+    """
+    Returns: if the pickled data refers to something defined in `__main__`,
+        which can only be unpickled by the script that pickled it
+    """
+    for opcode, arg, _ in pickletools.genops(data):
+        if opcode.name == "GLOBAL" and arg.split(" ")[0] == "__main__":
+            return True
+        if opcode.name in ("SHORT_BINUNICODE", "BINUNICODE", "UNICODE") \
+                and arg == "__main__":
+            return True
+    return False
+
+
+def _is_ngcsimlib_function(value: Any) -> bool:
+    return isinstance(value, FunctionType) and \
+        (value.__module__ or "").split(".")[0] == "ngcsimlib"
+
+
+class _Renamer(ast.NodeTransformer):
+    def __init__(self, names: Dict[str, str]):
+        self.names = names
+
+    def visit_Name(self, node):
+        if node.id in self.names:
+            node.id = self.names[node.id]
+        return node
+
+
+def _inline_function(name: str, fn: FunctionType,
+                     functions: Dict[str, str]) -> None:
+    """
+    Writes the source of an ngcsimlib function (such as the kernel of a fused
+    operation) into the exported module under the given name, along with the
+    functions of its module that it uses, so the exported module never has to
+    import ngcsimlib. Annotations are dropped since they can refer to names
+    that are not exported.
+    """
+    if name in functions:
+        return
+    node = ast.parse(textwrap.dedent(inspect.getsource(fn))).body[0]
+    node.name = name
+    node.decorator_list = []
+    node.returns = None
+    for arg in ast.walk(node.args):
+        if isinstance(arg, ast.arg):
+            arg.annotation = None
+
+    helpers = {}
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load) \
+                and _is_ngcsimlib_function(fn.__globals__.get(child.id)):
+            helpers[child.id] = f"ngcsimlib_{child.id.lstrip('_')}"
+    _Renamer(helpers).visit(node)
+
+    functions[name] = ast.unparse(node)
+    for helper, helper_name in helpers.items():
+        _inline_function(helper_name, fn.__globals__[helper], functions)
+
+
+def _module_import(name: str, module_name: str) -> str:
+    if name == module_name:
+        return f"import {module_name}"
+    return f"import {module_name} as {name}"
+
+
+def _from_import(name: str, module_name: str, qualname: str) -> str:
+    if name == qualname:
+        return f"from {module_name} import {qualname}"
+    return f"from {module_name} import {qualname} as {name}"
+
+
+def export_processes(path: str, *processes: "BaseProcess",
+                     state_path: Union[str, None] = None) -> str:
+    """
+    Exports compiled processes to a standalone python module. The module
+    contains every process as a plain function along with its auxiliary
+    functions, the constants baked into it, and the order it expects keywords
+    in, so it can be imported and run without building the model or
+    importing ngcsimlib. Constants that are literals are written as source,
+    ngcsimlib's own functions (the kernels of fused operations) are written
+    out as source, other functions and classes that can be imported are
+    written as imports, and anything else is embedded pickled.
+
+    The exported module provides `KEYWORD_ORDER` and `WATCHED` (mapping each
+    process name to its keyword order and the keys of its watched
+    compartments), `PROCESSES` (mapping each process name to its function),
+    and the helpers `load_state(path)`, `pack_keywords(process_name, **kwargs)`
+    and `run(process_name, state, **kwargs)`.
+
+    Args:
+        path: the path of the python module to write
+
+        *processes: the compiled processes to export
+
+        state_path (default=None): if provided the current state of the
+            processes' state manager is written to this path, to be read back
+            with the exported `load_state`
+
+    Returns: the path of the written module
+    """
+    if len(processes) == 0:
+        error("No processes provided to export")
+
+    imports: Dict[str, str] = {}
+    constants: Dict[str, str] = {}
+    kernels: Dict[str, str] = {}
+    functions: Dict[str, str] = {}
+    keyword_order: Dict[str, List[str]] = {}
+    watched: Dict[str, List[str]] = {}
+
+    for process in processes:
+        if process.name in _RESERVED_NAMES:
+            error(f"The process {process.name} can not be exported under a "
+                  f"name the exported module uses itself "
+                  f"({', '.join(sorted(_RESERVED_NAMES))})")
+        if not process.is_compiled():
+            error(f"Trying to export the process {process.name} while it is "
+                  f"not compiled. Make sure that the context that the process "
+                  f"was created in has been closed before exporting it.")
+        if process.name in keyword_order:
+            error(f"Multiple processes named {process.name} provided to "
+                  f"export")
+
+        compiled = process.run.compiled
+        captured, modules = compiled.captured_namespace()
+
+        for name, module_name in modules.items():
+            imports[name] = _module_import(name, module_name)
+
+        for name, value in captured.items():
+            if _is_literal(value):
+                constants[name] = f"{name} = {value!r}"
+                continue
+            if _is_ngcsimlib_function(value):
+                _inline_function(name, value, kernels)
+                continue
+            module_name = _top_level_reference(value)
+            if module_name is not None:
+                imports[name] = _from_import(name, module_name,
+                                             value.__qualname__)
+                continue
+            data = pickle.dumps(value)
+            if _references_main(data):
+                error(f"The value of {name} baked into the process "
+                      f"{process.name} is defined in __main__, so the exported "
+                      f"module could not load it. Move it into a module that "
+                      f"can be imported.")
+            constants[name] = f"{name} = pickle.loads({data!r})"
+
+        for aux_ast in compiled.auxiliary_ast.values():
+            for node in aux_ast.body:
+                if isinstance(node, ast.FunctionDef):
+                    functions.setdefault(node.name, ast.unparse(node))
+
+        functions[process.name] = ast.unparse(compiled.ast)
+        keyword_order[process.name] = list(process.get_keywords())
+        watched[process.name] = [compartment.target for compartment in
+                                 process.watch_list]
+
+    clashes = _RESERVED_NAMES & (set(imports) | set(constants) |
+                                 set(kernels) | set(functions))
+    if len(clashes) > 0:
+        error(f"The exported processes refer to {', '.join(sorted(clashes))}, "
+              f"which the exported module uses itself")
+
+    blocks = [
+        f'"""\nProcesses exported by ngcsimlib: '
+        f'{", ".join(keyword_order.keys())}\n"""',
+        "\n".join(["import pickle"] + sorted(set(imports.values()))),
+    ]
+    if len(constants) > 0:
+        blocks.append("\n".join(constants[name] for name in sorted(constants)))
+    blocks.append(f"KEYWORD_ORDER = {keyword_order!r}\n"
+                  f"WATCHED = {watched!r}")
+    blocks.extend(kernels.values())
+    blocks.extend(functions.values())
+
+    source = "\n\n\n".join(blocks) + "\n\n" + _FOOTER.format(
+        processes="{" + ", ".join(f"{name!r}: {name}"
+                                  for name in keyword_order) + "}")
+    # Make sure what is written can be imported
+    compile(source, path, "exec")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as fp:
+        fp.write(source)
+
+    if state_path is not None:
+        with open(state_path, "wb") as fp:
+            pickle.dump(processes[0]._state_manager.state, fp,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+    return path
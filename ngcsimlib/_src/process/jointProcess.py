@@ -3,26 +3,48 @@ import ast
 from ngcsimlib._src.process.baseProcess import BaseProcess
 from ngcsimlib._src.parser.utils import CompiledMethod
 from ngcsimlib._src.context.context_manager import global_context_manager
-from ngcsimlib._src.global_state.manager import global_state_manager
 from ngcsimlib._src.context.context import ContextObjectTypes
+from ngcsimlib._src.logger import warn
 
-from typing import List
+from typing import List, Tuple, Union
 
 class JointProcess(BaseProcess):
     def __init__(self, name):
         super().__init__(name)
         self.process_order: List[BaseProcess] = []
+        ## The number of watched compartments at the start of the watch list
+        ## that come from the processes in this process
+        self._inherited_watch = 0
+
+    _compiled_attributes = BaseProcess._compiled_attributes + \
+        ("_inherited_watch",)
 
     def then(self, process: BaseProcess):
         if process._priority <= self._priority:
             self._priority = process._priority - 1
 
         self.process_order.append(process)
+        self._objects_loaded = False
         return self
 
     def __rshift__(self, other):
         return self.then(other)
 
+    def _objects(self):
+        objs = {}
+        for process in self.process_order:
+            objs.update((id(obj), obj) for obj in process._objects())
+        return list(objs.values())
+
+    def _compile_key(self) -> Union[Tuple, None]:
+        try:
+            processes = tuple(process.run.compiled
+                              for process in self.process_order)
+        except AttributeError:
+            return None
+        return processes, tuple(compartment.target for compartment in
+                                self._watch_list[self._inherited_watch:])
+
     def _parse(self):
         bodies = []
         extras = {}
@@ -53,8 +75,9 @@ class JointProcess(BaseProcess):
             joint_watch_list.extend(process._watch_list)
 
 
-        joint_watch_list.extend(self._watch_list)
-        self._watch_list = joint_watch_list
+        self._watch_list = joint_watch_list + \
+            self._watch_list[self._inherited_watch:]
+        self._inherited_watch = len(joint_watch_list)
 
 
         return bodies, extras, list(key_set), namespace
@@ -70,11 +93,15 @@ class JointProcess(BaseProcess):
     def from_json(self, data):
         process_order = data.get("process_order", [])
         ctx = global_context_manager.current_context
-        procs = ctx.get_objects(*process_order, objectType=ContextObjectTypes.process)
-        for proc in procs:
-            if proc is not None and isinstance(proc, BaseProcess):
+        procs = ctx.get_objects_by_type(ContextObjectTypes.process)
+        for proc_name in process_order:
+            proc = procs.get(proc_name, None)
+            if proc is None:
+                warn(f"Could not find a process with the name \"{proc_name}\" "
+                     f"in the context")
+            elif isinstance(proc, BaseProcess):
                 self.then(proc)
 
         watch_list = data.get("watch_list", [])
         for compartment_root in watch_list:
-            self.watch(global_state_manager.get_compartment(compartment_root))
\ No newline at end of file
+            self.watch(self._state_manager.get_compartment(compartment_root))
\ No newline at end of file
@@ -1,10 +1,11 @@
 from ngcsimlib._src.parser.utils import CompiledMethod
-from ngcsimlib._src.global_state.manager import global_state_manager
 from ngcsimlib._src.context.context_manager import global_context_manager
+from ngcsimlib._src.context.context import ContextObjectTypes
 from ngcsimlib._src.process.baseProcess import BaseProcess
+from ngcsimlib._src.logger import warn
 
 import ast
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Union
 
 
 class MethodProcess(BaseProcess):
@@ -44,11 +45,24 @@ class MethodProcess(BaseProcess):
         Returns: this process for easy chaining
         """
         self.method_order.append((method.__self__, method.__name__))
+        self._objects_loaded = False
         return self
 
     def __rshift__(self, method):
         return self.then(method)
 
+    def _objects(self) -> List[Any]:
+        return list({id(obj): obj for obj, _ in self.method_order}.values())
+
+    def _compile_key(self) -> Union[Tuple, None]:
+        try:
+            methods = tuple(getattr(obj, method).compiled
+                            for obj, method in self.method_order)
+        except AttributeError:
+            return None
+        return methods, tuple(compartment.target
+                              for compartment in self._watch_list)
+
     def _parse(self) -> Tuple[List, Dict, List, Dict]:
         bodies = []
         extras = {}
@@ -97,11 +111,15 @@ class MethodProcess(BaseProcess):
     def from_json(self, data: Dict[str, Any]) -> None:
         method_order = data.get("method_order", [])
         ctx = global_context_manager.current_context
+        components = ctx.get_objects_by_type(ContextObjectTypes.component)
         for step in method_order:
-            comp = ctx.get_components(step['name'])
-            if comp is not None and hasattr(comp, step['method']):
+            comp = components.get(step['name'], None)
+            if comp is None:
+                warn(f"Could not find a component with the name "
+                     f"\"{step['name']}\" in the context")
+            elif hasattr(comp, step['method']):
                 self.then(getattr(comp, step['method']))
 
         watch_list = data.get("watch_list", [])
         for compartment_root in watch_list:
-            self.watch(global_state_manager.get_compartment(compartment_root))
\ No newline at end of file
+            self.watch(self._state_manager.get_compartment(compartment_root))
\ No newline at end of file
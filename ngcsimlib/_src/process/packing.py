@@ -0,0 +1,106 @@
+from numbers import Number
+from typing import Any, Callable, List, Sequence, TypeVar
+
+T = TypeVar('T')
+
+
+def vectorized(fn: Callable[[Sequence[T]], Sequence]) -> Callable:
+    """
+    A decorator that marks a keyword generator as vectorized. Instead of being
+    called once per row with that row's seed, a vectorized generator is called
+    once with the seeds of every row being packed and returns the whole column.
+
+    Args:
+        fn: a function of the sequence of seeds returning a sequence of the same
+            length
+
+    Returns: the marked generator
+    """
+    fn._is_vectorized = True
+    return fn
+
+
+def is_vectorized(fn: Callable) -> bool:
+    return getattr(fn, "_is_vectorized", False)
+
+
+def keyword_kind(value: Any) -> str:
+    """
+    Returns: how a keyword value is packed, "constant" for values repeated
+        down their column, "generator" for generators called once per row, and
+        "vectorized" for generators called once with every seed
+    """
+    if not callable(value):
+        return "constant"
+    return "vectorized" if is_vectorized(value) else "generator"
+
+
+def repeat(value: Any, length: int) -> Sequence:
+    """
+    Returns: a column holding the value in every row, numbers are repeated
+        into a numpy array and arrays are broadcast along a new leading axis
+        (a read-only view that does not copy the value), anything else, or
+        anything when numpy is not installed, is repeated into a list
+    """
+    if hasattr(value, "__array_namespace__") and hasattr(value, "shape"):
+        return value.__array_namespace__().broadcast_to(
+            value, (length,) + tuple(value.shape))
+    try:
+        import numpy
+    except ImportError:
+        return [value] * length
+    if isinstance(value, Number):
+        return numpy.full(length, value)
+    if isinstance(value, numpy.ndarray):
+        return numpy.broadcast_to(value, (length,) + value.shape)
+    return [value] * length
+
+
+def repeat_list(value: Any, length: int) -> List:
+    """
+    Returns: a list holding the value in every row
+    """
+    return [value] * length
+
+
+_COLUMN_EXPRESSIONS = {
+    "constant": "repeat({name}, length)",
+    "generator": "[{name}(seed) for seed in seeds]",
+    "vectorized": "{name}(seeds)",
+}
+
+
+def make_column_packer(keyword_order: List[str],
+                       kinds: Sequence[str] = ()) -> Callable:
+    """
+    Generates a function that packs one column per keyword, in the given
+    order. The generated function takes the seeds, the number of rows, the
+    function repeating constants down their column (see `repeat`), and the
+    keyword values as positional arguments in keyword order, so packing does
+    not have to look up or loop over the keywords. How each keyword is packed
+    is decided when the function is generated, so it does not check the
+    values either.
+
+    Args:
+        keyword_order: the order of the keywords to pack
+
+        kinds (default=()): how each keyword is packed (see `keyword_kind`),
+            keywords without a kind are constants
+
+    Returns: the generated packing function
+    """
+    ## Keywords are renamed so they can not collide with the other arguments
+    ## or the names used by the generated function
+    names = [f"_kw_{i}" for i in range(len(keyword_order))]
+    kinds = list(kinds) + ["constant"] * (len(names) - len(kinds))
+    args = ", ".join(["seeds", "length", "repeat"] + names)
+    columns = "".join(
+        f"        {_COLUMN_EXPRESSIONS[kind].format(name=name)},\n"
+        for name, kind in zip(names, kinds))
+    source = f"def pack_columns({args}):\n" \
+             f"    return [\n{columns}    ]\n"
+
+    namespace = {}
+    exec(compile(source, filename="pack_columns_compiled", mode='exec'),
+         namespace)
+    return namespace["pack_columns"]
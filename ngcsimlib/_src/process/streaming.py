@@ -0,0 +1,64 @@
+import queue
+import threading
+from typing import Any, Iterable, Iterator
+
+_DONE = object()
+
+
+class _Failure:
+    __slots__ = ("exception",)
+
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+def prefetched(iterable: Iterable[Any], size: int) -> Iterator[Any]:
+    """
+    Pulls items from an iterable on a helper thread, keeping at most `size` of
+    them waiting to be consumed. Once the buffer is full the helper thread
+    blocks, so a slow consumer holds back the producer. Exceptions raised by
+    the iterable are raised again on the consuming side, and closing the
+    returned iterator stops the helper thread.
+
+    Args:
+        iterable: the iterable to pull items from
+
+        size: the maximum number of items to buffer
+
+    Returns: an iterator over the items of the iterable
+    """
+    buffer = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_Failure(e))
+            return
+        put(_DONE)
+
+    thread = threading.Thread(target=produce, name="ngcsimlib-prefetch",
+                              daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield item
+    finally:
+        stopped.set()
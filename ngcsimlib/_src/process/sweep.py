@@ -0,0 +1,289 @@
+import os
+import traceback
+from concurrent.futures import (ProcessPoolExecutor, Future, wait,
+                                FIRST_COMPLETED)
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, \
+    Tuple, Union, TYPE_CHECKING
+
+from ngcsimlib._src.logger import error
+from ngcsimlib._src.parser.utils import CompiledMethod
+
+if TYPE_CHECKING:
+    from ngcsimlib._src.process.baseProcess import BaseProcess
+
+## The process built by the sweep's builder, one per worker process
+_Worker_Process: Union["BaseProcess", None] = None
+
+
+class SweepResult:
+    """
+    The result of running a single configuration of a sweep.
+
+    Attributes:
+        index: the position of the configuration in the sweep
+
+        config: the configuration that was run
+
+        watched: the watched values produced by each step, in order
+
+        state: the final state, None if states were not requested or the
+            configuration failed
+
+        error: the formatted traceback if the configuration failed, None
+            otherwise
+    """
+    __slots__ = ("index", "config", "watched", "state", "error")
+
+    def __init__(self, index: int, config: Dict[str, Any],
+                 watched: Union[List[Any], None] = None,
+                 state: Union[Dict[str, Any], None] = None,
+                 error: Union[str, None] = None):
+        self.index = index
+        self.config = config
+        self.watched = watched
+        self.state = state
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        status = "ok" if self.ok else "failed"
+        return f"SweepResult(index={self.index}, {status})"
+
+
+def _baked_names(process: "BaseProcess") -> Dict[str, Tuple[Any, str, Set[str]]]:
+    names = {}
+    for obj in process._objects():
+        prefix = obj.context_path.replace(':', '_')
+        names[obj.name] = (obj, prefix, _static_attributes(obj))
+    return names
+
+
+def _static_attributes(obj) -> Set[str]:
+    """
+    Returns: the attributes of the object that its compiled methods resolved
+        conditionals or loops on, which shaped the compiled code rather than
+        being baked into it as values
+    """
+    static = set()
+    for value in vars(obj).values():
+        compiled = getattr(value, "compiled", None)
+        if isinstance(compiled, CompiledMethod):
+            static |= compiled.static_attributes
+    return static
+
+
+def _namespaces(process: "BaseProcess") -> List[Dict[str, Any]]:
+    compiled = process.run.compiled
+    namespaces = [compiled.namespace]
+    for name in compiled.auxiliary_ast:
+        fn = compiled.namespace.get(name, None)
+        if fn is not None and all(fn.__globals__ is not n
+                                  for n in namespaces):
+            namespaces.append(fn.__globals__)
+    return namespaces
+
+
+def _run_config(process: "BaseProcess", initial_state: Dict[str, Any],
+                config: Dict[str, Any], steps: int,
+                return_state: bool) -> Tuple[List[Any], Dict[str, Any]]:
+    objects = _baked_names(process)
+    namespaces = _namespaces(process)
+    compiled = process.run.compiled
+
+    patched = []
+    try:
+        for path, value in config.get("attributes", {}).items():
+            obj_name, _, attr = path.rpartition(".")
+            if obj_name not in objects:
+                error(f"No object named {obj_name} is used by the process "
+                      f"{process.name}", errorCls=KeyError)
+            obj, prefix, static = objects[obj_name]
+            if attr in static:
+                error(f"{path} decides the structure of the compiled process "
+                      f"{process.name}, it can not be swept without "
+                      f"recompiling the model", errorCls=KeyError)
+            baked = f"{prefix}_{attr}"
+            if baked not in compiled.namespace:
+                error(f"{path} is not a constant of the process "
+                      f"{process.name}, it can not be swept without "
+                      f"recompiling the model", errorCls=KeyError)
+            for namespace in namespaces:
+                if baked in namespace:
+                    patched.append((namespace, baked, namespace[baked]))
+                    namespace[baked] = value
+
+        state = dict(initial_state)
+        state.update(config.get("state", {}))
+
+        seed = config.get("seed", 0)
+        rows = process.pack_rows(steps, seed_generator=lambda i: seed + i,
+                                 **config.get("keywords", {}))
+
+        watched = []
+        for row in rows:
+            state, values = compiled(state, row)
+            watched.append(values)
+    finally:
+        for namespace, baked, value in reversed(patched):
+            namespace[baked] = value
+
+    return watched, state if return_state else None
+
+
+def _init_worker(build: Callable[[], "BaseProcess"]) -> None:
+    global _Worker_Process
+    _Worker_Process = build()
+    if not _Worker_Process.is_compiled():
+        error("The sweep builder must return a compiled process")
+
+
+def _worker_task(index: int, config: Dict[str, Any], steps: int,
+                 return_state: bool) -> SweepResult:
+    process = _Worker_Process
+    try:
+        watched, state = _run_config(process, process._state_manager.state,
+                                     config, steps, return_state)
+        return SweepResult(index, config, watched, state)
+    except Exception:
+        return SweepResult(index, config, error=traceback.format_exc())
+
+
+def run_sweep(build: Callable[[], "BaseProcess"],
+              configs: Iterable[Dict[str, Any]], steps: int,
+              workers: Union[int, None] = None,
+              return_state: bool = False,
+              max_pending: Union[int, None] = None,
+              mp_context=None,
+              max_retries: int = 1) -> Iterator[SweepResult]:
+    """
+    Runs many configurations of the same model on a pool of worker processes.
+    Each worker builds (and compiles) the model once by calling `build`, then
+    runs every configuration it is given by starting from the model's initial
+    state, applying the configuration, and running the process for the given
+    number of steps. Results are yielded as soon as each configuration
+    finishes, so they may arrive out of order. A configuration that raises does
+    not stop the sweep, its result carries the error instead, and if a worker
+    dies the pool is restarted for the configurations that remain.
+
+    Each configuration is a dictionary with any of the following keys:
+        "attributes": a mapping of "<object name>.<attribute>" to values, for
+            attributes that are baked into the compiled process as constants
+            (e.g. hyperparameters), these are swapped in without recompiling
+        "state": a mapping of global keys to initial values
+        "keywords": the keyword arguments to pack the rows with, as passed to
+            `pack_rows`
+        "seed" (default=0): the seed of the first row, each following row is
+            seeded one higher
+
+    Args:
+        build: a picklable function, taking no arguments, that builds the model
+            and returns the compiled process to run
+
+        configs: the configurations to run
+
+        steps: the number of steps to run each configuration for
+
+        workers (default=None): the number of worker processes, if None the
+            number of cores is used, if 0 every configuration is run on the
+            calling process
+
+        return_state (default=False): should the final state of each
+            configuration be returned
+
+        max_pending (default=None): the maximum number of configurations
+            submitted to the pool at once, if None twice the number of workers
+
+        mp_context (default=None): the multiprocessing context for the pool
+
+        max_retries (default=1): the number of times a configuration lost with
+            a broken pool is run again before it is reported as failed
+
+    Returns: an iterator of `SweepResult`, in the order they finish
+    """
+    if workers == 0:
+        process = build()
+        initial_state = process._state_manager.state
+        for index, config in enumerate(configs):
+            try:
+                watched, state = _run_config(process, initial_state, config,
+                                             steps, return_state)
+                yield SweepResult(index, config, watched, state)
+            except Exception:
+                yield SweepResult(index, config, error=traceback.format_exc())
+        return
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    remaining = iter(enumerate(configs))
+
+    def make_pool():
+        return ProcessPoolExecutor(max_workers=workers,
+                                   mp_context=mp_context,
+                                   initializer=_init_worker,
+                                   initargs=(build,))
+
+    pool = make_pool()
+    pending: Dict[Future, Tuple[int, Dict[str, Any]]] = {}
+    retries = deque()
+    attempts: Dict[int, int] = {}
+    try:
+        while True:
+            while len(pending) < max_pending:
+                if len(retries) > 0:
+                    index, config = retries.popleft()
+                else:
+                    index, config = next(remaining, (None, None))
+                    if index is None:
+                        break
+                try:
+                    future = pool.submit(_worker_task, index, config, steps,
+                                         return_state)
+                except BrokenProcessPool:
+                    # The pool broke since it was last waited on, the
+                    # configurations it holds report it when waited on
+                    retries.appendleft((index, config))
+                    if len(pending) == 0:
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        pool = make_pool()
+                        continue
+                    break
+                pending[future] = (index, config)
+
+            if len(pending) == 0:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            lost = []
+            for future in done:
+                index, config = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    lost.append((index, config, traceback.format_exc()))
+                    continue
+                except Exception:
+                    result = SweepResult(index, config,
+                                         error=traceback.format_exc())
+                yield result
+
+            if len(lost) > 0:
+                # Every configuration still in the broken pool is lost with it
+                lost.extend((index, config, "The worker pool running this "
+                                            "configuration broke")
+                            for index, config in pending.values())
+                pending.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = make_pool()
+                for index, config, reason in sorted(lost, key=lambda l: l[0]):
+                    attempts[index] = attempts.get(index, 0) + 1
+                    if attempts[index] > max_retries:
+                        yield SweepResult(index, config, error=reason)
+                    else:
+                        retries.append((index, config))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
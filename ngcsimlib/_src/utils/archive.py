@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from typing import Any, Dict, Union, IO
+
+from ngcsimlib._src.logger import error
+
+ARCHIVE_EXTENSION = ".ngcm"
+
+
+class ModelArchiveWriter:
+    """
+    Writes a saved model into a single file archive. Metadata is stored as
+    compact JSON and custom data as uncompressed binary entries, the archive
+    ends with an index of every entry so that readers can seek straight to the
+    entries they need. The archive is written to a temporary file and only
+    renamed into place once it is complete.
+
+    Args:
+        path: the path of the archive to write
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._tmp_path = f"{path}.tmp"
+        self._zip = zipfile.ZipFile(self._tmp_path, "w",
+                                    compression=zipfile.ZIP_STORED,
+                                    allowZip64=True)
+
+    def write_json(self, name: str, data: Any) -> None:
+        """
+        Writes a JSON entry to the archive.
+
+        Args:
+            name: the name of the entry
+            data: the JSON serializable data to write
+        """
+        self._zip.writestr(name, json.dumps(data, separators=(",", ":")))
+
+    def write_directory(self, prefix: str, directory: str) -> None:
+        """
+        Writes every file found in a directory to the archive, streaming each
+        file from disk rather than loading it into memory.
+
+        Args:
+            prefix: the prefix to place the files under in the archive
+            directory: the directory to pack into the archive
+        """
+        for root, _, files in os.walk(directory):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                rel = os.path.relpath(path, directory).replace(os.sep, "/")
+                self._zip.write(path, f"{prefix}/{rel}")
+
+    def close(self) -> None:
+        self._zip.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        self._zip.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ModelDirectoryReader:
+    """
+    Reads a model saved as a directory tree by `Context.save_to_json`.
+
+    Args:
+        path: the path of the saved model directory
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def read_json(self, name: str) -> Any:
+        with open(f"{self.path}/{name}", "r") as fp:
+            return json.load(fp)
+
+    def open(self, name: str) -> IO[bytes]:
+        return open(f"{self.path}/{name}", "rb")
+
+    def custom_path(self, prefix: str) -> str:
+        return f"{self.path}/{prefix}"
+
+    def close(self) -> None:
+        pass
+
+
+class ModelArchiveReader:
+    """
+    Reads a model saved as a single file archive by `Context.save_to_archive`.
+    Only the entries that are requested are read from the archive. Since custom
+    load methods expect a directory, the custom data is extracted to a
+    temporary directory the first time it is requested for a given prefix, and
+    removed when the reader is closed.
+
+    Args:
+        path: the path of the archive
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._zip = zipfile.ZipFile(path, "r")
+        self._extracted: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def read_json(self, name: str) -> Any:
+        return json.loads(self._zip.read(name))
+
+    def open(self, name: str) -> IO[bytes]:
+        return self._zip.open(name, "r")
+
+    def custom_path(self, prefix: str) -> str:
+        with self._lock:
+            if prefix not in self._extracted:
+                self._extracted[prefix] = self._extract(prefix)
+            return self._extracted[prefix]
+
+    def _extract(self, prefix: str) -> str:
+        destination = tempfile.mkdtemp(prefix="ngcsimlib-")
+        root = os.path.realpath(destination)
+        try:
+            for info in self._zip.infolist():
+                if not info.filename.startswith(prefix + "/") or info.is_dir():
+                    continue
+                ## Archives can come from anywhere, entries must not escape
+                ## the directory they are extracted to
+                target = os.path.realpath(os.path.join(
+                    root, info.filename[len(prefix) + 1:]))
+                if os.path.commonpath([root, target]) != root or \
+                        target == root:
+                    error(f"Archive entry {info.filename} in {self.path} "
+                          f"points outside of the model", errorCls=ValueError)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with self._zip.open(info) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+        except BaseException:
+            shutil.rmtree(destination, ignore_errors=True)
+            raise
+        return destination
+
+    def close(self) -> None:
+        self._zip.close()
+        for path in self._extracted.values():
+            shutil.rmtree(path, ignore_errors=True)
+        self._extracted.clear()
+
+
+def open_model(directory: str, model_name: str) -> \
+        Union[ModelDirectoryReader, ModelArchiveReader]:
+    """
+    Opens a saved model for reading, dispatching on whether the model was saved
+    as a directory tree or as a single file archive.
+
+    Args:
+        directory: the directory the model was saved in
+        model_name: the name of the saved model, the archive extension is
+            optional
+
+    Returns: a reader for the saved model
+    """
+    path = f"{directory}/{model_name}"
+    if os.path.isdir(path):
+        return ModelDirectoryReader(path)
+    if os.path.isfile(path):
+        return ModelArchiveReader(path)
+    if os.path.isfile(path + ARCHIVE_EXTENSION):
+        return ModelArchiveReader(path + ARCHIVE_EXTENSION)
+    raise FileNotFoundError(f"No saved model found at {path}")
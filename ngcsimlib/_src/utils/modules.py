@@ -1,12 +1,117 @@
 import sys
+import threading
 from importlib import import_module
-from ngcsimlib.logger import info
+from ngcsimlib._src.logger import info, warn
 
 ## Globally tracking all the modules, and attributes have been dynamically
 # loaded
 _Loaded_Attributes = {}
 _Loaded_Modules = {}
 
+## Index from the lowercase last segment of each module name in sys.modules to
+# the full names of those modules. It is updated incrementally from the
+# difference between the modules in sys.modules and the ones already indexed,
+# only when the number of loaded modules changed or a lookup misses.
+_Module_Index = {}
+_Indexed_Names = set()
+_Indexed_Count = -1
+_Index_Lock = threading.Lock()
+
+## Index from module name to a map of lowercase attribute names to attribute
+# names for case-insensitive attribute lookups
+_Attribute_Index = {}
+
+
+def _refresh_module_index():
+    """
+    Brings the module index up to date with sys.modules, adding every module
+    imported and dropping every module removed since the last refresh. Only
+    the modules that changed are re-indexed.
+    """
+    with _Index_Lock:
+        _refresh_module_index_locked()
+
+
+def _refresh_module_index_locked():
+    global _Indexed_Count
+    current = sys.modules.keys()
+    _Indexed_Count = len(current)
+    for module in _Indexed_Names - current:
+        key = module.split('.')[-1].lower()
+        _Module_Index[key].discard(module)
+        _Indexed_Names.discard(module)
+
+    for module in current - _Indexed_Names:
+        key = module.split('.')[-1].lower()
+        _Module_Index.setdefault(key, set()).add(module)
+        _Indexed_Names.add(module)
+
+
+def _module_candidates(final_mod, match_case):
+    with _Index_Lock:
+        indexed = list(_Module_Index.get(final_mod.lower(), []))
+    return [module for module in indexed if module in sys.modules and
+            (not match_case or module.split('.')[-1] == final_mod)]
+
+
+def _find_module(final_mod, match_case=False):
+    """
+    Finds the loaded module whose last path segment matches the given name.
+    If multiple loaded modules match the one with the shortest path is picked
+    (ties are broken alphabetically) so the result does not depend on import
+    order.
+
+    Args:
+        final_mod: the last segment of the module path
+
+        match_case: If true the module must case match exactly (default false)
+
+    Returns:
+        the full name of the module, None if no loaded module matches
+    """
+    if len(sys.modules) != _Indexed_Count:
+        _refresh_module_index()
+    candidates = _module_candidates(final_mod, match_case)
+    if len(candidates) == 0:
+        ## Modules can be replaced without the number of modules changing
+        _refresh_module_index()
+        candidates = _module_candidates(final_mod, match_case)
+    if len(candidates) == 0:
+        return None
+
+    candidates = sorted(candidates, key=lambda m: (m.count('.'), m))
+    if len(candidates) > 1:
+        warn("Dynamic import for \"" + final_mod + "\" is ambiguous between "
+             + ", ".join(candidates) + ". Using " + candidates[0])
+    return candidates[0]
+
+
+def _find_attribute(mod, attribute_name, match_case=False):
+    if match_case:
+        return getattr(mod, attribute_name)
+
+    capitalized = attribute_name[0].upper() + attribute_name[1:]
+    if hasattr(mod, capitalized):
+        return getattr(mod, capitalized)
+
+    index = _Attribute_Index.get(mod.__name__, None)
+    if index is None or index[0] is not mod:
+        index = _index_attributes(mod)
+
+    name = index[1].get(attribute_name.lower(), None)
+    if name is None:
+        ## Attributes can be added to a module after it was indexed
+        name = _index_attributes(mod)[1].get(attribute_name.lower(), None)
+    if name is None:
+        raise AttributeError(attribute_name)
+    return getattr(mod, name)
+
+
+def _index_attributes(mod):
+    index = (mod, {name.lower(): name for name in reversed(dir(mod))})
+    _Attribute_Index[mod.__name__] = index
+    return index
+
 def check_attributes(obj, required, fatal=False):
     """
     This function will verify that a provided object has the requested
@@ -65,17 +170,12 @@ def load_module(module_path, match_case=False, absolute_path=False):
         module_name = module_path
     else:
 
-        # Extract the final module from the module_path
-        final_mod = module_path.split('.')[-1]
-        final_mod = final_mod if match_case else final_mod.lower()
-        # Try to match the final module to any currently loaded module
-        for module in sys.modules:
-            last_mod = module.split('.')[-1]
-            last_mod = last_mod if match_case else last_mod.lower()
-            if final_mod == last_mod:
-                info("Loading module from " + module)
-                module_name = module
-                break
+        # Extract the final module from the module_path and match it to a
+        # currently loaded module
+        module_name = _find_module(module_path.split('.')[-1],
+                                   match_case=match_case)
+        if module_name is not None:
+            info("Loading module from " + module_name)
 
         # Will only be None if no imported modules match the import name
         if module_name is None:
@@ -146,13 +246,8 @@ def load_attribute(attribute_name, module_path=None, match_case=False,
                       match_case=match_case,
                       absolute_path=absolute_path)
 
-    attribute_name = attribute_name if match_case else (attribute_name[
-                                                            0].upper() +
-                                                        attribute_name[
-                                                        1:])
-
     try:
-        attr = getattr(mod, attribute_name)
+        attr = _find_attribute(mod, attribute_name, match_case=match_case)
     except AttributeError:
         raise RuntimeError(
             "Could not find an attribute with name \"" + attribute_name + "\" "
@@ -0,0 +1,5 @@
+from ngcsimlib._src.checkpoint import (
+    CheckpointWriter as CheckpointWriter,
+    AsyncCheckpointer as AsyncCheckpointer,
+    restore_checkpoint as restore_checkpoint
+)
\ No newline at end of file
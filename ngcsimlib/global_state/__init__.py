@@ -1 +1,2 @@
-from ngcsimlib._src.global_state import global_state_manager as stateManager
\ No newline at end of file
+from ngcsimlib._src.global_state import global_state_manager as stateManager
+from ngcsimlib._src.global_state import StateManager as StateManager
@@ -7,4 +7,9 @@ from ngcsimlib._src.logger import (
     info as info,
     debug as debug,
     custom_log as custom_log
-)
\ No newline at end of file
+)
+
+from ngcsimlib._src.diagnostics import (
+    DiagnosticsCollector as DiagnosticsCollector,
+    diagnostics as diagnostics
+)
@@ -1,5 +1,15 @@
 from ngcsimlib._src.operations import (
     BaseOp as BaseOp,
+    FusedOp as FusedOp,
     Summation as Summation,
-    Product as Product
-)
\ No newline at end of file
+    Product as Product,
+    WeightedSum as WeightedSum,
+    Mean as Mean,
+    Maximum as Maximum,
+    Concatenate as Concatenate,
+    Stack as Stack,
+    Constant as Constant,
+    Expression as Expression,
+    lazy_ops as lazy_ops,
+    is_lazy as is_lazy
+)
@@ -2,4 +2,5 @@ from ngcsimlib._src.parser import (
     compilable as compilable,
     parse_method as parse_method,
     compileObject as compileObject,
+    specializations as specializations,
 )
\ No newline at end of file
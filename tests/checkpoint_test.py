@@ -0,0 +1,104 @@
+import pathlib
+import sys
+import threading
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+
+from ngcsimlib.checkpoint import CheckpointWriter, restore_checkpoint
+from ngcsimlib.global_state import StateManager
+
+
+class CheckpointTest:
+
+    def test_deltas_and_restore(self, tmp_path):
+        store = StateManager()
+        store.set_state({"m:a": 1.0, "m:b": 2.0})
+        writer = CheckpointWriter(str(tmp_path), state_manager=store)
+
+        assert writer.write() == "base_000000.pkl"
+        assert writer.write() is None
+
+        store.set_state({"m:b": 3.0})
+        assert writer.write() == "delta_000001.pkl"
+        assert writer.chain == ["base_000000.pkl", "delta_000001.pkl"]
+
+        restored = StateManager()
+        assert restore_checkpoint(str(tmp_path), state_manager=restored) == \
+            {"m:a": 1.0, "m:b": 3.0}
+        assert restored.from_global_key("m:b") == 3.0
+
+        assert writer.compact() == "base_000002.pkl"
+        assert writer.chain == ["base_000002.pkl"]
+        assert restore_checkpoint(str(tmp_path), update=False) == \
+            {"m:a": 1.0, "m:b": 3.0}
+
+    def test_failed_write_falls_back_to_base(self, tmp_path, monkeypatch):
+        from ngcsimlib._src.checkpoint import checkpointWriter
+        from ngcsimlib.checkpoint import AsyncCheckpointer
+
+        write_file = checkpointWriter._write_file
+        failures = []
+        saved = threading.Event()
+
+        def failing_write(path, data):
+            if len(failures) == 0 and path.endswith(".pkl"):
+                ## Fail only once the later snapshots have been taken
+                failures.append(path)
+                saved.wait()
+                raise OSError("disk full")
+            write_file(path, data)
+
+        monkeypatch.setattr(checkpointWriter, "_write_file", failing_write)
+
+        store = StateManager()
+        store.set_state({"m:a": 1.0, "m:b": 2.0, "m:c": 5.0})
+        with AsyncCheckpointer(str(tmp_path), max_in_flight=3,
+                               state_manager=store) as saver:
+            failed = saver.save()
+            store.set_state({"m:b": 3.0})
+            recovered = saver.save()
+            store.set_state({"m:a": 4.0})
+            delta = saver.save()
+            saved.set()
+
+        try:
+            failed.result()
+            assert False, "The first write should have failed"
+        except OSError:
+            pass
+        assert recovered.result() == "base_000000.pkl"
+        assert delta.result() == "delta_000001.pkl"
+        assert restore_checkpoint(str(tmp_path), update=False) == \
+            {"m:a": 4.0, "m:b": 3.0, "m:c": 5.0}
+
+    def test_compactions_are_in_flight(self, tmp_path, monkeypatch):
+        from ngcsimlib.checkpoint import AsyncCheckpointer
+
+        store = StateManager()
+        store.set_state({"m:a": 1.0})
+        release = threading.Event()
+        with AsyncCheckpointer(str(tmp_path), max_in_flight=1,
+                               state_manager=store) as saver:
+            monkeypatch.setattr(saver.writer, "compact", release.wait)
+            compaction = saver.compact()
+            try:
+                assert saver.in_flight == 1
+            finally:
+                release.set()
+            assert compaction.result() is True
+
+    def test_interrupted_writes_are_cleaned(self, tmp_path):
+        store = StateManager()
+        store.set_state({"m:a": 1.0})
+        CheckpointWriter(str(tmp_path), state_manager=store).write()
+
+        (tmp_path / ".staging-interrupted").mkdir()
+        (tmp_path / ".staging-interrupted" / "delta_000001.pkl").write_bytes(
+            b"partial")
+        (tmp_path / "delta_000001.pkl").write_bytes(b"orphan")
+
+        writer = CheckpointWriter(str(tmp_path), state_manager=store)
+        assert sorted(p.name for p in tmp_path.iterdir()) == \
+            ["base_000000.pkl", "manifest.json"]
+        assert writer.chain == ["base_000000.pkl"]
+        assert restore_checkpoint(str(tmp_path), update=False) == {"m:a": 1.0}
@@ -0,0 +1,286 @@
+import pathlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+
+from ngcsimlib import Component, MethodProcess
+from ngcsimlib.compartment import Compartment
+from ngcsimlib.context import Context, contextManager
+from ngcsimlib.global_state import StateManager
+from ngcsimlib.logger import diagnostics
+from ngcsimlib.parser import compilable
+
+
+class Accumulator(Component):
+    def __init__(self, name, scale=1.0):
+        super().__init__(name)
+        self.scale = scale
+        self.inp = Compartment(0.0)
+        self.total = Compartment(0.0)
+
+    @compilable
+    def advance(self):
+        self.total.set(self.total.get() + self.inp.get() * self.scale)
+
+
+class Gated(Accumulator):
+    def __init__(self, name, enabled=True):
+        super().__init__(name)
+        self.enabled = enabled
+
+    @compilable
+    def advance(self):
+        if self.enabled:
+            self.total.set(self.total.get() + self.inp.get() * self.scale)
+
+
+class Clamped(Accumulator):
+    def __init__(self, name, limit=2.5):
+        super().__init__(name)
+        self.limit = limit
+
+    @compilable
+    def advance(self):
+        total = self.total.get() + self.inp.get()
+        if total > self.limit:
+            total = self.limit
+        self.total.set(total)
+
+
+class Averaged(Accumulator):
+    def __init__(self, name):
+        super().__init__(name)
+        self.n = Compartment(0)
+        self.mean = Compartment(0.0)
+
+    @compilable
+    def advance(self):
+        if self.n.get() > 0:
+            self.mean.set(self.total.get() / self.n.get())
+        self.total.set(self.total.get() + self.inp.get())
+        self.n.set(self.n.get() + 1)
+
+
+class Thresholded(Accumulator):
+    def __init__(self, name):
+        super().__init__(name)
+        self.gate = Compartment(0.0, fixed=True)
+
+    @compilable
+    def advance(self):
+        if self.gate.get() > 0:
+            self.total.set(self.total.get() + 1.0)
+
+
+class Branched(Component):
+    def __init__(self, name, n_branches=3):
+        super().__init__(name)
+        self.inp = Compartment(0.0)
+        self.branches = [Compartment(0.0) for _ in range(n_branches)]
+
+    @compilable
+    def advance(self):
+        for i, branch in enumerate(self.branches):
+            branch.set(branch.get() + self.inp.get() * (i + 1))
+
+
+class Counter(Accumulator):
+    def __init__(self, name, n=3):
+        super().__init__(name)
+        self.n = n
+        self.last = Compartment(0)
+
+    @compilable
+    def advance(self):
+        for i in range(self.n):
+            self.total.set(self.total.get() + i)
+        self.last.set(i)
+
+
+def _build_and_run(index):
+    name = f"stress_model_{index}"
+    ## Runs write back the whole state, so concurrent runs need their own store
+    with Context(name, state_manager=StateManager()) as ctx:
+        with Context("inner"):
+            a = Accumulator("a")
+        b = Accumulator("b", scale=2.0)
+        a.total >> b.inp
+        advance = MethodProcess("advance") >> a.advance >> b.advance
+
+    a.inp.set(float(index))
+    for _ in range(3):
+        advance.run()
+
+    return (ctx.path, a.total.target, b.total.target, b.total.get(),
+            contextManager.current_path)
+
+
+class ContextTest:
+
+    def test_parallel_builds(self):
+        n_models = 64
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(_build_and_run, range(n_models)))
+
+        for index, (path, a_key, b_key, b_total, current) in \
+                enumerate(results):
+            name = f"stress_model_{index}"
+            assert path == name
+            assert a_key == f"{name}:inner:a:total"
+            assert b_key == f"{name}:b:total"
+            # a.total is index, 2 * index, 3 * index after each step and b
+            # accumulates twice a's total from the step before
+            assert b_total == 2.0 * (index + 2 * index + 3 * index)
+            assert current == ""
+
+        assert contextManager.current_path == ""
+
+    def test_separate_state_managers(self):
+        stores = [StateManager(), StateManager()]
+        models = []
+        for scale, store in zip([1.0, 2.0], stores):
+            with Context("tenant", state_manager=store) as ctx:
+                acc = Accumulator("acc", scale=scale)
+                advance = MethodProcess("advance") >> acc.advance
+            models.append((ctx, acc, advance))
+
+        (ctx_a, acc_a, advance_a), (ctx_b, acc_b, advance_b) = models
+        assert ctx_a is not ctx_b
+        assert ctx_b.state_manager is stores[1]
+        assert Context("tenant", state_manager=stores[0]) is ctx_a
+
+        acc_a.inp.set(1.0)
+        acc_b.inp.set(1.0)
+        advance_a.run()
+        advance_b.run()
+        assert stores[0].from_global_key("tenant:acc:total") == 1.0
+        assert stores[1].from_global_key("tenant:acc:total") == 2.0
+
+    def test_specialization_cache(self):
+        with Context("specialization_cache") as ctx:
+            gate = Gated("gate")
+            advance = MethodProcess("advance") >> gate.advance
+        gate.inp.set(1.0)
+
+        variants = {}
+        for enabled in [True, False, True, False]:
+            gate.enabled = enabled
+            ctx.recompile()
+            variants.setdefault(enabled, advance.run.compiled)
+            assert advance.run.compiled is variants[enabled]
+            advance.run()
+        assert gate.total.get() == 2.0
+
+        gate.scale = 3.0
+        gate.enabled = True
+        ctx.recompile()
+        assert advance.run.compiled is not variants[True]
+        advance.run()
+        assert gate.total.get() == 5.0
+
+    def test_unhashable_specializations(self):
+        with Context("unhashable_specializations") as ctx:
+            acc = Accumulator("acc", scale=np.array([1.0, 2.0]))
+            advance = MethodProcess("advance") >> acc.advance
+        acc.inp.set(1.0)
+        advance.run()
+
+        ## The array is updated in place, so it can not be told apart from
+        ## the array the cached specialization baked in
+        acc.scale[:] = 3.0
+        compiled = acc.advance.compiled
+        ctx.recompile()
+        assert acc.advance.compiled is not compiled
+        advance.run()
+        assert np.allclose(acc.total.get(), [4.0, 5.0])
+        assert any(r["code"] == "uncacheable-specialization" and
+                   r["site"] == ("unhashable_specializations:acc", "advance")
+                   for r in diagnostics.records())
+
+    def test_specializations_scoped_to_context(self):
+        models = []
+        for name in ["scoped_a", "scoped_b"]:
+            with Context(name) as ctx:
+                gate = Gated("gate")
+                MethodProcess("advance") >> gate.advance
+            models.append((ctx, gate))
+        (ctx_a, gate_a), (ctx_b, gate_b) = models
+
+        compiled = gate_a.advance.compiled
+        gate_b.inp.target = gate_b.total
+        ctx_a.recompile()
+        assert gate_a.advance.compiled is compiled
+
+        gate_a.inp.target = gate_a.total
+        ctx_a.recompile()
+        assert gate_a.advance.compiled is not compiled
+
+    def test_state_conditionals(self):
+        with Context("state_conditionals"):
+            clamped = Clamped("clamped")
+            advance = MethodProcess("advance") >> clamped.advance
+        clamped.inp.set(1.0)
+
+        assert "ngcsimlib_select" in advance.view_compiled_method()
+        totals = []
+        for _ in range(4):
+            advance.run()
+            totals.append(clamped.total.get())
+        assert totals == [1.0, 2.0, 2.5, 2.5]
+
+    def test_guarded_conditionals(self):
+        with Context("guarded_conditionals"):
+            averaged = Averaged("averaged")
+            advance = MethodProcess("advance") >> averaged.advance
+        averaged.inp.set(2.0)
+
+        assert "ngcsimlib_element_wise" in advance.view_compiled_method()
+        means = []
+        for _ in range(3):
+            advance.run()
+            means.append(averaged.mean.get())
+        assert means == [0.0, 2.0, 2.0]
+
+        ## Array tests select element-wise instead
+        averaged.n.set(np.array([0, 1]))
+        averaged.total.set(np.array([0.0, 4.0]))
+        averaged.mean.set(np.array([-1.0, -1.0]))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            advance.run()
+        assert averaged.mean.get().tolist() == [-1.0, 4.0]
+
+    def test_wired_fixed_conditionals(self):
+        with Context("wired_fixed_conditionals"):
+            source = Accumulator("source")
+            gated = Thresholded("gated")
+            source.total >> gated.gate
+            advance = MethodProcess("advance") >> gated.advance
+
+        advance.run()
+        source.total.set(1.0)
+        advance.run()
+        assert gated.total.get() == 1.0
+
+    def test_unrolled_loop_targets(self):
+        with Context("unrolled_loop_targets"):
+            counter = Counter("counter")
+            advance = MethodProcess("advance") >> counter.advance
+
+        assert "for " not in advance.view_compiled_method()
+        advance.run()
+        assert (counter.total.get(), counter.last.get()) == (3.0, 2)
+
+    def test_unrolled_loops(self):
+        with Context("unrolled_loops"):
+            branched = Branched("branched")
+            advance = MethodProcess("advance") >> branched.advance
+        branched.inp.set(1.0)
+
+        assert "for " not in advance.view_compiled_method()
+        advance.run()
+        advance.run()
+        assert [branch.get() for branch in branched.branches] == \
+            [2.0, 4.0, 6.0]
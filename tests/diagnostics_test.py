@@ -0,0 +1,48 @@
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+
+from ngcsimlib import Component
+from ngcsimlib.compartment import Compartment
+from ngcsimlib.context import Context
+from ngcsimlib.logger import DiagnosticsCollector, diagnostics
+
+
+class Wired(Component):
+    def __init__(self, name):
+        super().__init__(name)
+        self.inp = Compartment(0.0)
+        self.out = Compartment(0.0)
+
+
+class DiagnosticsTest:
+
+    def test_deduplicates_and_rate_limits(self):
+        collector = DiagnosticsCollector(rate_limit=1)
+        for _ in range(3):
+            collector.report("code", "site_a", "{} happened", "a")
+        collector.report("code", "site_b", "{} happened", "b")
+
+        records = collector.records()
+        assert [(r["site"], r["count"]) for r in records] == \
+            [("site_a", 3), ("site_b", 1)]
+        assert records[1]["message"] == "b happened"
+        assert collector.summary() == \
+            ["[code] 4 occurrence(s) at 2 site(s), 1 site(s) not logged"]
+        assert collector.summary() == []
+
+    def test_wired_set_is_reported(self):
+        with Context("diagnostics_wired"):
+            source = Wired("source")
+            sink = Wired("sink")
+            source.out >> sink.inp
+
+        sink.inp.set(1.0)
+        sink.inp.set(2.0)
+        record = [r for r in diagnostics.records()
+                  if r["site"] == "diagnostics_wired:sink:inp"]
+        assert len(record) == 1
+        assert record[0]["code"] == "wired-set"
+        assert record[0]["count"] == 2
+        assert sink.inp.get() == 0.0
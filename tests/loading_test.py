@@ -0,0 +1,162 @@
+import pathlib
+import sys
+import tempfile
+import threading
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from ngcsimlib import Component, MethodProcess
+from ngcsimlib.compartment import Compartment
+from ngcsimlib.context import Context, contextManager
+from ngcsimlib.global_state import StateManager
+from ngcsimlib.parser import compilable
+
+
+class Weighted(Component):
+    def __init__(self, name, size=2):
+        super().__init__(name)
+        self.size = size
+        self.inp = Compartment(np.zeros(size))
+        self.weight = Compartment(np.zeros(size))
+        self.out = Compartment(np.zeros(size))
+        self.loads = 0
+        self.loaded_in = None
+
+    @compilable
+    def advance(self):
+        self.out.set(self.inp.get() * self.weight.get())
+
+    def save(self, directory):
+        np.save(f"{directory}/{self.name}.npy", self.weight.get())
+
+    def load(self, directory):
+        self.loads += 1
+        self.loaded_in = (contextManager.current_path,
+                          contextManager.current_state_manager)
+        self.weight.set(np.load(f"{directory}/{self.name}.npy"))
+
+
+def _build(name, store):
+    with Context(name, state_manager=store) as ctx:
+        a = Weighted("a")
+        b = Weighted("b")
+        a.out >> b.inp
+        advance = MethodProcess("advance") >> a.advance >> b.advance
+    a.weight.set(np.array([1.0, 2.0]))
+    b.weight.set(np.array([3.0, 4.0]))
+    return ctx, advance
+
+
+class LoadingTest:
+
+    def test_archive_round_trip(self, tmp_path):
+        ctx, _ = _build("archived", StateManager())
+        path = ctx.save_to_archive(str(tmp_path))
+        assert path.endswith("archived.ngcm")
+
+        store = StateManager()
+        loaded = Context.load(str(tmp_path), "archived", state_manager=store)
+        assert loaded is not ctx
+        a, b = loaded.get_components("a", "b")
+        assert np.all(b.weight.get() == [3.0, 4.0])
+
+        a.inp.set(np.ones(2))
+        advance = loaded.get_objects("advance", objectType="process")
+        advance.run()
+        advance.run()
+        assert np.all(b.out.get() == [3.0, 8.0])
+        assert store.from_global_key("archived:b:out") is b.out.get()
+
+    def test_archive_entries_stay_inside(self, tmp_path):
+        import zipfile
+        from ngcsimlib._src.utils.archive import ModelArchiveReader
+
+        path = tmp_path / "hostile.ngcm"
+        escaped = f"escaped-{tmp_path.name}"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("custom/a/weights.npy", b"fine")
+            archive.writestr(f"custom/a/../{escaped}", b"hostile")
+
+        reader = ModelArchiveReader(str(path))
+        try:
+            with pytest.raises(ValueError):
+                reader.custom_path("custom/a")
+        finally:
+            reader.close()
+        assert not (pathlib.Path(tempfile.gettempdir()) / escaped).exists()
+
+    def test_lazy_loads_dependencies(self, tmp_path):
+        with Context("lazy_source", state_manager=StateManager()) as ctx:
+            a = Weighted("a")
+            b = Weighted("b")
+            c = Weighted("c")
+            a.out >> b.inp
+            only_b = MethodProcess("only_b") >> b.advance
+            only_b.watch(c.out)
+        a.weight.set(np.array([1.0, 2.0]))
+        ctx.save_to_json(str(tmp_path))
+
+        loaded = Context.load(str(tmp_path), "lazy_source", lazy=True,
+                              state_manager=StateManager())
+        components = loaded.get_objects_by_type("component")
+        assert [components[n].loads for n in "abc"] == [0, 0, 0]
+        loaded.get_objects_by_type("process")["only_b"].run()
+        assert [components[n].loads for n in "abc"] == [1, 1, 1]
+        assert np.all(components["a"].weight.get() == [1.0, 2.0])
+
+        partial = Context.load(str(tmp_path), "lazy_source",
+                               types=["process"],
+                               state_manager=StateManager())
+        assert sorted(partial.get_objects_by_type("component")) == \
+            ["a", "b", "c"]
+
+    def test_threaded_loads_keep_context(self, tmp_path):
+        ctx, _ = _build("threaded_source", StateManager())
+        ctx.save_to_archive(str(tmp_path))
+
+        store = StateManager()
+        loaded = Context.load(str(tmp_path), "threaded_source", workers=4,
+                              state_manager=store)
+        a, b = loaded.get_components("a", "b")
+        assert a.loaded_in == ("threaded_source", store)
+        assert b.loaded_in == ("threaded_source", store)
+        assert np.all(a.weight.get() == [1.0, 2.0])
+
+    def test_lazy_loads_from_threads(self, tmp_path, monkeypatch):
+        from ngcsimlib._src.utils.archive import ModelArchiveReader
+        from ngcsimlib._src.context.context import ensure_loaded
+
+        with Context("lazy_threads", state_manager=StateManager()) as ctx:
+            for index in range(16):
+                Weighted(f"w{index}")
+        ctx.save_to_archive(str(tmp_path))
+
+        closes = []
+        close = ModelArchiveReader.close
+        monkeypatch.setattr(ModelArchiveReader, "close",
+                            lambda reader: (closes.append(reader),
+                                            close(reader)))
+        loaded = Context.load(str(tmp_path), "lazy_threads", lazy=True,
+                              state_manager=StateManager())
+        components = list(loaded.get_objects_by_type("component").values())
+        barrier = threading.Barrier(8)
+
+        def load_all():
+            barrier.wait()
+            ensure_loaded(*components)
+
+        threads = [threading.Thread(target=load_all) for _ in range(8)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        assert [component.loads for component in components] == [1] * 16
+        assert len(closes) == 1
@@ -0,0 +1,82 @@
+import pathlib
+import sys
+import types
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+
+from ngcsimlib._src.utils import modules
+from ngcsimlib._src.modules.modules_manager import modules_manager
+
+
+def _fake_module(name):
+    module = types.ModuleType(name)
+    sys.modules[name] = module
+    return module
+
+
+class ModulesTest:
+
+    def test_import_paths_follow_reloads(self):
+        try:
+            first = _fake_module("ngc_cached_models")
+            first.Model = type("Model", (), {"__module__": "ngc_cached_models"})
+            assert modules_manager.import_module("ngc_cached_models.Model") \
+                is first.Model
+            assert modules_manager.resolve_public_import(first.Model()) == \
+                "ngc_cached_models.Model"
+
+            ## Replacing the module invalidates the cached path
+            second = _fake_module("ngc_cached_models")
+            second.Model = type("Model", (), {"__module__": "ngc_cached_models"})
+            assert modules_manager.import_module("ngc_cached_models.Model") \
+                is second.Model
+            assert modules_manager.resolve_public_import(second.Model) == \
+                "ngc_cached_models.Model"
+        finally:
+            sys.modules.pop("ngc_cached_models", None)
+
+    def test_module_index_tracks_replaced_modules(self):
+        _fake_module("ngc_index_first")
+        _fake_module("ngc_index_anchor")
+        try:
+            assert modules._find_module("ngc_index_first") == \
+                "ngc_index_first"
+
+            ## Same number of modules and the same last module
+            del sys.modules["ngc_index_first"]
+            _fake_module("ngc_index_second")
+            sys.modules["ngc_index_anchor"] = \
+                sys.modules.pop("ngc_index_anchor")
+            assert modules._find_module("ngc_index_first") is None
+            assert modules._find_module("ngc_index_second") == \
+                "ngc_index_second"
+        finally:
+            for name in ["ngc_index_first", "ngc_index_second",
+                         "ngc_index_anchor"]:
+                sys.modules.pop(name, None)
+
+    def test_attribute_index_tracks_new_attributes(self):
+        module = _fake_module("ngc_index_attributes")
+        try:
+            module.FIRST = 1
+            assert modules._find_attribute(module, "first") == 1
+
+            module.Later_added = 2
+            assert modules._find_attribute(module, "LATER_ADDED") == 2
+        finally:
+            sys.modules.pop("ngc_index_attributes", None)
+
+    def test_module_lookups_skip_unchanged_index(self, monkeypatch):
+        _fake_module("ngc_index_lookup")
+        try:
+            assert modules._find_module("ngc_index_lookup") == \
+                "ngc_index_lookup"
+            refreshes = []
+            refresh = modules._refresh_module_index_locked
+            monkeypatch.setattr(modules, "_refresh_module_index_locked",
+                                lambda: (refreshes.append(1), refresh()))
+            assert modules._find_module("ngc_index_lookup") == \
+                "ngc_index_lookup"
+            assert refreshes == []
+        finally:
+            sys.modules.pop("ngc_index_lookup", None)
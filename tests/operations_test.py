@@ -0,0 +1,212 @@
+import array
+import ast
+import json
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+
+import numpy as np
+
+from ngcsimlib import Component, MethodProcess
+from ngcsimlib.compartment import Compartment
+from ngcsimlib.context import Context
+from ngcsimlib.operations import Summation, Product, Expression, lazy_ops, \
+    WeightedSum, BaseOp, Maximum, Concatenate
+from ngcsimlib.parser import compilable
+
+
+class Source(Component):
+    def __init__(self, name, value, fixed=False):
+        super().__init__(name)
+        self.v = Compartment(value, fixed=fixed)
+
+    @compilable
+    def advance(self, dt):
+        self.v.set(self.v.get() + dt)
+
+
+class Sink(Component):
+    def __init__(self, name):
+        super().__init__(name)
+        self.inp = Compartment(0.0)
+        self.out = Compartment(0.0)
+
+    @compilable
+    def advance(self):
+        self.out.set(self.inp.get())
+
+
+class Counted(BaseOp):
+    def __init__(self, *comps, scale=1.0):
+        super().__init__(*comps)
+        self.astOp = ast.Add()
+        self.scale = scale
+        ## Setting attributes of an operation invalidates it
+        self.evaluations = []
+
+    def _get_value(self):
+        self.evaluations.append(self.scale)
+        return self.scale * sum(comp.get() for comp in self._comps)
+
+
+class OperationsTest:
+
+    def test_simplified_wiring(self):
+        with Context("simplified_wiring"):
+            a, b, c = Source("a", 1.0), Source("b", 2.0), Source("c", 3.0)
+            one = Source("one", 1, fixed=True)
+            two = Source("two", 2.0, fixed=True)
+            x, y, z = Sink("x"), Sink("y"), Sink("z")
+            Summation(Summation(a.v, b.v), c.v) >> x.inp
+            Summation(a.v, Summation(b.v, c.v)) >> y.inp
+            Product(two.v, one.v, Summation(a.v, b.v, c.v)) >> z.inp
+            advance = MethodProcess("advance")
+            for node in (a, b, c, one, two, x, y, z):
+                advance >> node.advance
+            advance.watch(x.out, y.out, z.out)
+
+        assert len(x.inp.target._comps) == 3
+        ## Regrouping would change how the float sum rounds
+        assert len(y.inp.target._comps) == 2
+        assert z.inp.target._comps[-1] is x.inp.target
+        assert advance.run.compiled.code.count("fused_sum") == 1
+        assert one.v.target not in advance.run.compiled.code
+
+        _, watched = advance.run(dt=1.0)
+        assert watched == (9.0, 9.0, 18.0)
+        assert (x.inp.get(), z.inp.get()) == (9.0, 18.0)
+
+    def test_fixed_identities_follow_loads(self):
+        with Context("fixed_identities") as ctx:
+            a, zero = Source("a", 1.0), Source("zero", 0, fixed=True)
+            x = Sink("x")
+            Summation(a.v, zero.v) >> x.inp
+            advance = MethodProcess("advance")
+            for node in (a, zero, x):
+                advance >> node.advance
+            advance.watch(x.out)
+
+        assert len(x.inp.target.to_json()["compartments"]) == 2
+        assert zero.v.target not in advance.run.compiled.code
+        _, watched = advance.run(dt=1.0)
+        assert watched == (2.0,)
+
+        zero.v.set(5.0)
+        assert zero.v.get() == 0.0
+        zero.v.load_value(5.0)
+        assert ctx.state_manager.from_global_key(zero.v.target) == 5.0
+        assert x.inp.get() == 7.0
+
+        ctx.recompile()
+        _, watched = advance.run(dt=1.0)
+        assert watched == (8.0,)
+
+    def test_deduplication_mutations(self):
+        with Context("deduplication_mutations"):
+            a, b = Source("a", 1.0), Source("b", 2.0)
+            x, y = Sink("x"), Sink("y")
+            first = Summation(a.v, b.v)
+            first >> x.inp
+            first.extra = True
+            Summation(a.v, b.v) >> y.inp
+        ## The changed operation is no longer the canonical one
+        assert y.inp.target is not first
+
+    def test_identities_keep_types(self):
+        with Context("identities_keep_types"):
+            a = Source("a", np.array([1, 2]))
+            zero = Source("zero", 0.0, fixed=True)
+            flags = Source("flags", np.array([True, False]))
+            none = Source("none", 0, fixed=True)
+            x, y = Sink("x"), Sink("y")
+            Summation(a.v, zero.v) >> x.inp
+            Summation(flags.v, none.v) >> y.inp
+            advance = MethodProcess("advance") >> x.advance >> y.advance
+            advance.watch(x.out, y.out)
+
+        ## Both fixed identities are kept (folded into constants)
+        assert advance.run.compiled.code.count("+ 0") == 2
+        _, (x_out, y_out) = advance.run()
+        assert x_out.dtype == np.float64
+        assert y_out.tolist() == [1, 0]
+
+    def test_kernels_without_array_namespaces(self):
+        with Context("kernels_without_namespaces"):
+            a, b = Source("a", 0.5), Source("b", np.array([0.0, 1.0]))
+            c = Source("c", array.array("d", [1.0]))
+            d = Source("d", array.array("d", [2.0]))
+        assert Maximum(a.v, b.v).get().tolist() == [0.5, 1.0]
+        joined = Concatenate(c.v, d.v).get()
+        assert isinstance(joined, np.ndarray) and joined.tolist() == [1.0, 2.0]
+
+    def test_lazy_expressions(self):
+        with Context("lazy_expressions"):
+            a, b = Source("a", 1.0), Source("b", 2.0)
+            x, y = Sink("x"), Sink("y")
+            with lazy_ops():
+                (10 - a.v * 2 + b.v) >> x.inp
+                (-Summation(a.v, b.v) / 2) >> y.inp
+            advance = MethodProcess("advance")
+            for node in (a, b, x, y):
+                advance >> node.advance
+            advance.watch(x.out, y.out)
+
+        assert isinstance(x.inp.target, Expression)
+        assert x.inp.get_needed_keys() == {a.v.target, b.v.target}
+        assert (x.inp.get(), y.inp.get()) == (10.0, -1.5)
+
+        _, watched = advance.run(dt=1.0)
+        assert watched == (9.0, -2.5)
+
+    def test_numpy_operands(self):
+        with Context("numpy_operands"):
+            a = Source("a", np.array([1.0, 2.0]))
+            x = Sink("x")
+            assert np.add(a.v, 1.0).tolist() == [2.0, 3.0]
+            assert (np.ones(2) - a.v).tolist() == [0.0, -1.0]
+            assert np.exp(a.v).tolist() == np.exp([1.0, 2.0]).tolist()
+            with lazy_ops():
+                (np.ones(2) * a.v) >> x.inp
+                assert np.exp(a.v).tolist() == np.exp([1.0, 2.0]).tolist()
+
+        assert isinstance(x.inp.target, Expression)
+        assert x.inp.get().tolist() == [1.0, 2.0]
+
+    def test_memoized_values(self):
+        with Context("memoized_values"):
+            a, b, c = Source("a", 1.0), Source("b", 2.0), Source("c", 3.0)
+            x = Sink("x")
+            op = Counted(a.v, b.v)
+            op >> x.inp
+
+        assert (x.inp.get(), x.inp.get(), op.get()) == (3.0, 3.0, 3.0)
+        assert len(op.evaluations) == 1
+
+        c.v.set(4.0)
+        assert x.inp.get() == 3.0
+        assert len(op.evaluations) == 1
+
+        a.v.set(5.0)
+        assert (x.inp.get(), x.inp.get()) == (7.0, 7.0)
+        assert len(op.evaluations) == 2
+
+        op.scale = 2.0
+        assert x.inp.get() == 14.0
+        assert len(op.evaluations) == 3
+
+        op._comps.append(c.v)
+        op.scale = 1.0
+        assert x.inp.get() == 11.0
+        assert len(op.evaluations) == 4
+
+    def test_weighted_sum_json(self):
+        with Context("weighted_sum_json") as ctx:
+            a, b = Source("a", np.ones(2)), Source("b", np.ones(2))
+        op = WeightedSum(a.v, b.v, weights=[np.array([1.0, 2.0]), 3.0])
+
+        data = json.loads(json.dumps(op.to_json()))
+        loaded = BaseOp.load_op(data, ctx.state_manager)
+        assert isinstance(loaded.weights[0], np.ndarray)
+        assert loaded.weights[1] == 3.0
+        assert np.all(loaded.get() == [4.0, 5.0])
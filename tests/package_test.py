@@ -0,0 +1,41 @@
+import pathlib
+import subprocess
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+
+_ROOT = str(pathlib.Path(__file__).parent.parent)
+
+
+def _run(code):
+    return subprocess.run([sys.executable, "-c", code], cwd=_ROOT,
+                          capture_output=True, text=True, check=True).stdout
+
+
+class PackageTest:
+
+    def test_lazy_import(self):
+        out = _run("import sys, ngcsimlib\n"
+                   "print('ngcsimlib._src.process.methodProcess' in "
+                   "sys.modules)\n"
+                   "ngcsimlib.MethodProcess\n"
+                   "print('ngcsimlib._src.process.methodProcess' in "
+                   "sys.modules)")
+        assert out.split() == ["False", "True"]
+
+    def test_star_import(self):
+        out = _run("from ngcsimlib import *\n"
+                   "print(Component.__name__, MethodProcess.__name__, "
+                   "context.__name__, callable(configure))")
+        assert out.split() == ["Component", "MethodProcess",
+                               "ngcsimlib.context", "True"]
+
+    def test_public_imports_stay_lazy(self):
+        out = _run("import sys, ngcsimlib\n"
+                   "from ngcsimlib._src.component import Component\n"
+                   "from ngcsimlib._src.modules.modules_manager import "
+                   "modules_manager\n"
+                   "print(modules_manager.resolve_public_import(Component))\n"
+                   "print('ngcsimlib._src.process.batchServer' in "
+                   "sys.modules)")
+        assert out.split() == ["ngcsimlib.Component", "False"]
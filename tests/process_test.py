@@ -0,0 +1,340 @@
+import asyncio
+import importlib.util
+import os
+import pathlib
+import pickle
+import sys
+import threading
+from multiprocessing import AuthenticationError
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+
+from ngcsimlib import Component, MethodProcess, run_sweep, vectorized, \
+    BatchServer, BatchClient
+from ngcsimlib.compartment import Compartment
+from ngcsimlib.context import Context
+from ngcsimlib.global_state import StateManager
+from ngcsimlib.operations import Summation, WeightedSum
+from ngcsimlib.parser import compilable
+
+
+class Leaky(Component):
+    def __init__(self, name, decay=0.5):
+        super().__init__(name)
+        self.decay = decay
+        self.inp = Compartment(0.0)
+        self.value = Compartment(0.0)
+
+    @compilable
+    def advance(self, dt):
+        self.value.set(self.value.get() * self.decay + self.inp.get() * dt)
+
+
+class Shifted(Component):
+    def __init__(self, name):
+        super().__init__(name)
+        self.value = Compartment(0.0)
+
+    @compilable
+    def advance(self, repeat, seeds, callable):
+        self.value.set(self.value.get() + repeat + seeds + callable)
+
+
+class Switched(Leaky):
+    def __init__(self, name, enabled=True):
+        super().__init__(name)
+        self.enabled = enabled
+
+    @compilable
+    def advance(self, dt):
+        if self.enabled:
+            self.value.set(self.value.get() * self.decay + self.inp.get() * dt)
+
+
+class CrashOnce:
+    """
+    Kills the worker process multiplying by it, unless the marker file exists
+    """
+    def __init__(self, marker, value):
+        self.marker = marker
+        self.value = value
+
+    def __rmul__(self, other):
+        if not os.path.exists(self.marker):
+            open(self.marker, "w").close()
+            os._exit(1)
+        return other * self.value
+
+
+class _LockHolder(threading.Thread):
+    def __init__(self, lock):
+        super().__init__()
+        self.lock = lock
+        self.locked = threading.Event()
+        self.release_lock = threading.Event()
+
+    def run(self):
+        with self.lock:
+            self.locked.set()
+            self.release_lock.wait()
+
+
+def _build(name, store=None):
+    with Context(name, state_manager=store or StateManager()):
+        leaky = Leaky("leaky")
+        advance = MethodProcess("advance") >> leaky.advance
+        advance.watch(leaky.value)
+    leaky.inp.set(1.0)
+    return leaky, advance
+
+
+def _build_sweep():
+    return _build("sweep")[1]
+
+
+class ProcessTest:
+
+    def test_pickled_run(self):
+        leaky, advance = _build("pickled_run")
+        run = pickle.loads(pickle.dumps(advance.run))
+
+        state = advance._state_manager.state
+        keywords = advance.pack_keywords(dt=2.0)
+        final_state, watched = run(dict(state), keywords)
+        assert watched == run.compiled(dict(state), keywords)[1] == \
+            advance.run(keywords=keywords)[1] == (2.0,)
+        assert final_state[leaky.value.target] == 2.0
+
+    def test_export(self, tmp_path):
+        leaky, advance = _build("exported")
+        path = advance.export(str(tmp_path / "exported_model.py"),
+                              state_path=str(tmp_path / "state.pkl"))
+        with open(path) as fp:
+            assert "ngcsimlib" not in fp.read().split('"""', 2)[2]
+
+        spec = importlib.util.spec_from_file_location("exported_model", path)
+        exported = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(exported)
+
+        state = exported.load_state(str(tmp_path / "state.pkl"))
+        state, watched = exported.run("advance", state, dt=2.0)
+        state, watched = exported.run("advance", state, dt=2.0)
+        assert watched == (3.0,)
+        assert exported.WATCHED == {"advance": ["exported:leaky:value"]}
+
+    def test_export_rejects_unloadable_modules(self, tmp_path, monkeypatch):
+        with Context("exported_run", state_manager=StateManager()):
+            leaky = Leaky("leaky")
+            run = MethodProcess("run") >> leaky.advance
+        with pytest.raises(RuntimeError):
+            run.export(str(tmp_path / "reserved.py"))
+
+        class Decay:
+            def __init__(self, value):
+                self.value = value
+
+            def __rmul__(self, other):
+                return other * self.value
+
+        Decay.__module__, Decay.__qualname__ = "__main__", "NgcExportDecay"
+        monkeypatch.setattr(sys.modules["__main__"], "NgcExportDecay", Decay,
+                            raising=False)
+        with Context("exported_main", state_manager=StateManager()):
+            leaky = Leaky("leaky", decay=Decay(0.5))
+            advance = MethodProcess("advance") >> leaky.advance
+        with pytest.raises(RuntimeError):
+            advance.export(str(tmp_path / "main.py"))
+        assert not (tmp_path / "main.py").exists()
+
+    def test_sweep(self):
+        configs = [{"attributes": {"leaky.decay": decay},
+                    "keywords": {"dt": 1.0}} for decay in [0.0, 1.0]]
+        configs.append({"attributes": {"leaky.missing": 1.0},
+                        "keywords": {"dt": 1.0}})
+
+        for workers in [0, 2]:
+            results = sorted(run_sweep(_build_sweep, configs, steps=3,
+                                       workers=workers),
+                             key=lambda result: result.index)
+            assert [result.ok for result in results] == [True, True, False]
+            assert results[0].watched == [(1.0,), (1.0,), (1.0,)]
+            assert results[1].watched == [(1.0,), (2.0,), (3.0,)]
+            assert "KeyError" in results[2].error
+
+    def test_sweep_rejects_static_attributes(self):
+        def build():
+            with Context("sweep_static", state_manager=StateManager()):
+                switched = Switched("switched")
+                advance = MethodProcess("advance") >> switched.advance
+            return advance
+
+        configs = [{"attributes": {"switched.enabled": False},
+                    "keywords": {"dt": 1.0}},
+                   {"attributes": {"switched.decay": 1.0},
+                    "keywords": {"dt": 1.0}}]
+        results = list(run_sweep(build, configs, steps=2, workers=0))
+        assert "structure" in results[0].error
+        assert results[1].watched == [None, None]
+
+    def test_sweep_retries_broken_pools(self, tmp_path):
+        marker = str(tmp_path / "crashed")
+        configs = [{"attributes": {"leaky.decay": CrashOnce(marker, 1.0)},
+                    "keywords": {"dt": 1.0}},
+                   {"attributes": {"leaky.decay": 0.0},
+                    "keywords": {"dt": 1.0}}]
+        results = sorted(run_sweep(_build_sweep, configs, steps=2, workers=1),
+                         key=lambda result: result.index)
+        assert [result.ok for result in results] == [True, True]
+        assert results[0].watched == [(1.0,), (2.0,)]
+        assert results[1].watched == [(1.0,), (1.0,)]
+
+        os.remove(marker)
+        results = list(run_sweep(_build_sweep, configs[:1], steps=2,
+                                 workers=1, max_retries=0))
+        assert not results[0].ok
+
+    def test_pack_columns(self):
+        with Context("pack_columns", state_manager=StateManager()):
+            shifted = Shifted("shifted")
+            advance = MethodProcess("advance") >> shifted.advance
+
+        columns = advance.pack_columns(
+            3, repeat=1.0, seeds=lambda seed: seed * 2.0,
+            callable=vectorized(lambda seeds: [-s for s in seeds]))
+        columns = dict(zip(advance.get_keywords(), columns))
+        assert isinstance(columns["repeat"], np.ndarray)
+        assert columns["repeat"].tolist() == [1.0, 1.0, 1.0]
+        assert columns["seeds"] == [0.0, 2.0, 4.0]
+        assert columns["callable"] == [0, -1, -2]
+
+        weights = np.arange(4.0)
+        column = dict(zip(advance.get_keywords(), advance.pack_columns(
+            2, repeat=weights, seeds=0.0, callable=0.0)))["repeat"]
+        assert column.shape == (2, 4) and np.shares_memory(column, weights)
+        ## Packers are generated once for every combination of kinds
+        assert len(advance._column_packers) == 2
+
+        for row in advance.pack_rows(length=3, repeat=1.0, seeds=2.0,
+                                     callable=3.0):
+            advance.run(keywords=row)
+        assert shifted.value.get() == 18.0
+
+    def test_run_stream(self):
+        leaky, advance = _build("streamed")
+        store = advance._state_manager
+
+        stream = advance.run_stream(({"dt": 1.0} for _ in range(4)),
+                                    flush_every=2, prefetch=2)
+        watched = [next(stream) for _ in range(3)]
+        assert watched == [(1.0,), (1.5,), (1.75,)]
+        ## Only flushed after the second step
+        assert store.from_global_key("streamed:leaky:value") == 1.5
+        stream.close()
+        assert leaky.value.get() == 1.75
+
+        assert list(advance.run_stream([[1.0]], update=False)) == [(1.875,)]
+        assert leaky.value.get() == 1.75
+
+    def test_async_runs(self):
+        leaky, advance = _build("async_runs")
+
+        async def concurrent_runs():
+            await asyncio.gather(*(advance.run_async(dt=1.0)
+                                   for _ in range(4)))
+            return leaky.value.get()
+
+        ## Each asyncio.run uses a new event loop
+        assert asyncio.run(concurrent_runs()) == 1.875
+        assert asyncio.run(concurrent_runs()) == 1.875 / 16 + 1.875
+
+        rows = advance.pack_rows(2, dt=0.0)
+        final_state, watched = asyncio.run(advance.scan_async(rows))
+        assert watched == [(leaky.value.get() * 2,), (leaky.value.get(),)]
+
+    def test_async_runs_share_the_run_lock(self):
+        leaky, advance = _build("async_run_lock")
+        store = advance._state_manager
+        threads = []
+        prepare = advance._prepare_run
+
+        def recorded_prepare():
+            threads.append(threading.current_thread())
+            return prepare()
+        advance._prepare_run = recorded_prepare
+
+        async def blocked_run():
+            task = asyncio.ensure_future(advance.run_async(dt=1.0))
+            await asyncio.sleep(0.1)
+            ## A synchronous run holds the lock on another thread
+            assert not task.done()
+            holder.release_lock.set()
+            return await task
+
+        holder = _LockHolder(store.run_lock)
+        holder.start()
+        holder.locked.wait()
+        try:
+            asyncio.run(blocked_run())
+        finally:
+            holder.release_lock.set()
+            holder.join()
+        assert leaky.value.get() == 1.0
+        assert threads[0] is not threading.main_thread()
+
+    def test_batch_server(self, tmp_path):
+        leaky, advance = _build("batched")
+        with BatchServer(advance, [leaky.inp], max_batch_size=4,
+                         max_latency=0.05, keywords={"dt": 2.0}) as server:
+            futures = [server.submit(float(i)) for i in range(8)]
+            assert [f.result()[0] for f in futures] == \
+                [2.0 * i for i in range(8)]
+
+            path = str(tmp_path / "batched.sock")
+            server.serve_unix(path, authkey=b"secret")
+            assert os.stat(path).st_mode & 0o777 == 0o600
+            with pytest.raises(AuthenticationError):
+                BatchClient(path, authkey=b"wrong")
+            with BatchClient(path, authkey=b"secret") as client:
+                futures = [client.submit(float(i)) for i in range(4)]
+                assert client.request(5.0)[0] == 10.0
+                assert [f.result()[0] for f in futures] == [0.0, 2.0, 4.0,
+                                                            6.0]
+
+            metrics = server.metrics()
+        assert metrics["requests"] == 13
+        assert metrics["mean_batch_size"] > 1
+        assert leaky.value.get() == 0.0
+        with pytest.raises(RuntimeError):
+            server.submit(1.0)
+
+    def test_export_inlines_kernels(self, tmp_path):
+        with Context("exported_kernels", state_manager=StateManager()):
+            a = Leaky("a")
+            b = Leaky("b")
+            c = Leaky("c", decay=0.0)
+            Summation(WeightedSum(a.value, b.value, weights=[1.0, 2.0]),
+                      a.inp, b.inp) >> c.inp
+            advance = MethodProcess("advance") >> a.advance >> b.advance \
+                >> c.advance
+            advance.watch(c.value)
+        a.inp.set(1.0)
+        b.inp.set(3.0)
+
+        path = advance.export(str(tmp_path / "exported_kernels.py"))
+        with open(path) as fp:
+            source = fp.read()
+        assert "ngcsimlib_weighted_sum" in source
+        assert "ngcsimlib." not in source
+
+        spec = importlib.util.spec_from_file_location("exported_kernels",
+                                                      path)
+        exported = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(exported)
+        state = advance._state_manager.state
+        for _ in range(2):
+            state, watched = exported.run("advance", state, dt=1.0)
+            assert watched == advance.run(dt=1.0)[1]
+        assert watched == ((1.5 + 2 * 4.5 + 4.0) * 1.0,)